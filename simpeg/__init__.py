@@ -0,0 +1 @@
+"""Lapisan data & komputasi SIMPEG Dashboard (tanpa ketergantungan Streamlit)."""
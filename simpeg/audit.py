@@ -0,0 +1,197 @@
+"""Audit log aktivitas pengguna: penulis batch asinkron, query rentang waktu dan paginasi keyset."""
+import atexit
+import datetime
+import os
+import queue
+import threading
+import time
+
+import pandas as pd
+
+from simpeg.db import get_pool
+from simpeg.metrics import record_error
+
+AUDIT_COLS = ["id","user","role","action","target","timestamp"]
+PAGE_SIZE = 100
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 1.0
+# Batch yang gagal ditulis dicoba ulang dengan jeda 0.5, 1, 2 detik, lalu ditahan dan
+# dicoba lagi bersama batch berikutnya (paling lambat tiap PENDING_RETRY detik)
+WRITE_RETRIES = 3
+RETRY_DELAY = 0.5
+PENDING_RETRY = 30.0
+INSERT_SQL = "INSERT INTO audit_log (user, role, action, target, timestamp) VALUES (?,?,?,?,?)"
+
+# ================== Penulis Asinkron ==================
+class AuditWriter:
+    """Antrian + thread pekerja yang menulis audit log secara batch.
+
+    Entri dikumpulkan sampai ``batch_size`` atau ``flush_interval`` detik sejak
+    entri pertama, lalu ditulis dengan satu ``executemany`` dalam satu
+    transaksi. Dengan ``sync=True`` setiap entri langsung ditulis (untuk tes).
+    Batch yang gagal ditulis tidak dibuang: dicoba ulang, lalu digabung ke batch
+    berikutnya; kegagalan dicatat lewat ``simpeg.metrics.record_error``.
+    Sisa antrian selalu ditulis saat proses berhenti (``atexit``).
+    """
+
+    _STOP = object()
+
+    def __init__(self, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, sync=False):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sync = sync
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, record: tuple):
+        if self.sync:
+            self._write([record]); return
+        self._ensure_started()
+        self._queue.put(record)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive(): return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        pending = []
+        while True:
+            batch = []
+            try: batch.append(self._queue.get(timeout=PENDING_RETRY if pending else None))
+            except queue.Empty: pass
+            deadline = time.monotonic() + self.flush_interval
+            while batch and len(batch) < self.batch_size and batch[-1] is not self._STOP:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0: break
+                try: batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty: break
+            records = pending + [r for r in batch if r is not self._STOP]
+            try:
+                pending = [] if not records or self._write_retry(records) else records
+            finally:
+                for _ in batch: self._queue.task_done()
+            if batch and batch[-1] is self._STOP:
+                if pending: record_error("audit", "write", RuntimeError(f"{len(pending)} entri tidak tertulis: {pending!r}"))
+                return
+
+    def _write_retry(self, records) -> bool:
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                self._write(records); return True
+            except Exception as e:
+                record_error("audit", "write", e)
+                if attempt < WRITE_RETRIES: time.sleep(RETRY_DELAY * 2 ** attempt)
+        return False
+
+    def _write(self, records):
+        get_pool().executemany(INSERT_SQL, records)
+
+    def flush(self):
+        """Tunggu sampai semua entri yang sudah diantrikan tertulis."""
+        if self._thread is not None and self._thread.is_alive(): self._queue.join()
+
+    def close(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+
+_writer = AuditWriter(sync=os.environ.get("SIMPEG_AUDIT_SYNC", "") not in ("", "0"))
+atexit.register(_writer.close)
+
+def get_audit_writer() -> AuditWriter: return _writer
+
+def set_sync_mode(sync: bool = True):
+    _writer.flush()
+    _writer.sync = sync
+
+def flush_audit_log(): _writer.flush()
+
+def log_action(user, role, action, target=""):
+    # Waktu dicatat saat aksi terjadi (UTC, sama seperti CURRENT_TIMESTAMP), bukan saat batch ditulis
+    ts = datetime.datetime.now(datetime.timezone.utc).strftime(TS_FORMAT)
+    _writer.submit((user, role, action, target, ts))
+
+# ================== Rentang Waktu ==================
+def day_bounds(day=None):
+    """Batas [awal, akhir) satu hari dalam format kolom timestamp, untuk range scan indeks."""
+    day = day or datetime.date.today()
+    start = datetime.datetime.combine(day, datetime.time())
+    return start.strftime(TS_FORMAT), (start + datetime.timedelta(days=1)).strftime(TS_FORMAT)
+
+def load_logs_between(start, end) -> pd.DataFrame:
+    return get_pool().read_frame(
+        "SELECT * FROM audit_log WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp DESC, id DESC", (start, end))
+
+def count_logs_between(start, end, action=None) -> int:
+    if action is None:
+        return get_pool().query("SELECT COUNT(*) FROM audit_log WHERE timestamp >= ? AND timestamp < ?", (start, end))[0][0]
+    return get_pool().query("SELECT COUNT(*) FROM audit_log WHERE action = ? AND timestamp >= ? AND timestamp < ?",
+                            (action, start, end))[0][0]
+
+def load_today_logs():
+    df_log = load_logs_between(*day_bounds())
+    if df_log.empty: return pd.DataFrame()
+    df_log["timestamp"] = pd.to_datetime(df_log["timestamp"], errors="coerce")
+    return df_log
+
+def count_today_logs(): return count_logs_between(*day_bounds())
+
+# ================== Halaman Audit Log ==================
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def audit_where(roles=None, actions=None, search=""):
+    clauses, params = [], []
+    if roles:
+        clauses.append(f"role IN ({','.join(['?'] * len(roles))})"); params.extend(roles)
+    if actions:
+        clauses.append(f"action IN ({','.join(['?'] * len(actions))})"); params.extend(actions)
+    if search:
+        like = f"%{_escape_like(search)}%"
+        clauses.append("(user LIKE ? ESCAPE '\\' OR target LIKE ? ESCAPE '\\')"); params.extend([like, like])
+    return clauses, params
+
+def load_audit_page(roles=None, actions=None, search="", cursor=None, limit=PAGE_SIZE):
+    """Satu halaman log terbaru-dulu dengan paginasi keyset.
+
+    ``cursor`` adalah ``(timestamp, id)`` baris terakhir halaman sebelumnya;
+    mengembalikan ``(DataFrame, cursor_berikutnya_atau_None)``.
+    """
+    clauses, params = audit_where(roles, actions, search)
+    if cursor is not None:
+        clauses.append("(timestamp, id) < (?, ?)"); params.extend(cursor)
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    df = get_pool().read_frame(
+        f"SELECT * FROM audit_log{where} ORDER BY timestamp DESC, id DESC LIMIT ?", params + [int(limit) + 1])
+    next_cursor = None
+    if len(df) > limit:
+        df = df.iloc[:limit]
+        next_cursor = (df["timestamp"].iloc[-1], int(df["id"].iloc[-1]))
+    return df, next_cursor
+
+def audit_log_sql(roles=None, actions=None, search=""):
+    """SQL + parameter seluruh log terfilter (terbaru dulu), untuk dibaca utuh atau dialirkan ke ekspor."""
+    clauses, params = audit_where(roles, actions, search)
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    return f"SELECT * FROM audit_log{where} ORDER BY timestamp DESC, id DESC", params
+
+def load_audit_log(roles=None, actions=None, search=""):
+    return get_pool().read_frame(*audit_log_sql(roles, actions, search))
+
+def count_by_action(roles=None, actions=None, search="") -> pd.DataFrame:
+    clauses, params = audit_where(roles, actions, search)
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    return get_pool().read_frame(f"SELECT action, COUNT(*) AS Jumlah FROM audit_log{where} GROUP BY action", params)
+
+def distinct_audit_values(col) -> list:
+    if col not in ("role", "action"): raise ValueError(col)
+    return [r[0] for r in get_pool().query(f"SELECT DISTINCT {col} FROM audit_log WHERE {col} IS NOT NULL ORDER BY {col}")]
+
+def has_audit_log() -> bool:
+    return bool(get_pool().query("SELECT 1 FROM audit_log LIMIT 1"))
@@ -0,0 +1,130 @@
+"""Backup database: snapshot lewat SQLite online backup API, gzip, dedup, retensi dan jadwal."""
+import datetime
+import gzip
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+
+import pandas as pd
+
+from simpeg.db import get_pool
+from simpeg.metrics import record_error
+
+BACKUP_DIR = "backups"
+KEEP_LAST = 10
+KEEP_DAYS = 30
+INTERVAL_HOURS = float(os.environ.get("SIMPEG_BACKUP_INTERVAL_HOURS", "24") or 0)
+CHECK_SECONDS = 600
+
+# simpeg_<YYYYmmdd_HHMMSS>_<hash isi>.db.gz
+SNAPSHOT_RE = re.compile(r"^simpeg_(\d{8}_\d{6})_([0-9a-f]{16})\.db\.gz$")
+TS_FORMAT = "%Y%m%d_%H%M%S"
+
+# ================== Snapshot ==================
+def list_backups(backup_dir=BACKUP_DIR) -> pd.DataFrame:
+    """Snapshot yang ada, terbaru dulu: kolom file, waktu, hash, ukuran (byte)."""
+    rows = []
+    if os.path.isdir(backup_dir):
+        for name in os.listdir(backup_dir):
+            m = SNAPSHOT_RE.match(name)
+            if not m: continue
+            rows.append({"file": name, "waktu": datetime.datetime.strptime(m.group(1), TS_FORMAT),
+                         "hash": m.group(2), "ukuran": os.path.getsize(os.path.join(backup_dir, name))})
+    df = pd.DataFrame(rows, columns=["file","waktu","hash","ukuran"])
+    return df.sort_values("waktu", ascending=False, ignore_index=True)
+
+def _file_digest(path) -> str:
+    h = hashlib.blake2b(digest_size=8)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""): h.update(block)
+    return h.hexdigest()
+
+def create_backup(backup_dir=BACKUP_DIR, now=None) -> tuple:
+    """Buat snapshot konsisten seluruh database; mengembalikan ``(nama_file, baru)``.
+
+    Salinan dibuat dengan ``sqlite3.Connection.backup`` dari koneksi baca
+    (tidak menahan penulis di mode WAL), lalu di-gzip. Bila isinya sama
+    persis dengan snapshot terakhir, file baru dibuang dan ``baru=False``.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    fd, raw = tempfile.mkstemp(prefix=".snapshot_", suffix=".db", dir=backup_dir)
+    os.close(fd)
+    try:
+        dst = sqlite3.connect(raw)
+        try:
+            with get_pool().reader() as conn: conn.backup(dst)
+            dst.execute("PRAGMA journal_mode=DELETE")  # snapshot berdiri sendiri, tanpa file -wal
+        finally:
+            dst.close()
+        digest = _file_digest(raw)
+        latest = list_backups(backup_dir)
+        if not latest.empty and latest["hash"].iloc[0] == digest: return latest["file"].iloc[0], False
+        name = f"simpeg_{(now or datetime.datetime.now()).strftime(TS_FORMAT)}_{digest}.db.gz"
+        tmp_gz = os.path.join(backup_dir, f".{name}.tmp")
+        with open(raw, "rb") as src, gzip.open(tmp_gz, "wb", compresslevel=6) as out: shutil.copyfileobj(src, out)
+        os.replace(tmp_gz, os.path.join(backup_dir, name))
+        return name, True
+    finally:
+        if os.path.exists(raw): os.remove(raw)
+
+def apply_retention(backup_dir=BACKUP_DIR, keep_last=KEEP_LAST, keep_days=KEEP_DAYS, now=None) -> list:
+    """Simpan ``keep_last`` snapshot terbaru plus snapshot terakhir tiap hari selama ``keep_days`` hari.
+
+    Mengembalikan nama file yang dihapus.
+    """
+    df = list_backups(backup_dir)
+    if df.empty: return []
+    now = now or datetime.datetime.now()
+    keep = set(df["file"].head(keep_last))
+    recent = df[df["waktu"] >= now - datetime.timedelta(days=keep_days)]
+    keep.update(recent.groupby(recent["waktu"].dt.date)["file"].first())
+    removed = [f for f in df["file"] if f not in keep]
+    for f in removed: os.remove(os.path.join(backup_dir, f))
+    return removed
+
+def backup_now(backup_dir=BACKUP_DIR) -> tuple:
+    """Snapshot + retensi; dipakai tombol Backup dan penjadwal."""
+    name, created = create_backup(backup_dir)
+    apply_retention(backup_dir)
+    return name, created
+
+# ================== Jadwal ==================
+class BackupScheduler:
+    """Thread latar yang membuat snapshot bila snapshot terakhir lebih tua dari ``interval_hours``.
+
+    Umur dihitung dari file di ``backup_dir``, jadi restart proses tidak
+    memicu backup tambahan.
+    """
+
+    def __init__(self, interval_hours=INTERVAL_HOURS, backup_dir=BACKUP_DIR, check_seconds=CHECK_SECONDS):
+        self.interval = datetime.timedelta(hours=interval_hours)
+        self.backup_dir = backup_dir
+        self.check_seconds = check_seconds
+        self._stop = threading.Event()
+        self._thread = None
+
+    def due(self, now=None) -> bool:
+        latest = list_backups(self.backup_dir)
+        return latest.empty or (now or datetime.datetime.now()) - latest["waktu"].iloc[0] >= self.interval
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.due(): backup_now(self.backup_dir)
+            except Exception as e:
+                record_error("backup", "scheduled", e)
+            self._stop.wait(self.check_seconds)
+
+    def start(self):
+        if self.interval.total_seconds() <= 0 or (self._thread and self._thread.is_alive()): return self
+        self._thread = threading.Thread(target=self._run, name="backup-scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread: self._thread.join()
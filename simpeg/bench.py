@@ -0,0 +1,214 @@
+"""Benchmark headless jalur data tiap halaman di atas database sintetis ber-seed.
+
+Contoh::
+
+    python -m simpeg.bench --rows 100000 --audit 1000000 --out bench.json
+
+Database dan file hasil (ekspor, kartu, backup) dibuat di direktori kerja
+sementara; ``simpeg.db`` aplikasi tidak disentuh. Hasil berupa JSON: metadata
+lingkungan plus median/min detik dan jumlah baris per kasus.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from simpeg import db
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+PDF_ROWS = 200
+
+def _rows(value):
+    if isinstance(value, pd.DataFrame): return len(value)
+    if isinstance(value, tuple) and value and isinstance(value[0], pd.DataFrame): return len(value[0])
+    if isinstance(value, (bytes, str)): return None
+    if isinstance(value, (list, dict)): return len(value)
+    if isinstance(value, int): return value
+    return None
+
+class Bench:
+    """Kumpulan hasil; ``run`` mengukur satu kasus ``repeat`` kali."""
+
+    def __init__(self, repeat=3, only=None, log=None):
+        self.repeat, self.only, self.log = repeat, only, log
+        self.results = []
+
+    def run(self, name, fn, repeat=None, setup=None):
+        if self.only and not any(name.startswith(p) for p in self.only): return None
+        times, value = [], None
+        for _ in range(repeat or self.repeat):
+            if setup: setup()
+            t0 = time.perf_counter()
+            value = fn()
+            times.append(time.perf_counter() - t0)
+        res = {"name": name, "median_s": round(statistics.median(times), 6), "min_s": round(min(times), 6),
+               "runs": len(times), "rows": _rows(value)}
+        if isinstance(value, bytes): res["bytes"] = len(value)
+        elif isinstance(value, str) and os.path.isfile(value): res["bytes"] = os.path.getsize(value)
+        self.results.append(res)
+        if self.log: self.log(f"{name:<32} {res['median_s']:>10.4f}s  rows={res['rows']}")
+        return value
+
+# ================== Kasus ==================
+def bench_reads(b: Bench):
+    from simpeg import audit, query, search, stats
+
+    b.run("load_data", db.load_data)
+    b.run("dashboard.total_gender", lambda: (stats.total_pegawai(), stats.stat_counts("gender")))
+    b.run("grafik.pendidikan", lambda: stats.stat_counts("pendidikan"))
+    b.run("grafik.usia", stats.age_bucket_counts)
+    b.run("grafik.unor_jabatan", lambda: (stats.stat_counts("unor_induk"), stats.stat_counts("jenis_jabatan")))
+    units = stats.tmt_units("TMT JABATAN")[:3]
+    b.run("rekap.yearly", lambda: stats.tmt_yearly("TMT JABATAN"))
+    b.run("rekap.monthly", lambda: stats.tmt_monthly("TMT JABATAN", datetime.date.today().year - 1))
+    b.run("rekap.by_unit", lambda: stats.tmt_yearly_by_unit("TMT JABATAN", units))
+
+    unor = query.distinct_values("UNOR INDUK")[:2]
+    cols = ["NIP","NAMA","NAMA JABATAN","UNOR INDUK","TINGKAT PENDIDIKAN"]
+    b.run("laporan.filter_unor", lambda: query.query_pegawai(cols, {"UNOR INDUK": unor}))
+    b.run("laporan.filter_search", lambda: query.query_pegawai(cols, {"UNOR INDUK": unor}, "maria"))
+    b.run("laporan.age_range", lambda: query.query_pegawai(cols, {"TANGGAL LAHIR": query.age_range(30, 40)}))
+    b.run("laporan.retirement", lambda: query.query_pegawai(cols, {"TANGGAL LAHIR": query.retirement_range()}))
+    tmt = query.date_range(datetime.date.today() - datetime.timedelta(days=365), datetime.date.today())
+    b.run("laporan.tmt_range", lambda: query.query_pegawai(cols, {"TMT JABATAN": tmt}))
+    b.run("laporan.all_columns", lambda: query.query_pegawai(db.EXPECTED_COLS))
+    from simpeg import columnar
+    b.run("analytics.build", columnar.build_snapshot, repeat=1)
+    snap = columnar.analytics_snapshot()
+    b.run("analytics.open_mmap", lambda: columnar.AnalyticsSnapshot(snap.path))
+    filters = {"UNOR INDUK": unor, "TANGGAL LAHIR": query.age_range(30, 40)}
+    b.run("analytics.counts_filtered", lambda: snap.value_counts("JENIS JABATAN", filters))
+    b.run("analytics.frame_3cols", lambda: snap.frame(["UNOR INDUK","JENIS JABATAN","TMT JABATAN"]))
+    b.run("laporan.counts_sql", lambda: query.query_pegawai(["JENIS JABATAN"], filters)["JENIS JABATAN"].value_counts())
+    from simpeg import figures
+    def unit_figure():
+        import plotly.express as px
+        df = stats.stat_counts("unor_induk")
+        return px.bar(df, x="key", y="jumlah", color="key", title="Pegawai per Unit Organisasi")
+    cache = figures.get_figure_cache()
+    b.run("figure.unit_miss", lambda: figures.cached_figure("bench", "unit", unit_figure), setup=cache.clear)
+    b.run("figure.unit_hit", lambda: figures.cached_figure("bench", "unit", unit_figure))
+    b.run("pegawai.grid_first", lambda: query.page_pegawai(query.GRID_COLS))
+    b.run("pegawai.grid_deep", lambda: query.page_pegawai(query.GRID_COLS, sort_col="TANGGAL LAHIR", page=10**9))
+    b.run("pegawai.grid_search", lambda: query.page_pegawai(query.GRID_COLS, search="guru"))
+    b.run("search.prefix", lambda: search.search("sant"))
+    b.run("search.fuzzy", lambda: search.search("nurhayti"))
+    nip = db.get_pool().query("SELECT NIP FROM pegawai LIMIT 1")
+    if nip: b.run("search.resolve_nip", lambda: search.resolve_nip(nip[0][0].lstrip("'")))
+
+    b.run("audit.first_page", audit.load_audit_page)
+    b.run("audit.filtered_page", lambda: audit.load_audit_page(actions=["UPDATE"], search="admin"))
+    b.run("audit.today", audit.count_today_logs)
+    b.run("audit.by_action", audit.count_by_action)
+
+def bench_files(b: Bench, pdf_rows=PDF_ROWS, workers=None):
+    from simpeg import audit, backup, cards, export, profiles, query
+
+    cols = ["NIP","NAMA","NAMA JABATAN","UNOR INDUK","TINGKAT PENDIDIKAN"]
+    sql, params = query.pegawai_sql(cols)
+    b.run("export.laporan_csv", lambda: export.export_bytes("csv", sql, params))
+    b.run("export.laporan_xlsx", lambda: export.export_bytes("xlsx", sql, params), repeat=1)
+    full_sql, full_params = query.pegawai_sql(db.EXPECTED_COLS)
+    b.run("export.backup_csv", lambda: export.export_bytes("csv", full_sql, full_params), repeat=1)
+    b.run("export.audit_csv", lambda: export.export_bytes("csv", *audit.audit_log_sql()), repeat=1)
+
+    sample = query.query_pegawai(db.EXPECTED_COLS, limit=pdf_rows).to_dict("records")
+    if sample:
+        b.run("pdf.profile_single", lambda: profiles.generate_pdf_resmi(sample[0]))
+        b.run("pdf.idcard_single", lambda: cards.generate_id_card(sample[0]))
+        b.run("pdf.profiles_zip", lambda: profiles.export_profiles(sample, "exports/bench_profil.zip", workers).rendered,
+              repeat=1, setup=lambda: os.path.exists("exports/bench_profil.zip") and os.remove("exports/bench_profil.zip"))
+        b.run("pdf.profiles_zip_reuse", lambda: profiles.export_profiles(sample, "exports/bench_profil.zip", workers).reused,
+              repeat=1)
+        b.run("pdf.idcards_sheet", lambda: cards.build_id_cards(sample, "sheet", "exports/bench_kartu.pdf", workers), repeat=1)
+    b.run("backup.snapshot", lambda: backup.create_backup("backups")[0], repeat=1)
+
+def bench_import(b: Bench, work_dir):
+    """Impor dan restore dijalankan terakhir karena mengubah isi database."""
+    from simpeg import export, importer, query
+
+    path = os.path.join(work_dir, "backup_pegawai.csv")
+    n = export.write_csv(path, *query.pegawai_sql(db.EXPECTED_COLS))
+    def run_import():
+        with open(path, "rb") as f: return importer.import_file(f, "backup_pegawai.csv", "upsert").rows
+    b.run("import.csv_upsert", run_import, repeat=1)
+    # Restore dengan 1% baris berubah dan 1% baris hilang dari file
+    changed = os.path.join(work_dir, "restore_pegawai.csv")
+    df = pd.read_csv(path, dtype=str)
+    step = max(n // 100, 1)
+    df.loc[df.index[::step], "ALAMAT"] = "JL. BENCHMARK"
+    df.drop(df.index[1::step]).to_csv(changed, index=False)
+    def run_restore():
+        with open(changed, "rb") as f: plan = importer.plan_restore(f, "restore_pegawai.csv")
+        return sum(len(v) for v in importer.apply_restore(plan).values())
+    b.run("restore.plan_apply", run_restore, repeat=1)
+
+# ================== CLI ==================
+def environment() -> dict:
+    return {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version, "pandas": pd.__version__,
+            "platform": platform.platform(), "cpus": os.cpu_count()}
+
+def run(rows, audit_rows, seed=42, repeat=3, only=None, pdf_rows=PDF_ROWS, workers=None, db_path=None, log=None) -> dict:
+    """Bangun database sintetis (atau pakai ``db_path`` yang sudah ada) lalu jalankan semua kasus."""
+    from simpeg import audit, synthetic
+    audit.set_sync_mode(True)
+    cwd, old_db = os.getcwd(), db.DB_FILE
+    db_path = os.path.abspath(db_path) if db_path else None
+    work_dir = tempfile.mkdtemp(prefix="simpeg_bench_")
+    b = Bench(repeat, only, log)
+    meta = {"rows": rows, "audit_rows": audit_rows, "seed": seed, "repeat": repeat, "pdf_rows": pdf_rows,
+            "started": datetime.datetime.now().isoformat(timespec="seconds"), **environment()}
+    try:
+        os.chdir(work_dir)
+        reuse = db_path is not None and os.path.exists(db_path)
+        db.DB_FILE = db_path or os.path.join(work_dir, "bench.db")
+        t0 = time.perf_counter()
+        db.init_db()
+        if not reuse: synthetic.fill_database(rows, audit_rows, seed)
+        meta["generate_s"] = round(time.perf_counter() - t0, 3)
+        meta["rows"] = db.get_pool().query("SELECT COUNT(*) FROM pegawai")[0][0]
+        meta["audit_rows"] = db.get_pool().query("SELECT COUNT(*) FROM audit_log")[0][0]
+        if log: log(f"data siap: {meta['rows']} pegawai, {meta['audit_rows']} audit ({meta['generate_s']}s)")
+        bench_reads(b)
+        bench_files(b, pdf_rows, workers)
+        if not reuse: bench_import(b, work_dir)
+    finally:
+        db.get_pool().close()
+        db.DB_FILE = old_db
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {"meta": meta, "results": b.results}
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m simpeg.bench", description=__doc__.splitlines()[0])
+    p.add_argument("--size", choices=sorted(SIZES), help="ukuran preset: 10k, 100k, 1m pegawai")
+    p.add_argument("--rows", type=int, default=10_000, help="jumlah pegawai sintetis")
+    p.add_argument("--audit", type=int, default=None, help="jumlah baris audit log (default 10x pegawai)")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--only", default="", help="prefiks nama kasus dipisah koma, mis. grafik,laporan")
+    p.add_argument("--pdf-rows", type=int, default=PDF_ROWS, help="jumlah pegawai untuk kasus PDF/ID card")
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--db", default=None, help="pakai database ini apa adanya (hanya kasus baca dan file)")
+    p.add_argument("--out", default="-", help="file JSON hasil (default stdout)")
+    args = p.parse_args(argv)
+    rows = SIZES[args.size] if args.size else args.rows
+    audit_rows = args.audit if args.audit is not None else rows * 10
+    report = run(rows, audit_rows, args.seed, args.repeat, [s for s in args.only.split(",") if s], args.pdf_rows,
+                 args.workers, args.db, log=lambda msg: print(msg, file=sys.stderr))
+    text = json.dumps(report, indent=2)
+    if args.out == "-": print(text)
+    else:
+        with open(args.out, "w", encoding="utf-8") as f: f.write(text + "\n")
+
+if __name__ == "__main__":
+    main()
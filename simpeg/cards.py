@@ -0,0 +1,109 @@
+"""ID card pegawai: satu kartu, atau massal per unit/jabatan/daftar NIP dengan process pool."""
+import os
+import re
+import tempfile
+import zipfile
+
+from simpeg.metrics import timed
+from simpeg.parallel import default_workers, map_chunks
+from simpeg.photos import photo_path
+
+CARD_W, CARD_H = 85, 54
+PHOTO_W, PHOTO_H = 18, 22
+CARD_FIELDS = ["NIP","NAMA","NAMA JABATAN","NAMA UNOR","FOTO"]
+
+# Lembar A4 2 kolom x 5 baris, dengan jarak potong di antara kartu
+SHEET_COLS, SHEET_ROWS = 2, 5
+CARDS_PER_SHEET = SHEET_COLS * SHEET_ROWS
+SHEET_GAP_X, SHEET_GAP_Y = 5, 2
+
+CHUNK_CARDS = 100
+
+# ================== Satu Kartu ==================
+def _text(v) -> str:
+    v = "" if v is None or (isinstance(v, float) and v != v) else str(v).strip()
+    return v.encode("latin-1", "replace").decode("latin-1")
+
+def draw_card(pdf, pegawai, x=0, y=0, foto_path=None):
+    """Gambar satu kartu di posisi (x, y) halaman aktif ``pdf``."""
+    pdf.set_fill_color(33,150,243); pdf.rect(x,y,CARD_W,CARD_H,"F")
+    foto_path = foto_path or photo_path(pegawai.get("FOTO"), "idcard")
+    if foto_path and os.path.exists(foto_path):
+        try: pdf.image(foto_path,x=x+5,y=y+6,w=PHOTO_W,h=PHOTO_H)
+        except Exception: pass
+    nama=_text(pegawai.get("NAMA",""))
+    nip=_text(pegawai.get("NIP",""))
+    jabatan=_text(pegawai.get("NAMA JABATAN",""))
+    unit=_text(pegawai.get("NAMA UNOR",""))
+    pdf.set_text_color(255,255,255)
+    pdf.set_font("Arial","B",10); pdf.text(x+28,y+12,nama[:30])
+    pdf.set_font("Arial","",8)
+    pdf.text(x+28,y+17,f"NIP: {nip[:28]}")
+    pdf.text(x+28,y+22,f"Jabatan: {jabatan[:28]}")
+    pdf.text(x+28,y+27,f"Unit: {unit[:28]}")
+    pdf.set_font("Arial","B",8); pdf.text(x+5,y+50,"SIMPEG - Kartu Pegawai")
+
+@timed("pdf")
+def generate_id_card(pegawai, foto_path=None) -> bytes:
+    from fpdf import FPDF
+    pdf=FPDF("P","mm",(CARD_W,CARD_H)); pdf.set_auto_page_break(False); pdf.add_page()
+    draw_card(pdf, pegawai, foto_path=foto_path)
+    return pdf.output(dest="S").encode("latin-1")
+
+def card_filename(pegawai) -> str:
+    return f"idcard_{re.sub(r'[^0-9A-Za-z_-]', '', str(pegawai.get('NIP','')))}.pdf"
+
+# ================== Massal ==================
+def _render_chunk(job):
+    """Pekerja: pastikan turunan foto ID card ada, lalu (layout "zip") render PDF per kartu."""
+    layout, rows = job
+    out = []
+    for pegawai in rows:
+        foto = photo_path(pegawai.get("FOTO"), "idcard")
+        if layout == "zip": out.append((card_filename(pegawai), generate_id_card(pegawai, foto)))
+        else: out.append((pegawai, foto))
+    return out
+
+def sheet_position(i):
+    """Posisi (x, y) kartu ke-i pada lembar A4, rata tengah."""
+    col, row = i % SHEET_COLS, (i // SHEET_COLS) % SHEET_ROWS
+    x0 = (210 - SHEET_COLS * CARD_W - (SHEET_COLS - 1) * SHEET_GAP_X) / 2
+    y0 = (297 - SHEET_ROWS * CARD_H - (SHEET_ROWS - 1) * SHEET_GAP_Y) / 2
+    return x0 + col * (CARD_W + SHEET_GAP_X), y0 + row * (CARD_H + SHEET_GAP_Y)
+
+@timed("pdf")
+def build_id_cards(rows, layout="zip", out_path=None, workers=None, chunk_cards=CHUNK_CARDS, progress=None) -> str:
+    """Render kartu untuk ``rows`` (list dict pegawai) ke file di disk, mengembalikan path-nya.
+
+    ``layout="zip"``: ZIP berisi satu PDF per pegawai, dirender paralel.
+    ``layout="sheet"``: satu PDF A4 dengan 10 kartu per halaman; turunan foto
+    disiapkan paralel, halaman disusun dalam satu dokumen sehingga tiap foto
+    hanya disematkan sekali. ``progress(selesai, total)`` dipanggil per chunk.
+    """
+    if layout not in ("zip", "sheet"): raise ValueError(layout)
+    rows = list(rows)
+    workers = workers or default_workers()
+    if out_path is None:
+        fd, out_path = tempfile.mkstemp(prefix="idcard_", suffix=".zip" if layout == "zip" else ".pdf")
+        os.close(fd)
+    jobs = [(layout, rows[i:i + chunk_cards]) for i in range(0, len(rows), chunk_cards)]
+    done = 0
+    if layout == "zip":
+        with zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for result in map_chunks(_render_chunk, jobs, workers):
+                for name, data in result: zf.writestr(name, data)
+                done += len(result)
+                if progress: progress(done, len(rows))
+    else:
+        from fpdf import FPDF
+        pdf = FPDF("P","mm","A4"); pdf.set_auto_page_break(False)
+        for result in map_chunks(_render_chunk, jobs, workers):
+            for pegawai, foto in result:
+                if done % CARDS_PER_SHEET == 0: pdf.add_page()
+                x, y = sheet_position(done)
+                draw_card(pdf, pegawai, x, y, foto)
+                done += 1
+            if progress: progress(done, len(rows))
+        if not rows: pdf.add_page()
+        pdf.output(out_path, "F")
+    return out_path
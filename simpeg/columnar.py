@@ -0,0 +1,205 @@
+"""Snapshot analitik kolumnar: tabel pegawai sebagai file Arrow IPC yang di-memory-map.
+
+File ditulis sekali per versi data (``table_version``) dan dibuka lewat
+``pyarrow.memory_map``: semua proses membaca halaman file yang sama dari page
+cache, dan pembaca hanya menyentuh kolom yang diminta tanpa menyalin buffer.
+Kolom dimensi disimpan dictionary-encoded, tanggal sebagai ``date32`` dan masa
+kerja sebagai ``int32``.
+"""
+import glob
+import hashlib
+import os
+import threading
+
+import pandas as pd
+
+from simpeg.db import EXPECTED_COLS, get_pool, quote_ident, table_version
+from simpeg.metrics import timed
+from simpeg.normalize import DATE_COLS, INT_COLS
+
+ANALYTICS_DIR = "analytics"
+BATCH_ROWS = 65536
+# Kolom berkardinalitas rendah: disimpan sebagai dictionary (indeks int32 + kamus nilai)
+DICT_COLS = ["JENIS KELAMIN","AGAMA","JENIS KAWIN","TEMPAT LAHIR","JENIS PEGAWAI","KEDUDUKAN HUKUM","STATUS CPNS PNS",
+             "GOL AWAL","GOL AKHIR","JENIS JABATAN","NAMA JABATAN","TINGKAT PENDIDIKAN","NAMA PENDIDIKAN","NAMA UNOR",
+             "UNOR INDUK"]
+# FOTO hanya path file, tidak dipakai analitik
+ANALYTICS_COLS = [c for c in EXPECTED_COLS if c != "FOTO"]
+
+def _schema():
+    import pyarrow as pa
+    def kind(col):
+        if col in DATE_COLS: return pa.date32()
+        if col in INT_COLS: return pa.int32()
+        return pa.string()
+    return pa.schema([pa.field(c, kind(c)) for c in ANALYTICS_COLS])
+
+def _batch(rows, schema):
+    import pyarrow as pa
+    columns = list(zip(*rows))
+    arrays = []
+    for col, field, values in zip(ANALYTICS_COLS, schema, columns):
+        if col in DATE_COLS:
+            # Kolom tanggal sudah ISO 'YYYY-MM-DD' (skema bertipe); cast string -> date32 di C
+            arrays.append(pa.array(values, pa.string()).cast(pa.date32()))
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def snapshot_path(db_path, version, directory=ANALYTICS_DIR) -> str:
+    key = hashlib.blake2b(os.path.abspath(db_path).encode("utf-8"), digest_size=4).hexdigest()
+    return os.path.join(directory, f"pegawai_{key}_v{version}.arrow")
+
+@timed("analytics", "build_snapshot")
+def build_snapshot(directory=ANALYTICS_DIR, batch_rows=BATCH_ROWS) -> str:
+    """Tulis snapshot Arrow IPC untuk versi data saat ini; mengembalikan path file.
+
+    Baris dialirkan dari cursor per ``batch_rows``; kolom dimensi di-dictionary-encode
+    sekali atas seluruh kolom agar semua batch memakai kamus yang sama. File ditulis
+    ke nama sementara lalu ``os.replace`` sehingga pembaca tidak pernah melihat file setengah jadi.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    pool = get_pool()
+    schema = _schema()
+    select = ",".join(quote_ident(c) for c in ANALYTICS_COLS)
+    with pool.reader() as conn:
+        own_txn = not conn.in_transaction
+        if own_txn: conn.execute("BEGIN")
+        try:
+            version = table_version(conn)
+            cur = conn.execute(f"SELECT {select} FROM pegawai ORDER BY rowid")
+            batches = []
+            while True:
+                rows = cur.fetchmany(batch_rows)
+                if not rows: break
+                batches.append(_batch(rows, schema))
+        finally:
+            if own_txn: conn.execute("COMMIT")
+    table = pa.Table.from_batches(batches, schema=schema).combine_chunks()
+    for col in DICT_COLS:
+        i = table.schema.get_field_index(col)
+        table = table.set_column(i, col, pc.dictionary_encode(table.column(i)))
+    table = table.replace_schema_metadata({"version": str(version), "rows": str(table.num_rows)})
+    os.makedirs(directory, exist_ok=True)
+    path = snapshot_path(pool.path, version, directory)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=batch_rows)
+    os.replace(tmp, path)
+    return path
+
+def _cleanup(path, keep=2):
+    # Hanya versi di luar ``keep`` terbaru yang dihapus: generasi sebelumnya dibiarkan untuk proses
+    # yang baru saja membaca versi lama dan sedang membukanya
+    prefix = path.rsplit("_v", 1)[0]
+    def version(name):
+        try: return int(name[len(prefix) + 2:-len(".arrow")])
+        except ValueError: return -1
+    for old in sorted(glob.glob(f"{prefix}_v*.arrow"), key=version, reverse=True)[keep:]:
+        if old != path:
+            try: os.remove(old)
+            except OSError: pass
+
+class AnalyticsSnapshot:
+    """Tabel Arrow yang di-memory-map pada satu versi data; hanya-baca dan dipakai bersama semua sesi."""
+    __slots__ = ("table", "version", "path")
+
+    def __init__(self, path):
+        import pyarrow as pa
+        self.path = path
+        with pa.memory_map(path, "r") as source: self.table = pa.ipc.open_file(source).read_all()
+        self.version = int(self.table.schema.metadata[b"version"])
+
+    @property
+    def num_rows(self) -> int: return self.table.num_rows
+
+    def select(self, cols, filters=None):
+        """Tabel Arrow berisi ``cols`` saja, disaring dengan ``filters`` seperti ``query.build_where``."""
+        table = self.table
+        mask = _mask(table, filters)
+        if mask is not None: table = table.filter(mask)
+        return table.select(list(cols))
+
+    def frame(self, cols, filters=None) -> pd.DataFrame:
+        """DataFrame ``cols`` dengan dtype ``pd.ArrowDtype``: buffer kolom dibagi dengan file, tidak disalin."""
+        return self.select(cols, filters).to_pandas(types_mapper=pd.ArrowDtype)
+
+    def value_counts(self, col, filters=None) -> pd.DataFrame:
+        """Kolom ``key`` dan ``jumlah`` (nilai di-strip, kosong dibuang), terbanyak dulu, seperti ``stats.stat_counts``."""
+        import pyarrow.compute as pc
+        # Dihitung langsung atas indeks dictionary; strip cukup pada kunci hasil
+        counts = pc.value_counts(self.select([col], filters).column(0))
+        df = pd.DataFrame({"key": counts.field("values").to_pylist(), "jumlah": counts.field("counts").to_pylist()})
+        df = df[df["key"].notna()]
+        df["key"] = df["key"].astype(str).str.strip()
+        df = df[df["key"] != ""]
+        df = df.groupby("key", as_index=False)["jumlah"].sum()
+        return df.sort_values(["jumlah", "key"], ascending=[False, True], ignore_index=True)
+
+def _mask(table, filters):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    mask = None
+    for col, values in (filters or {}).items():
+        if not values: continue
+        column = table.column(col)
+        if isinstance(values, tuple):
+            lo, hi = values
+            if column.type == pa.date32():
+                lo, hi = (None if v is None else pa.scalar(pd.Timestamp(v).date(), pa.date32()) for v in (lo, hi))
+            parts = ([pc.greater_equal(column, lo)] if lo is not None else []) + ([pc.less_equal(column, hi)] if hi is not None else [])
+        else:
+            value_type = column.type.value_type if pa.types.is_dictionary(column.type) else column.type
+            parts = [pc.is_in(column, value_set=pa.array([str(v) for v in values], value_type))]
+        for part in parts: mask = part if mask is None else pc.and_(mask, part)
+    return None if mask is None else pc.fill_null(mask, False)
+
+class ColumnarStore:
+    """Satu snapshot kolumnar per proses; dibangun ulang (atau dibuka dari file proses lain) saat versi data berubah."""
+
+    def __init__(self, directory=ANALYTICS_DIR):
+        self.directory = directory
+        self._snap = None
+        self._path = None
+        self._lock = threading.Lock()
+
+    def _version(self, pool) -> int:
+        with pool.reader() as conn: return table_version(conn)
+
+    def current(self) -> AnalyticsSnapshot:
+        pool = get_pool()
+        version = self._version(pool)
+        snap = self._snap
+        if snap is not None and self._path == pool.path and snap.version == version: return snap
+        with self._lock:
+            snap = self._snap
+            if snap is None or self._path != pool.path or snap.version != version:
+                snap = self._snap = self._open(pool, version)
+                self._path = pool.path
+                _cleanup(snap.path)
+            return snap
+
+    def _open(self, pool, version, attempts=3) -> AnalyticsSnapshot:
+        # File bisa terhapus proses lain antara exists() dan memory_map; ulangi dengan versi terbaru
+        for attempt in range(attempts):
+            path = snapshot_path(pool.path, version, self.directory)
+            try:
+                if not os.path.exists(path): path = build_snapshot(self.directory)
+                return AnalyticsSnapshot(path)
+            except FileNotFoundError:
+                if attempt == attempts - 1: raise
+                version = self._version(pool)
+
+    def invalidate(self):
+        with self._lock: self._snap = None
+
+_store = ColumnarStore()
+
+def get_columnar() -> ColumnarStore: return _store
+
+def analytics_snapshot() -> AnalyticsSnapshot: return _store.current()
+
+def analytics_frame(cols, filters=None) -> pd.DataFrame: return _store.current().frame(cols, filters)
+
+def analytics_counts(col, filters=None) -> pd.DataFrame: return _store.current().value_counts(col, filters)
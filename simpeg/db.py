@@ -0,0 +1,538 @@
+"""Akses data SQLite: pool koneksi per proses (WAL) dan helper tabel pegawai."""
+import hashlib
+import queue
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from simpeg.metrics import observe, sql_label
+from simpeg.normalize import DATE_COLS, EDUCATION_LABELS, GENDER_LABELS, INT_COLS, TYPED_COLS, typed_value
+
+# ================== Struktur Data ==================
+DB_FILE = "simpeg.db"
+
+EXPECTED_COLS = [
+    "NAMA","NIP","GELAR DEPAN","GELAR BELAKANG","TEMPAT LAHIR","TANGGAL LAHIR",
+    "JENIS KELAMIN","AGAMA","JENIS KAWIN","NIK","NOMOR HP","EMAIL","ALAMAT",
+    "NPWP","BPJS","JENIS PEGAWAI","KEDUDUKAN HUKUM","STATUS CPNS PNS",
+    "KARTU ASN VIRTUAL","TMT CPNS","TMT PNS","GOL AWAL","GOL AKHIR",
+    "TMT GOLONGAN","MK TAHUN","MK BULAN","JENIS JABATAN","NAMA JABATAN",
+    "TMT JABATAN","TINGKAT PENDIDIKAN","NAMA PENDIDIKAN","NAMA UNOR","UNOR INDUK","FOTO"
+]
+
+BUSY_TIMEOUT_MS = 5000
+WRITE_RETRIES = 5
+MAX_READERS = 8
+STATEMENT_CACHE = 256
+
+# Kolom filter Laporan yang diberi indeks sekunder
+INDEXED_COLS = ["UNOR INDUK","NAMA JABATAN","JENIS JABATAN","TINGKAT PENDIDIKAN","NAMA"]
+
+# Kolom indeks full-text (FTS5) -> kolom asal di tabel pegawai
+SEARCH_FIELDS = {"nama": "NAMA", "nip": "NIP", "nik": "NIK", "jabatan": "NAMA JABATAN"}
+# Kolom FTS yang dipakai pencarian toleran salah ketik (token NIP/NIK berupa angka tidak ikut)
+FUZZY_FIELDS = ["nama", "jabatan"]
+
+# ================== Pool Koneksi ==================
+def _is_busy(err: Exception) -> bool:
+    msg = str(err).lower()
+    return "locked" in msg or "busy" in msg
+
+def with_retry(fn, retries=WRITE_RETRIES, base_delay=0.05):
+    """Jalankan fn(), ulangi dengan backoff bila SQLite melaporkan locked/busy."""
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e) or attempt == retries: raise
+            time.sleep(base_delay * (2 ** attempt))
+
+class ConnectionPool:
+    """Pool koneksi SQLite per proses.
+
+    Koneksi baca dipinjam per thread (reentrant, dibatasi ``max_readers``),
+    sedangkan semua tulis lewat satu koneksi penulis yang diserialkan dengan
+    lock dan transaksi ``BEGIN IMMEDIATE``. Journal diset ke WAL supaya
+    pembaca tidak saling blokir dengan penulis.
+    """
+
+    def __init__(self, path, max_readers=MAX_READERS, busy_timeout_ms=BUSY_TIMEOUT_MS, retries=WRITE_RETRIES):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.retries = retries
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_readers)
+        self._local = threading.local()
+        self._write_lock = threading.RLock()
+        self._writer = None
+        self._all = []
+        self._all_lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None,
+                               check_same_thread=False, cached_statements=STATEMENT_CACHE)
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        with_retry(lambda: conn.execute("PRAGMA journal_mode=WAL"), self.retries)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # REPLACE memicu trigger DELETE sehingga indeks turunan tetap sinkron
+        conn.execute("PRAGMA recursive_triggers=ON")
+        conn.create_function("row_hash", -1, row_hash, deterministic=True)
+        with self._all_lock: self._all.append(conn)
+        return conn
+
+    @contextmanager
+    def reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            # Pemanggilan bersarang di thread yang sama memakai koneksi yang sama
+            yield conn
+            return
+        self._slots.acquire()
+        try:
+            try: conn = self._idle.get_nowait()
+            except queue.Empty: conn = self._connect()
+            self._local.conn = conn
+            try:
+                yield conn
+            finally:
+                self._local.conn = None
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def writer(self):
+        with self._write_lock:
+            if getattr(self._local, "writing", False):
+                yield self._writer
+                return
+            if self._writer is None: self._writer = self._connect()
+            conn = self._writer
+            with_retry(lambda: conn.execute("BEGIN IMMEDIATE"), self.retries)
+            prev = getattr(self._local, "conn", None)
+            self._local.conn, self._local.writing = conn, True
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            else:
+                with_retry(lambda: conn.execute("COMMIT"), self.retries)
+            finally:
+                self._local.conn, self._local.writing = prev, False
+
+    # Tiap helper mencatat latensi (termasuk menunggu koneksi/lock) dan jumlah baris ke simpeg.metrics
+    def query(self, sql, params=()):
+        t0 = time.perf_counter()
+        with self.reader() as conn: rows = conn.execute(sql, params).fetchall()
+        observe("query", sql_label(sql), time.perf_counter() - t0, len(rows))
+        return rows
+
+    def read_frame(self, sql, params=()):
+        t0 = time.perf_counter()
+        with self.reader() as conn: df = pd.read_sql_query(sql, conn, params=params)
+        observe("query", sql_label(sql), time.perf_counter() - t0, len(df))
+        return df
+
+    def execute(self, sql, params=()):
+        t0 = time.perf_counter()
+        with self.writer() as conn: n = conn.execute(sql, params).rowcount
+        observe("query", sql_label(sql), time.perf_counter() - t0, max(n, 0))
+        return n
+
+    def executemany(self, sql, rows):
+        t0 = time.perf_counter()
+        with self.writer() as conn: n = conn.executemany(sql, rows).rowcount
+        observe("query", sql_label(sql), time.perf_counter() - t0, max(n, 0))
+        return n
+
+    def close(self):
+        with self._write_lock, self._all_lock:
+            for conn in self._all:
+                try: conn.close()
+                except sqlite3.Error: pass
+            self._all.clear()
+            self._writer = None
+            self._idle = queue.LifoQueue()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """Pool tunggal per proses untuk ``DB_FILE`` saat ini (dibuat ulang jika path berubah)."""
+    global _pool
+    pool = _pool
+    if pool is None or pool.path != DB_FILE:
+        with _pool_lock:
+            if _pool is None or _pool.path != DB_FILE:
+                if _pool is not None: _pool.close()
+                _pool = ConnectionPool(DB_FILE)
+            pool = _pool
+    return pool
+
+# ================== Konversi Nilai ==================
+def sql_value(v):
+    if v is None: return None
+    if isinstance(v, (pd.Timestamp, np.datetime64)):
+        return None if pd.isna(v) else pd.Timestamp(v).strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(v, np.generic): v = v.item()
+    if isinstance(v, float) and v != v: return None
+    if v is pd.NA or v is pd.NaT: return None
+    return v
+
+def row_hash(*values) -> str:
+    """Hash isi satu baris; NULL dan string kosong dianggap sama. Terdaftar juga sebagai fungsi SQL ``row_hash``."""
+    h = hashlib.blake2b(digest_size=16)
+    for v in values:
+        v = sql_value(v)
+        h.update(b"" if v is None else str(v).encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+def db_value(col, v):
+    """Nilai siap tulis ke kolom ``col``: tanggal -> 'YYYY-MM-DD', masa kerja -> int (``ValueError`` bila tidak valid)."""
+    return typed_value(col, sql_value(v))
+
+def frame_rows(df: pd.DataFrame, cols):
+    df = df.reindex(columns=cols)
+    return [tuple(db_value(c, v) for c, v in zip(cols, row)) for row in df.itertuples(index=False, name=None)]
+
+@lru_cache(maxsize=64)
+def upsert_sql(cols: tuple) -> str:
+    # Teks SQL yang identik dipakai ulang oleh cache prepared statement sqlite3.
+    # UPSERT (bukan INSERT OR REPLACE) menjaga rowid dan memicu trigger UPDATE.
+    quoted_cols = ",".join(quote_ident(c) for c in cols)
+    placeholders = ",".join(["?"] * len(cols))
+    updates = ",".join(f"{quote_ident(c)}=excluded.{quote_ident(c)}" for c in cols if c != "NIP")
+    return (f"INSERT INTO pegawai ({quoted_cols}) VALUES ({placeholders}) "
+            f"ON CONFLICT(NIP) DO UPDATE SET {updates}")
+
+# ================== Skema & Migrasi ==================
+def create_base_tables():
+    with get_pool().writer() as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS pegawai (NIP TEXT PRIMARY KEY)")
+        conn.execute("""CREATE TABLE IF NOT EXISTS audit_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user TEXT, role TEXT, action TEXT, target TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)""")
+        # Range scan per waktu/aksi dan paginasi keyset (timestamp, id) di audit log
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_timestamp ON audit_log (timestamp)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_action_timestamp ON audit_log (action, timestamp)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_role ON audit_log (role)")
+        # Versi data per tabel, dinaikkan trigger pada setiap perubahan pegawai/users
+        # (juga dari proses lain) sehingga snapshot dan cache bersama tahu kapan harus dibangun ulang.
+        conn.execute("CREATE TABLE IF NOT EXISTS table_version (name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)")
+        conn.execute("""CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY, password_hash TEXT NOT NULL, role TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP)""")
+        for table in ("pegawai", "users"):
+            conn.execute("INSERT OR IGNORE INTO table_version (name, version) VALUES (?, 0)", (table,))
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table}
+                    BEGIN UPDATE table_version SET version = version + 1 WHERE name = '{table}'; END""")
+
+# Langkah ke-n membawa database ke PRAGMA user_version = n. Langkah lama tidak
+# pernah diubah; perubahan skema berikutnya ditambahkan di akhir daftar. Semua
+# langkah idempoten, sehingga database lama (user_version 0) ikut termigrasi.
+MIGRATIONS = [
+    create_base_tables,
+    lambda: (ensure_columns(), ensure_indexes()),
+    lambda: ensure_search_index(),
+    lambda: ensure_stats_tables(),
+    lambda: ensure_tmt_cube(),
+    lambda: migrate_typed_columns(),
+    lambda: ensure_search_vocab(),
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def schema_version() -> int:
+    with get_pool().reader() as conn: return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate() -> tuple:
+    """Jalankan migrasi yang belum diterapkan dalam satu transaksi tulis; mengembalikan ``(versi_awal, versi_akhir)``."""
+    if schema_version() >= SCHEMA_VERSION: return SCHEMA_VERSION, SCHEMA_VERSION
+    with get_pool().writer() as conn:
+        # Dibaca ulang di dalam transaksi: proses lain mungkin baru saja bermigrasi
+        start = conn.execute("PRAGMA user_version").fetchone()[0]
+        for version in range(start + 1, SCHEMA_VERSION + 1):
+            MIGRATIONS[version - 1]()
+            conn.execute(f"PRAGMA user_version = {version}")
+    return start, SCHEMA_VERSION
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+def init_db(force=False):
+    """Bootstrap sekali per proses untuk tiap file database: migrasi skema lalu sinkron aturan normalisasi.
+
+    Pemanggilan berikutnya (mis. tiap rerun Streamlit) tidak menyentuh database.
+    """
+    if DB_FILE in _initialized and not force: return
+    with _init_lock:
+        if DB_FILE in _initialized and not force: return
+        migrate()
+        sync_norm_labels()
+        _initialized.add(DB_FILE)
+
+def table_version(conn, name="pegawai") -> int:
+    row = conn.execute("SELECT version FROM table_version WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else 0
+
+def column_type(col) -> str:
+    return "DATE" if col in DATE_COLS else "INTEGER" if col in INT_COLS else "TEXT"
+
+def column_def(col, checks=True) -> str:
+    """Definisi kolom pegawai; kolom bertipe dijaga CHECK agar hanya berisi tanggal ISO / bilangan bulat."""
+    q = quote_ident(col)
+    check = ""
+    if checks and col in DATE_COLS: check = f" CHECK ({q} IS NULL OR (typeof({q}) = 'text' AND date({q}) IS {q}))"
+    elif checks and col in INT_COLS: check = f" CHECK ({q} IS NULL OR typeof({q}) = 'integer')"
+    return f"{q} {column_type(col)}{check}"
+
+def ensure_columns():
+    with get_pool().writer() as conn:
+        existing_cols = [row[1] for row in conn.execute("PRAGMA table_info(pegawai)").fetchall()]
+        for col in EXPECTED_COLS:
+            if col not in existing_cols:
+                conn.execute(f"ALTER TABLE pegawai ADD COLUMN '{col}' TEXT")
+
+def index_name(col: str) -> str:
+    return "idx_pegawai_" + re.sub(r"[^a-z0-9]+", "_", col.lower()).strip("_")
+
+def quote_ident(col: str) -> str:
+    return '"' + col.replace('"', '""') + '"'
+
+def ensure_indexes():
+    with get_pool().writer() as conn:
+        for col in INDEXED_COLS:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name(col)} ON pegawai ({quote_ident(col)})")
+
+def ensure_search_index():
+    """Indeks FTS5 contentless atas NAMA/NIP/NIK/NAMA JABATAN, disinkronkan trigger pada pegawai."""
+    fields = ",".join(SEARCH_FIELDS)
+    src = lambda alias: ",".join(f"{alias}.{quote_ident(c)}" for c in SEARCH_FIELDS.values())
+    with get_pool().writer() as conn:
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'pegawai_fts'").fetchone()
+        if not exists:
+            conn.execute(f"""CREATE VIRTUAL TABLE pegawai_fts USING fts5({fields}, content='',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')""")
+            conn.execute(f"INSERT INTO pegawai_fts (rowid,{fields}) SELECT rowid,{src('pegawai')} FROM pegawai")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS pegawai_fts_insert AFTER INSERT ON pegawai BEGIN
+            INSERT INTO pegawai_fts (rowid,{fields}) VALUES (new.rowid,{src('new')}); END""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS pegawai_fts_delete AFTER DELETE ON pegawai BEGIN
+            INSERT INTO pegawai_fts (pegawai_fts,rowid,{fields}) VALUES ('delete',old.rowid,{src('old')}); END""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS pegawai_fts_update AFTER UPDATE ON pegawai BEGIN
+            INSERT INTO pegawai_fts (pegawai_fts,rowid,{fields}) VALUES ('delete',old.rowid,{src('old')});
+            INSERT INTO pegawai_fts (rowid,{fields}) VALUES (new.rowid,{src('new')}); END""")
+
+def ensure_search_vocab():
+    """Kosakata FTS per kolom (``fts5vocab 'col'``) agar fuzzy cukup membaca term nama/jabatan per huruf awal."""
+    with get_pool().writer() as conn:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS pegawai_fts_col_vocab USING fts5vocab(pegawai_fts, 'col')")
+        conn.execute("DROP TABLE IF EXISTS pegawai_fts_vocab")  # kosakata 'row' lama (semua kolom), tidak dipakai lagi
+
+# ================== CRUD Pegawai ==================
+def load_data():
+    return get_pool().read_frame("SELECT * FROM pegawai")
+
+def save_row(row: dict):
+    for col in EXPECTED_COLS: row.setdefault(col, "")
+    cols = tuple(row.keys())
+    get_pool().execute(upsert_sql(cols), [db_value(c, row.get(c, "")) for c in cols])
+
+def delete_by_nip(nip: str):
+    get_pool().execute("DELETE FROM pegawai WHERE NIP = ?", (nip,))
+
+def replace_all(df: pd.DataFrame):
+    rows = frame_rows(df, EXPECTED_COLS)
+    with get_pool().writer() as conn:
+        conn.execute("DELETE FROM pegawai")
+        if rows: conn.executemany(upsert_sql(tuple(EXPECTED_COLS)), rows)
+
+# ================== Statistik Teragregasi ==================
+NORM_LABELS = {"gender": GENDER_LABELS, "pendidikan": EDUCATION_LABELS}
+
+def _norm_expr(dim, col, r):
+    raw = f"UPPER(TRIM({r}.{quote_ident(col)}))"
+    return f"COALESCE((SELECT label FROM norm_label WHERE dim = '{dim}' AND raw = {raw}), {raw}, '')"
+
+def _trim_expr(col, r):
+    return f"COALESCE(TRIM({r}.{quote_ident(col)}), '')"
+
+def _year_expr(col, r):
+    c = f"{r}.{quote_ident(col)}"
+    return f"CASE WHEN {c} GLOB '[0-9][0-9][0-9][0-9]-*' THEN substr({c}, 1, 4) ELSE '' END"
+
+# Dimensi statistik -> (kolom sumber, ekspresi kunci untuk alias baris r)
+STAT_DIMS = {
+    "total": ([], lambda r: "''"),
+    "gender": (["JENIS KELAMIN"], lambda r: _norm_expr("gender", "JENIS KELAMIN", r)),
+    "pendidikan": (["TINGKAT PENDIDIKAN"], lambda r: _norm_expr("pendidikan", "TINGKAT PENDIDIKAN", r)),
+    "tahun_lahir": (["TANGGAL LAHIR"], lambda r: _year_expr("TANGGAL LAHIR", r)),
+    "jenis_jabatan": (["JENIS JABATAN"], lambda r: _trim_expr("JENIS JABATAN", r)),
+    "unor_induk": (["UNOR INDUK"], lambda r: _trim_expr("UNOR INDUK", r)),
+}
+
+def _stat_add(dim, r):
+    return (f"INSERT INTO pegawai_stats (dim, key, jumlah) VALUES ('{dim}', {STAT_DIMS[dim][1](r)}, 1) "
+            f"ON CONFLICT(dim, key) DO UPDATE SET jumlah = jumlah + 1;")
+
+def _stat_sub(dim, r):
+    key = STAT_DIMS[dim][1](r)
+    return (f"UPDATE pegawai_stats SET jumlah = jumlah - 1 WHERE dim = '{dim}' AND key = {key};"
+            f"DELETE FROM pegawai_stats WHERE dim = '{dim}' AND key = {key} AND jumlah <= 0;")
+
+def rebuild_stats(conn):
+    conn.execute("DELETE FROM pegawai_stats")
+    for dim, (_, key) in STAT_DIMS.items():
+        conn.execute(f"INSERT INTO pegawai_stats (dim, key, jumlah) "
+                     f"SELECT '{dim}', {key('pegawai')}, COUNT(*) FROM pegawai GROUP BY 2")
+
+def ensure_stats_tables():
+    """Tabel hitungan per dimensi (gender, pendidikan, tahun lahir, jenis jabatan, unor induk).
+
+    Dipelihara inkremental oleh trigger pada pegawai sehingga halaman grafik
+    cukup membaca beberapa puluh baris. Dibangun ulang bila tabel baru dibuat
+    atau aturan normalisasi berubah.
+    """
+    with get_pool().writer() as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS norm_label (dim TEXT, raw TEXT, label TEXT, PRIMARY KEY (dim, raw)) WITHOUT ROWID")
+        created = not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'pegawai_stats'").fetchone()
+        conn.execute("""CREATE TABLE IF NOT EXISTS pegawai_stats (
+            dim TEXT NOT NULL, key TEXT NOT NULL, jumlah INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dim, key)) WITHOUT ROWID""")
+        changed = _sync_norm_labels(conn)
+        watched = ",".join(quote_ident(c) for dim in STAT_DIMS for c in STAT_DIMS[dim][0])
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS pegawai_stats_insert AFTER INSERT ON pegawai BEGIN
+            {" ".join(_stat_add(dim, "new") for dim in STAT_DIMS)} END""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS pegawai_stats_delete AFTER DELETE ON pegawai BEGIN
+            {" ".join(_stat_sub(dim, "old") for dim in STAT_DIMS)} END""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS pegawai_stats_update AFTER UPDATE OF {watched} ON pegawai BEGIN
+            {" ".join(_stat_sub(dim, "old") + _stat_add(dim, "new") for dim in STAT_DIMS if STAT_DIMS[dim][0])} END""")
+        if created or changed: rebuild_stats(conn)
+
+def _sync_norm_labels(conn) -> bool:
+    wanted = {(dim, raw, label) for dim, labels in NORM_LABELS.items() for raw, label in labels.items()}
+    stored = set(conn.execute("SELECT dim, raw, label FROM norm_label").fetchall())
+    if stored == wanted: return False
+    conn.execute("DELETE FROM norm_label")
+    conn.executemany("INSERT INTO norm_label (dim, raw, label) VALUES (?,?,?)", sorted(wanted))
+    return True
+
+def sync_norm_labels():
+    """Samakan ``norm_label`` dengan aturan di kode (bisa berubah antar rilis); statistik dibangun ulang bila berbeda."""
+    with get_pool().writer() as conn:
+        if _sync_norm_labels(conn): rebuild_stats(conn)
+
+# ================== Kubus TMT ==================
+TMT_FIELDS = ["TMT JABATAN","TMT GOLONGAN","TMT CPNS","TMT PNS"]
+
+def _tmt_parts(col, r):
+    """(valid, tahun, bulan) untuk tanggal berformat ``YYYY-MM-...`` pada kolom ``col``."""
+    c = f"{r}.{quote_ident(col)}"
+    return (f"{c} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]*'",
+            f"CAST(substr({c}, 1, 4) AS INTEGER)", f"CAST(substr({c}, 6, 2) AS INTEGER)")
+
+def _tmt_add(field, r):
+    valid, year, month = _tmt_parts(field, r)
+    return (f"INSERT INTO tmt_cube (field, unor, tahun, bulan, jumlah) "
+            f"SELECT '{field}', {_trim_expr('UNOR INDUK', r)}, {year}, {month}, 1 WHERE {valid} "
+            f"ON CONFLICT(field, unor, tahun, bulan) DO UPDATE SET jumlah = jumlah + 1;")
+
+def _tmt_sub(field, r):
+    _, year, month = _tmt_parts(field, r)
+    key = f"field = '{field}' AND unor = {_trim_expr('UNOR INDUK', r)} AND tahun = {year} AND bulan = {month}"
+    return (f"UPDATE tmt_cube SET jumlah = jumlah - 1 WHERE {key};"
+            f"DELETE FROM tmt_cube WHERE {key} AND jumlah <= 0;")
+
+def rebuild_tmt_cube(conn):
+    conn.execute("DELETE FROM tmt_cube")
+    for field in TMT_FIELDS:
+        valid, year, month = _tmt_parts(field, "pegawai")
+        conn.execute(f"INSERT INTO tmt_cube (field, unor, tahun, bulan, jumlah) "
+                     f"SELECT '{field}', {_trim_expr('UNOR INDUK', 'pegawai')}, {year}, {month}, COUNT(*) "
+                     f"FROM pegawai WHERE {valid} GROUP BY 2, 3, 4")
+
+def ensure_tmt_cube():
+    """Hitungan pegawai per (field TMT, UNOR INDUK, tahun, bulan), dipelihara trigger seperti ``pegawai_stats``."""
+    with get_pool().writer() as conn:
+        created = not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'tmt_cube'").fetchone()
+        conn.execute("""CREATE TABLE IF NOT EXISTS tmt_cube (
+            field TEXT NOT NULL, unor TEXT NOT NULL, tahun INTEGER NOT NULL, bulan INTEGER NOT NULL,
+            jumlah INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (field, unor, tahun, bulan)) WITHOUT ROWID""")
+        watched = ",".join(quote_ident(c) for c in TMT_FIELDS + ["UNOR INDUK"])
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS tmt_cube_insert AFTER INSERT ON pegawai BEGIN
+            {" ".join(_tmt_add(f, "new") for f in TMT_FIELDS)} END""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS tmt_cube_delete AFTER DELETE ON pegawai BEGIN
+            {" ".join(_tmt_sub(f, "old") for f in TMT_FIELDS)} END""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS tmt_cube_update AFTER UPDATE OF {watched} ON pegawai BEGIN
+            {" ".join(_tmt_sub(f, "old") + _tmt_add(f, "new") for f in TMT_FIELDS)} END""")
+        if created: rebuild_tmt_cube(conn)
+
+# ================== Skema Bertipe & Karantina ==================
+QUARANTINE_COLS = ["id","NIP","kolom","nilai","sumber","waktu"]
+
+def ensure_quarantine_table(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS pegawai_quarantine (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, NIP TEXT, kolom TEXT, nilai TEXT, sumber TEXT,
+        waktu DATETIME DEFAULT CURRENT_TIMESTAMP)""")
+
+def quarantine(conn, entries, sumber):
+    """Catat nilai yang tidak lolos konversi tipe: ``entries`` berisi ``(NIP, kolom, nilai_asli)``."""
+    if entries:
+        conn.executemany("INSERT INTO pegawai_quarantine (NIP, kolom, nilai, sumber) VALUES (?,?,?,?)",
+                         [(nip, col, None if v is None else str(v), sumber) for nip, col, v in entries])
+
+def migrate_typed_columns():
+    """Bangun ulang tabel pegawai dengan kolom DATE/INTEGER ber-CHECK dan indeks tanggal.
+
+    Nilai lama dikonversi (mis. ``'1990-05-01 00:00:00'`` -> ``'1990-05-01'``,
+    ``'8'`` -> ``8``); nilai yang tidak bisa dikonversi dikosongkan dan dicatat di
+    ``pegawai_quarantine``. Rowid dipertahankan sehingga indeks FTS tetap sah;
+    trigger dan indeks dibuat ulang, statistik dan kubus TMT dihitung ulang.
+    Berjalan dalam transaksi migrasi: pembaca WAL tetap melihat tabel lama sampai commit.
+    """
+    with get_pool().writer() as conn:
+        ensure_quarantine_table(conn)
+        info = conn.execute("PRAGMA table_info(pegawai)").fetchall()
+        if any(r[1] in TYPED_COLS and r[2].upper() != column_type(r[1]) for r in info):
+            bad = []
+            def convert(col, nip, v):
+                try: return typed_value(col, v)
+                except ValueError:
+                    bad.append((nip, col, v)); return None
+            conn.create_function("_typed_value", 3, convert)
+            cols = [r[1] for r in info]
+            defs = []
+            for _, col, decl, notnull, default, pk in info:
+                if col in TYPED_COLS: defs.append(column_def(col))
+                else: defs.append(f"{quote_ident(col)} {decl or ''}{' PRIMARY KEY' if pk else ''}".rstrip())
+            select = ",".join(f"_typed_value('{c}', NIP, {quote_ident(c)})" if c in TYPED_COLS else quote_ident(c) for c in cols)
+            conn.execute("DROP TABLE IF EXISTS pegawai_typed")
+            conn.execute(f"CREATE TABLE pegawai_typed ({','.join(defs)})")
+            conn.execute(f"INSERT INTO pegawai_typed (rowid,{','.join(quote_ident(c) for c in cols)}) "
+                         f"SELECT rowid,{select} FROM pegawai")
+            conn.execute("DROP TABLE pegawai")  # ikut menghapus indeks & trigger lama
+            conn.execute("ALTER TABLE pegawai_typed RENAME TO pegawai")
+            create_base_tables(); ensure_indexes(); ensure_search_index(); ensure_stats_tables(); ensure_tmt_cube()
+            rebuild_stats(conn); rebuild_tmt_cube(conn)
+            quarantine(conn, bad, "migrasi skema bertipe")
+            conn.execute("UPDATE table_version SET version = version + 1 WHERE name = 'pegawai'")
+        for col in DATE_COLS:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name(col)} ON pegawai ({quote_ident(col)})")
+
+def count_quarantine() -> int:
+    return get_pool().query("SELECT COUNT(*) FROM pegawai_quarantine")[0][0]
+
+def quarantine_sql():
+    return "SELECT * FROM pegawai_quarantine ORDER BY id DESC", []
+
+def load_quarantine(limit=500) -> pd.DataFrame:
+    sql, params = quarantine_sql()
+    return get_pool().read_frame(f"{sql} LIMIT ?", params + [int(limit)])
@@ -0,0 +1,65 @@
+"""Ekspor CSV/Excel streaming: baris dibaca dari cursor per chunk dan ditulis ke file sementara."""
+import csv
+import functools
+import os
+import tempfile
+
+from simpeg.db import get_pool
+
+FETCH_ROWS = 2000
+HEADER_STYLE = {"bold": True, "bg_color": "#DCE6F1"}
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def iter_query(sql, params=(), fetch_rows=FETCH_ROWS):
+    """Yield nama kolom lalu tiap baris; cursor dibaca per ``fetch_rows`` baris dalam satu transaksi baca."""
+    with get_pool().reader() as conn:
+        cur = conn.execute(sql, list(params))
+        yield [d[0] for d in cur.description]
+        while True:
+            rows = cur.fetchmany(fetch_rows)
+            if not rows: break
+            yield from rows
+
+def write_csv(path, sql, params=()) -> int:
+    """Tulis hasil query ke CSV UTF-8; mengembalikan jumlah baris data."""
+    rows = iter_query(sql, params)
+    n = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f, lineterminator="\n")
+        w.writerow(next(rows))
+        for row in rows:
+            w.writerow(row); n += 1
+    return n
+
+def write_xlsx(path, sql, params=(), sheet_name="Sheet1", header_style=None) -> int:
+    """Tulis hasil query ke xlsx dengan mode ``constant_memory`` xlsxwriter (satu baris di memori)."""
+    import xlsxwriter
+    rows = iter_query(sql, params)
+    wb = xlsxwriter.Workbook(path, {"constant_memory": True})
+    try:
+        ws = wb.add_worksheet(sheet_name)
+        ws.write_row(0, 0, next(rows), wb.add_format(header_style) if header_style else None)
+        n = 0
+        for n, row in enumerate(rows, start=1): ws.write_row(n, 0, row)
+    finally:
+        wb.close()
+    return n
+
+def export_bytes(kind, sql, params=(), **kwargs) -> bytes:
+    """Jalankan ekspor ``"csv"``/``"xlsx"`` ke file sementara dan kembalikan isinya.
+
+    Hanya file hasil yang dibaca utuh; baris tidak pernah dikumpulkan
+    menjadi DataFrame atau buffer workbook di memori.
+    """
+    writer = {"csv": write_csv, "xlsx": write_xlsx}[kind]
+    fd, path = tempfile.mkstemp(prefix="ekspor_", suffix=f".{kind}")
+    os.close(fd)
+    try:
+        writer(path, sql, params, **kwargs)
+        with open(path, "rb") as f: return f.read()
+    finally:
+        os.remove(path)
+
+def deferred(kind, sql, params=(), **kwargs):
+    """Callable tanpa argumen untuk ``st.download_button(data=...)``: ekspor baru berjalan saat tombol diklik."""
+    return functools.partial(export_bytes, kind, sql, list(params), **kwargs)
@@ -0,0 +1,119 @@
+"""Cache figur grafik bersama semua sesi dalam satu proses.
+
+Kunci: (versi data, halaman, nama grafik, tuple filter ternormalisasi). Nilai:
+spesifikasi JSON plotly (atau frame JSON untuk ``st.line_chart``), sehingga ukuran
+cache bisa dihitung dalam byte dan dibatasi dengan LRU. Saat hit, figur dibangun
+ulang dari JSON tanpa validasi plotly; saat miss, ``build`` dijalankan sekali
+dan latensinya dicatat di ``simpeg.metrics`` (jenis ``figure``).
+"""
+import datetime
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from simpeg.db import get_pool, table_version
+from simpeg.metrics import observe
+
+MAX_BYTES = int(float(os.environ.get("SIMPEG_FIGURE_CACHE_MB", "32") or 0) * 2**20)
+
+class FigureCache:
+    """LRU ``{kunci: (str, ukuran byte UTF-8)}`` dengan batas total byte; aman dipakai banyak thread."""
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, spec: str):
+        size = len(spec.encode("utf-8"))
+        if size > self.max_bytes: return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None: self.bytes -= old[1]
+            self._data[key] = (spec, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.bytes -= evicted; self.evictions += 1
+
+    def get_or_build(self, key, build, dumps, loads, name=""):
+        """Nilai dari cache (di-``loads``) atau hasil ``build()`` yang disimpan sebagai ``dumps(hasil)``."""
+        spec = self.get(key)
+        if spec is not None: return loads(spec)
+        t0 = time.perf_counter()
+        value = build()
+        if value is not None:
+            self.put(key, dumps(value))
+            observe("figure", name or str(key[1]), time.perf_counter() - t0)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entri": len(self._data), "bytes": self.bytes, "maks_bytes": self.max_bytes, "hit": self.hits,
+                    "miss": self.misses, "hit_rate": self.hits / total if total else 0.0, "evict": self.evictions}
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = self.hits = self.misses = self.evictions = 0
+
+_cache = FigureCache()
+
+def get_figure_cache() -> FigureCache: return _cache
+
+# ================== Kunci ==================
+def _norm(value):
+    if isinstance(value, (datetime.date, datetime.datetime)): return value.isoformat()
+    if isinstance(value, tuple): return tuple(_norm(v) for v in value)  # rentang (dari, sampai)
+    if isinstance(value, (list, set)): return tuple(sorted(str(v) for v in value))  # urutan pilihan tidak penting
+    return value
+
+def normalize_filters(filters=None) -> tuple:
+    """``{kolom: nilai}`` -> tuple terurut yang hashable; filter kosong dibuang."""
+    return tuple(sorted((str(k), _norm(v)) for k, v in (filters or {}).items() if v not in (None, "", [], (), set())))
+
+def data_version(tables=("pegawai",)) -> tuple:
+    pool = get_pool()
+    with pool.reader() as conn: return (pool.path,) + tuple(table_version(conn, t) for t in tables)
+
+def figure_key(page, name, filters=None, tables=("pegawai",)) -> tuple:
+    return (data_version(tables), page, name, normalize_filters(filters))
+
+# ================== Figur & Frame ==================
+def _dump_figure(fig) -> str:
+    import plotly.io as pio
+    return pio.to_json(fig, validate=False)
+
+def _load_figure(spec: str):
+    # JSON berasal dari figur yang sudah tervalidasi saat dibangun; validasi ulang adalah bagian terbesar biayanya
+    import plotly.graph_objects as go
+    return go.Figure(json.loads(spec), _validate=False)
+
+def cached_figure(page, name, build, filters=None, tables=("pegawai",)):
+    """Figur plotly dari cache, atau ``build()`` (boleh mengembalikan ``None`` bila tidak ada data)."""
+    return _cache.get_or_build(figure_key(page, name, filters, tables), build, _dump_figure, _load_figure, f"{page}/{name}")
+
+def _load_frame(spec: str) -> pd.DataFrame:
+    return pd.read_json(io.StringIO(spec), orient="table")
+
+def cached_frame(page, name, build, filters=None, tables=("pegawai",)) -> pd.DataFrame:
+    """Frame kecil untuk ``st.line_chart``/tabel, disimpan sebagai JSON ``orient="table"`` (nama indeks & dtype ikut)."""
+    return _cache.get_or_build(figure_key(page, name, filters, tables), build,
+                               lambda df: df.to_json(orient="table"), _load_frame, f"{page}/{name}")
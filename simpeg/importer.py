@@ -0,0 +1,242 @@
+"""Impor CSV/Excel bertahap: baca per chunk, normalisasi header, tulis ke tabel bayangan lalu tukar atomik."""
+import os
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from simpeg.db import EXPECTED_COLS, column_type, get_pool, quarantine, quote_ident, sql_value
+from simpeg.normalize import TYPED_COLS
+
+CHUNK_ROWS = 5000
+MAX_ERRORS = 500
+STAGING_PREFIX = "pegawai_staging_"
+STAGING_MAX_AGE = 6 * 3600
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    skipped: int = 0
+    duplicates: int = 0
+    chunks: int = 0
+    errors: list = field(default_factory=list)
+    # (NIP, kolom, nilai asli) yang gagal dikonversi ke tanggal/bilangan; barisnya tetap diimpor dengan nilai kosong
+    quarantined: list = field(default_factory=list)
+
+    def add_error(self, baris, pesan):
+        self.skipped += 1
+        if len(self.errors) < MAX_ERRORS: self.errors.append({"baris": baris, "pesan": pesan})
+
+# ================== Pembaca Chunk ==================
+def normalize_header(name) -> str:
+    return re.sub(r"[\s_]+", " ", str(name if name is not None else "")).strip().upper()
+
+def _file_size(f):
+    try:
+        pos = f.tell(); f.seek(0, os.SEEK_END); size = f.tell(); f.seek(pos)
+        return size or None
+    except (AttributeError, OSError):
+        return None
+
+def iter_csv_chunks(f, chunk_rows=CHUNK_ROWS):
+    """Menghasilkan (header, baris, progres 0..1 atau None) per chunk CSV."""
+    size = _file_size(f)
+    for chunk in pd.read_csv(f, chunksize=chunk_rows, dtype=str):
+        done = min(f.tell() / size, 1.0) if size else None
+        yield list(chunk.columns), list(chunk.itertuples(index=False, name=None)), done
+
+def iter_xlsx_chunks(f, chunk_rows=CHUNK_ROWS):
+    """Sama seperti ``iter_csv_chunks`` untuk xlsx, memakai openpyxl mode read-only."""
+    from openpyxl import load_workbook
+    wb = load_workbook(f, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        total = ws.max_row
+        rows = ws.iter_rows(values_only=True)
+        header = list(next(rows, ()) or ())
+        buf, seen = [], 1
+        for row in rows:
+            seen += 1
+            if all(v is None for v in row): continue
+            buf.append(row)
+            if len(buf) >= chunk_rows:
+                yield header, buf, (min(seen / total, 1.0) if total else None)
+                buf = []
+        if buf: yield header, buf, 1.0
+    finally:
+        wb.close()
+
+def iter_chunks(f, filename, chunk_rows=CHUNK_ROWS):
+    if str(filename).lower().endswith(".csv"): return iter_csv_chunks(f, chunk_rows)
+    return iter_xlsx_chunks(f, chunk_rows)
+
+# ================== Normalisasi ==================
+def _nip_value(v):
+    v = sql_value(v)
+    if isinstance(v, float) and v.is_integer(): v = int(v)
+    return "" if v is None else str(v).strip()
+
+def normalize_rows(header, rows, result: ImportResult, first_row: int):
+    """Petakan baris mentah ke urutan EXPECTED_COLS; baris tanpa NIP dicatat sebagai error."""
+    # Nama kolom yang persis sama didahulukan; backup lama juga memuat kolom warisan
+    # (mis. TANGGAL_LAHIR) yang setelah normalisasi bertabrakan dengan kolom aslinya
+    positions = {name: i for i, name in reversed(list(enumerate(header))) if name in EXPECTED_COLS}
+    for i, name in enumerate(header):
+        positions.setdefault(normalize_header(name), i)
+    idx = [positions.get(col) for col in EXPECTED_COLS]
+    nip_pos = EXPECTED_COLS.index("NIP")
+    typed = [(k, col, TYPED_COLS[col]) for k, col in enumerate(EXPECTED_COLS) if col in TYPED_COLS]
+    out = []
+    for n, row in enumerate(rows):
+        values = [("" if i is None else sql_value(row[i]) if i < len(row) else None) for i in idx]
+        nip = _nip_value(row[idx[nip_pos]]) if idx[nip_pos] is not None and idx[nip_pos] < len(row) else ""
+        if not nip:
+            result.add_error(first_row + n, "NIP kosong")
+            continue
+        values[nip_pos] = nip
+        for k, col, convert in typed:
+            try: values[k] = convert(values[k])
+            except ValueError:
+                result.quarantined.append((nip, col, values[k])); values[k] = None
+        out.append(tuple(values))
+    return out
+
+# ================== Pipeline ==================
+def new_staging_name() -> str:
+    # Detik pembuatan ada di nama agar tabel bayangan yang ditinggalkan bisa dibersihkan
+    return f"{STAGING_PREFIX}{int(time.time())}_{uuid.uuid4().hex[:8]}"
+
+def cleanup_staging(max_age=STAGING_MAX_AGE):
+    pool = get_pool()
+    now = time.time()
+    names = [r[0] for r in pool.query("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?",
+                                      (STAGING_PREFIX + "%",))]
+    for name in names:
+        try: created = int(name[len(STAGING_PREFIX):].split("_")[0])
+        except ValueError: continue
+        if now - created > max_age: pool.execute(f"DROP TABLE IF EXISTS {name}")
+
+def _staging_sql(staging):
+    # Afinitas kolom sama dengan tabel pegawai agar row_hash staging vs pegawai sebanding
+    cols = ",".join(f"{quote_ident(c)} {column_type(c)}" + (" PRIMARY KEY" if c == "NIP" else "") for c in EXPECTED_COLS)
+    quoted = ",".join(quote_ident(c) for c in EXPECTED_COLS)
+    placeholders = ",".join(["?"] * len(EXPECTED_COLS))
+    return (f"CREATE TABLE {staging} ({cols})",
+            f"INSERT OR REPLACE INTO {staging} ({quoted}) VALUES ({placeholders})")
+
+def stage_file(f, filename, staging, chunk_rows=CHUNK_ROWS, progress=None) -> ImportResult:
+    """Tulis seluruh file ke tabel bayangan ``staging``, satu transaksi pendek per chunk."""
+    pool = get_pool()
+    create_sql, insert_sql = _staging_sql(staging)
+    pool.execute(create_sql)
+    result = ImportResult()
+    next_row = 2  # baris 1 adalah header
+    for header, rows, done in iter_chunks(f, filename, chunk_rows):
+        values = normalize_rows(header, rows, result, next_row)
+        next_row += len(rows)
+        if values: pool.executemany(insert_sql, values)
+        result.rows += len(values)
+        result.chunks += 1
+        if progress: progress(done, result)
+    staged = pool.query(f"SELECT COUNT(*) FROM {staging}")[0][0]
+    result.duplicates = result.rows - staged
+    result.rows = staged
+    return result
+
+def import_file(f, filename, mode="replace", chunk_rows=CHUNK_ROWS, progress=None) -> ImportResult:
+    """Impor file pegawai secara streaming.
+
+    ``mode="replace"`` mengganti seluruh tabel, ``mode="upsert"`` hanya
+    menambah/memperbarui per NIP. Tabel pegawai baru berubah pada satu
+    transaksi terakhir, sehingga pembaca tidak pernah melihat tabel kosong.
+    """
+    if mode not in ("replace", "upsert"): raise ValueError(mode)
+    pool = get_pool()
+    staging = new_staging_name()
+    try:
+        result = stage_file(f, filename, staging, chunk_rows, progress)
+        quoted = ",".join(quote_ident(c) for c in EXPECTED_COLS)
+        updates = ",".join(f"{quote_ident(c)}=excluded.{quote_ident(c)}" for c in EXPECTED_COLS if c != "NIP")
+        with pool.writer() as conn:
+            if mode == "replace": conn.execute("DELETE FROM pegawai")
+            conn.execute(f"INSERT INTO pegawai ({quoted}) SELECT {quoted} FROM {staging} WHERE true "
+                         f"ON CONFLICT(NIP) DO UPDATE SET {updates}")
+            quarantine(conn, result.quarantined, f"impor {filename}")
+        return result
+    finally:
+        pool.execute(f"DROP TABLE IF EXISTS {staging}")
+
+# ================== Restore Berbasis Diff ==================
+@dataclass
+class RestorePlan:
+    staging: str
+    result: ImportResult
+    inserts: int = 0
+    updates: int = 0
+    deletes: int = 0
+    unchanged: int = 0
+
+    @property
+    def changes(self) -> int: return self.inserts + self.updates + self.deletes
+
+def _hash_expr(alias):
+    return "row_hash(" + ",".join(f"{alias}.{quote_ident(c)}" for c in EXPECTED_COLS) + ")"
+
+def _diff_sql(staging) -> dict:
+    """SELECT NIP untuk tiap jenis perubahan: baris baru, berubah (hash berbeda) dan terhapus."""
+    return {
+        "insert": f"SELECT s.NIP FROM {staging} s WHERE NOT EXISTS (SELECT 1 FROM pegawai p WHERE p.NIP = s.NIP)",
+        "update": f"SELECT s.NIP FROM {staging} s JOIN pegawai p ON p.NIP = s.NIP WHERE {_hash_expr('s')} <> {_hash_expr('p')}",
+        "delete": f"SELECT p.NIP FROM pegawai p WHERE NOT EXISTS (SELECT 1 FROM {staging} s WHERE s.NIP = p.NIP)",
+    }
+
+def plan_restore(f, filename, chunk_rows=CHUNK_ROWS, progress=None) -> RestorePlan:
+    """Muat file backup ke tabel bayangan dan hitung ringkasan diff terhadap tabel pegawai."""
+    cleanup_staging()
+    staging = new_staging_name()
+    try:
+        result = stage_file(f, filename, staging, chunk_rows, progress)
+    except Exception:
+        get_pool().execute(f"DROP TABLE IF EXISTS {staging}")
+        raise
+    plan = RestorePlan(staging, result)
+    pool = get_pool()
+    for kind, sql in _diff_sql(staging).items():
+        setattr(plan, kind + "s", pool.query(f"SELECT COUNT(*) FROM ({sql})")[0][0])
+    plan.unchanged = result.rows - plan.inserts - plan.updates
+    return plan
+
+def preview_restore(plan: RestorePlan, kind, limit=50) -> pd.DataFrame:
+    sql = _diff_sql(plan.staging)[kind]
+    source = "pegawai" if kind == "delete" else plan.staging
+    return get_pool().read_frame(
+        f"SELECT t.NIP, t.NAMA, t.{quote_ident('UNOR INDUK')} FROM {source} t WHERE t.NIP IN ({sql}) LIMIT ?", (int(limit),))
+
+def apply_restore(plan: RestorePlan) -> dict:
+    """Terapkan hanya delta dalam satu transaksi; mengembalikan ``{"insert"|"update"|"delete": [NIP, ...]}``.
+
+    Diff dihitung ulang di dalam transaksi sehingga tetap benar walau data
+    berubah sejak ringkasan ditampilkan.
+    """
+    quoted = ",".join(quote_ident(c) for c in EXPECTED_COLS)
+    updates = ",".join(f"{quote_ident(c)}=excluded.{quote_ident(c)}" for c in EXPECTED_COLS if c != "NIP")
+    diff = _diff_sql(plan.staging)
+    changed = {}
+    try:
+        with get_pool().writer() as conn:
+            for kind, sql in diff.items():
+                changed[kind] = [r[0] for r in conn.execute(sql).fetchall()]
+            conn.execute(f"INSERT INTO pegawai ({quoted}) SELECT {quoted} FROM {plan.staging} "
+                         f"WHERE NIP IN ({diff['insert']}) OR NIP IN ({diff['update']}) "
+                         f"ON CONFLICT(NIP) DO UPDATE SET {updates}")
+            conn.execute(f"DELETE FROM pegawai WHERE rowid IN (SELECT p.rowid FROM pegawai p "
+                         f"WHERE NOT EXISTS (SELECT 1 FROM {plan.staging} s WHERE s.NIP = p.NIP))")
+            quarantine(conn, plan.result.quarantined, "restore")
+    finally:
+        discard_restore(plan)
+    return changed
+
+def discard_restore(plan: RestorePlan):
+    get_pool().execute(f"DROP TABLE IF EXISTS {plan.staging}")
@@ -0,0 +1,239 @@
+"""Metrik latensi dalam proses: histogram per (jenis, nama), hitungan kegagalan, ekspor teks Prometheus, profil cProfile."""
+import bisect
+import cProfile
+import functools
+import http.server
+import io
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+import pandas as pd
+
+# Batas bucket (detik), sama seperti default klien Prometheus
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_NAME = "simpeg_duration_seconds"
+ROWS_NAME = "simpeg_rows_total"
+ERRORS_NAME = "simpeg_errors_total"
+
+METRICS_FILE = os.environ.get("SIMPEG_METRICS_FILE", "")
+METRICS_PORT = int(os.environ.get("SIMPEG_METRICS_PORT", "0") or 0)
+WRITE_SECONDS = 15
+
+class Histogram:
+    """Histogram kumulatif satu (jenis, nama): jumlah per bucket, total durasi, maksimum dan jumlah baris."""
+
+    __slots__ = ("counts", "count", "sum", "max", "rows")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count, self.sum, self.max, self.rows = 0, 0.0, 0.0, 0
+
+    def observe(self, seconds, rows=None):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max: self.max = seconds
+        if rows: self.rows += rows
+
+    def quantile(self, q) -> float:
+        """Perkiraan kuantil dengan interpolasi linear di dalam bucket."""
+        if not self.count: return 0.0
+        rank, seen, lower = q * self.count, 0, 0.0
+        for i, n in enumerate(self.counts):
+            upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+            if n and seen + n >= rank: return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n; lower = upper
+        return self.max
+
+class Registry:
+    def __init__(self):
+        self._hist = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def observe(self, kind, name, seconds, rows=None):
+        with self._lock:
+            h = self._hist.get((kind, name))
+            if h is None: h = self._hist[(kind, name)] = Histogram()
+            h.observe(seconds, rows)
+
+    def error(self, kind, name, message):
+        with self._lock:
+            count, _ = self._errors.get((kind, name), (0, ""))
+            self._errors[(kind, name)] = (count + 1, message)
+
+    def items(self):
+        with self._lock: return sorted((k, _copy(h)) for k, h in self._hist.items())
+
+    def errors(self):
+        """``[((jenis, nama), (jumlah, pesan_terakhir)), ...]``."""
+        with self._lock: return sorted(self._errors.items())
+
+    def reset(self):
+        with self._lock: self._hist.clear(); self._errors.clear(); self.started = time.time()
+
+def _copy(h):
+    c = Histogram()
+    c.counts, c.count, c.sum, c.max, c.rows = list(h.counts), h.count, h.sum, h.max, h.rows
+    return c
+
+_registry = Registry()
+
+def get_registry() -> Registry: return _registry
+
+def observe(kind, name, seconds, rows=None): _registry.observe(kind, name, seconds, rows)
+
+def reset(): _registry.reset()
+
+_log = logging.getLogger("simpeg")
+
+def record_error(kind, name, exc):
+    """Catat kegagalan latar (thread pekerja): dihitung di registry dan ditulis ke logger ``simpeg``."""
+    _registry.error(kind, name, str(exc))
+    _log.error("%s/%s gagal: %s", kind, name, exc, exc_info=exc)
+
+# ================== Pengukuran ==================
+def count_rows(value):
+    if isinstance(value, (pd.DataFrame, list)): return len(value)
+    if isinstance(value, tuple) and value and isinstance(value[0], pd.DataFrame): return len(value[0])
+    return None
+
+@contextmanager
+def timer(kind, name):
+    """``with timer("page", menu) as t: ...``; ``t["rows"]`` boleh diisi di dalam blok."""
+    info = {"rows": None}
+    t0 = time.perf_counter()
+    try:
+        yield info
+    finally:
+        observe(kind, name, time.perf_counter() - t0, info["rows"])
+
+def timed(kind, name=None):
+    """Dekorator: catat latensi tiap panggilan dan jumlah baris hasilnya (DataFrame/list)."""
+    def wrap(fn):
+        label = name or fn.__name__
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            t0 = time.perf_counter()
+            result = fn(*args, **kwargs)
+            observe(kind, label, time.perf_counter() - t0, count_rows(result))
+            return result
+        return inner
+    return wrap
+
+class Stopwatch:
+    """Untuk rentang yang tidak bisa dibungkus satu blok (mis. cabang halaman sampai footer skrip)."""
+
+    def __init__(self, kind, name):
+        self.kind, self.name, self.t0 = kind, name, time.perf_counter()
+
+    def stop(self, rows=None):
+        observe(self.kind, self.name, time.perf_counter() - self.t0, rows)
+
+_SQL_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE(?:\s+IF\s+(?:NOT\s+)?EXISTS)?)\s+([\"\w]+)", re.IGNORECASE)
+
+@lru_cache(maxsize=1024)
+def sql_label(sql: str) -> str:
+    """Label query berkardinalitas rendah: kata kerja + tabel pertama, mis. ``SELECT pegawai``."""
+    verb = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else "?"
+    m = _SQL_TABLE.search(sql)
+    table = m.group(1).strip('"') if m else ""
+    # Tabel staging impor bernama acak
+    table = re.sub(r"_[0-9a-f]{8,}$", "", table)
+    return f"{verb} {table}".strip()
+
+# ================== Ringkasan & Ekspor ==================
+def summary() -> pd.DataFrame:
+    rows = [{"jenis": kind, "nama": name, "panggilan": h.count, "total_s": h.sum,
+             "rata2_ms": h.sum / h.count * 1000 if h.count else 0.0,
+             "p50_ms": h.quantile(0.5) * 1000, "p95_ms": h.quantile(0.95) * 1000, "maks_ms": h.max * 1000,
+             "baris": h.rows} for (kind, name), h in _registry.items()]
+    return pd.DataFrame(rows, columns=["jenis","nama","panggilan","total_s","rata2_ms","p50_ms","p95_ms","maks_ms","baris"])
+
+def error_summary() -> pd.DataFrame:
+    rows = [{"jenis": kind, "nama": name, "gagal": count, "pesan_terakhir": message}
+            for (kind, name), (count, message) in _registry.errors()]
+    return pd.DataFrame(rows, columns=["jenis","nama","gagal","pesan_terakhir"])
+
+def _label(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def prometheus_text() -> str:
+    """Format eksposisi teks Prometheus untuk semua histogram."""
+    out = [f"# HELP {METRIC_NAME} Latensi operasi SIMPEG per jenis dan nama.", f"# TYPE {METRIC_NAME} histogram"]
+    rows = [f"# HELP {ROWS_NAME} Jumlah baris yang dikembalikan.", f"# TYPE {ROWS_NAME} counter"]
+    for (kind, name), h in _registry.items():
+        labels = f'kind="{_label(kind)}",name="{_label(name)}"'
+        cum = 0
+        for bound, n in zip(BUCKETS + ("+Inf",), h.counts):
+            cum += n
+            out.append(f'{METRIC_NAME}_bucket{{{labels},le="{bound}"}} {cum}')
+        out.append(f"{METRIC_NAME}_sum{{{labels}}} {h.sum:.6f}")
+        out.append(f"{METRIC_NAME}_count{{{labels}}} {h.count}")
+        if h.rows: rows.append(f"{ROWS_NAME}{{{labels}}} {h.rows}")
+    errors = [f"# HELP {ERRORS_NAME} Jumlah kegagalan operasi latar.", f"# TYPE {ERRORS_NAME} counter"]
+    for (kind, name), (count, _) in _registry.errors():
+        errors.append(f'{ERRORS_NAME}{{kind="{_label(kind)}",name="{_label(name)}"}} {count}')
+    return "\n".join(out + rows + errors) + "\n"
+
+def write_prometheus(path=None):
+    """Tulis teks Prometheus secara atomik (untuk textfile collector node_exporter)."""
+    path = path or METRICS_FILE
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f: f.write(prometheus_text())
+    os.replace(tmp, path)
+
+class MetricsExporter:
+    """Thread latar: tulis ``SIMPEG_METRICS_FILE`` berkala dan/atau layani ``/metrics`` di ``SIMPEG_METRICS_PORT``."""
+
+    def __init__(self, path=METRICS_FILE, port=METRICS_PORT, write_seconds=WRITE_SECONDS):
+        self.path, self.port, self.write_seconds = path, port, write_seconds
+        self._stop = threading.Event()
+        self._server = None
+
+    def _write_loop(self):
+        while not self._stop.wait(self.write_seconds):
+            try: write_prometheus(self.path)
+            except OSError as e: record_error("metrics", "write_file", e)
+
+    def start(self):
+        if self.path:
+            threading.Thread(target=self._write_loop, name="metrics-file", daemon=True).start()
+        if self.port:
+            class Handler(http.server.BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.rstrip("/") != "/metrics": self.send_error(404); return
+                    body = prometheus_text().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers(); self.wfile.write(body)
+                def log_message(self, *args): pass
+            self._server = http.server.ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+            threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._server: self._server.shutdown(); self._server.server_close()
+
+# ================== cProfile ==================
+class Profiler:
+    """Bungkus ``cProfile.Profile`` untuk satu rerun; ``report`` mengembalikan teks pstats teratas."""
+
+    def __init__(self):
+        self._prof = cProfile.Profile()
+        self._prof.enable()
+
+    def report(self, sort="cumulative", limit=40) -> str:
+        self._prof.disable()
+        buf = io.StringIO()
+        pstats.Stats(self._prof, stream=buf).strip_dirs().sort_stats(sort).print_stats(limit)
+        return buf.getvalue()
@@ -0,0 +1,87 @@
+"""Aturan normalisasi nilai kepegawaian (gender, pendidikan, kelompok usia) dan nilai kolom bertipe."""
+import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+GENDER_LABELS = {"M":"LAKI-LAKI","L":"LAKI-LAKI","PRIA":"LAKI-LAKI","LAKI-LAKI":"LAKI-LAKI",
+                 "F":"PEREMPUAN","P":"PEREMPUAN","WANITA":"PEREMPUAN","PEREMPUAN":"PEREMPUAN"}
+
+EDUCATION_LABELS = {
+    "SD":"SD","SEKOLAH DASAR":"SD","ELEMENTARY SCHOOL":"SD",
+    "SMP":"SMP","SEKOLAH MENENGAH PERTAMA":"SMP","JUNIOR HIGH":"SMP",
+    "SMA":"SMA","SMU":"SMA","SMK":"SMA","MA":"SMA","HIGH SCHOOL":"SMA",
+    "D1":"D1","DIPLOMA I":"D1","D2":"D2","DIPLOMA II":"D2",
+    "D3":"D3","DIPLOMA III":"D3","AHLI MADYA":"D3",
+    "D4":"D4","DIPLOMA IV":"D4","SARJANA TERAPAN":"D4",
+    "S1":"S1","SARJANA":"S1","UNDERGRADUATE":"S1","BACHELOR":"S1",
+    "S2":"S2","MAGISTER":"S2","MASTER":"S2","POSTGRADUATE":"S2",
+    "S3":"S3","DOKTOR":"S3","PHD":"S3","DOCTORATE":"S3"
+}
+
+AGE_BINS = [0, 20, 30, 40, 50, 60, 150]
+AGE_LABELS = ["<20","20–29","30–39","40–49","50–59","60+"]
+
+def age_buckets(ages: pd.Series) -> pd.Series:
+    return pd.cut(ages.astype("float64"), bins=AGE_BINS, labels=AGE_LABELS, right=False)
+
+# ================== Kolom Bertipe ==================
+DATE_COLS = ["TANGGAL LAHIR","TMT CPNS","TMT PNS","TMT GOLONGAN","TMT JABATAN"]
+INT_COLS = ["MK TAHUN","MK BULAN"]
+
+# ================== Nilai Bertipe (kolom database) ==================
+# Tanggal disimpan sebagai teks ISO-8601 'YYYY-MM-DD', masa kerja sebagai INTEGER
+DATE_FORMATS = ["%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S.%f",
+                "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d"]
+MIN_YEAR, MAX_YEAR = 1900, 2100
+# Masa kerja disimpan sebagai int32 di snapshot kolumnar (simpeg.columnar)
+MAX_INT = 2**31 - 1
+
+def _blank(value) -> bool:
+    if value is None or value is pd.NA or value is pd.NaT: return True
+    if isinstance(value, float) and value != value: return True
+    return isinstance(value, str) and not value.strip().lstrip("'").strip()
+
+def iso_date(value):
+    """Tanggal apa pun yang dikenali -> ``'YYYY-MM-DD'``; ``None`` bila kosong, ``ValueError`` bila tidak dikenali."""
+    if _blank(value): return None
+    if isinstance(value, datetime.datetime): d = value.date()
+    elif isinstance(value, datetime.date): d = value
+    else: return _parse_date(str(value).strip().lstrip("'").strip())
+    if not MIN_YEAR <= d.year <= MAX_YEAR: raise ValueError(f"tahun di luar rentang: {value!r}")
+    return d.isoformat()
+
+@lru_cache(maxsize=65536)
+def _parse_date(text):
+    # Nilai tanggal sangat berulang (TMT per bulan), jadi hasil parsing teks di-cache
+    try: d = datetime.datetime.fromisoformat(text).date()
+    except ValueError: d = None
+    for fmt in DATE_FORMATS if d is None else ():
+        try:
+            d = datetime.datetime.strptime(text, fmt).date(); break
+        except ValueError:
+            continue
+    if d is None: raise ValueError(f"bukan tanggal: {text!r}")
+    if not MIN_YEAR <= d.year <= MAX_YEAR: raise ValueError(f"tahun di luar rentang: {text!r}")
+    return d.isoformat()
+
+def int_value(value):
+    """Bilangan bulat 0..MAX_INT (juga '8', '8.0', 8.0) -> ``int``; ``None`` bila kosong, ``ValueError`` bila bukan bilangan bulat atau di luar rentang."""
+    if _blank(value): return None
+    if isinstance(value, (bool, np.bool_)): raise ValueError(f"bukan bilangan bulat: {value!r}")
+    if isinstance(value, (int, np.integer)): n = int(value)
+    else:
+        try: f = float(str(value).strip().lstrip("'"))
+        except ValueError: raise ValueError(f"bukan bilangan bulat: {value!r}") from None
+        if not f.is_integer(): raise ValueError(f"bukan bilangan bulat: {value!r}")
+        n = int(f)
+    if not 0 <= n <= MAX_INT: raise ValueError(f"bilangan di luar rentang: {value!r}")
+    return n
+
+TYPED_COLS = {**{c: iso_date for c in DATE_COLS}, **{c: int_value for c in INT_COLS}}
+
+def typed_value(col, value):
+    """Nilai siap tulis untuk kolom ``col`` (tanggal/bilangan dikonversi, kolom lain apa adanya)."""
+    fn = TYPED_COLS.get(col)
+    return fn(value) if fn else value
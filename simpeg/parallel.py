@@ -0,0 +1,32 @@
+"""Process pool untuk pekerjaan render massal (ID card, PDF profil)."""
+import concurrent.futures
+import multiprocessing
+import os
+
+MAX_WORKERS = 4
+
+def default_workers() -> int:
+    return min(os.cpu_count() or 1, MAX_WORKERS)
+
+def map_chunks(fn, jobs, workers=None):
+    """Jalankan ``fn(job)`` untuk tiap job dan hasilkan hasilnya sesuai urutan.
+
+    Paling banyak ``2 * workers`` job berjalan sekaligus, sehingga hasil yang
+    belum dikonsumsi tidak menumpuk di memori. Dengan satu worker atau satu
+    job saja semuanya dijalankan di proses ini.
+    """
+    jobs = list(jobs)
+    workers = workers or default_workers()
+    if workers == 1 or len(jobs) <= 1:
+        for job in jobs: yield fn(job)
+        return
+    # spawn: proses Streamlit punya banyak thread, fork tidak aman
+    ctx = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as ex:
+        pending = [ex.submit(fn, job) for job in jobs[:2 * workers]]
+        nxt = len(pending)
+        while pending:
+            result = pending.pop(0).result()
+            if nxt < len(jobs):
+                pending.append(ex.submit(fn, jobs[nxt])); nxt += 1
+            yield result
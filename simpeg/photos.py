@@ -0,0 +1,141 @@
+"""Foto pegawai: normalisasi saat upload, turunan berukuran tetap dengan nama hash isi, cache LRU."""
+import hashlib
+import io
+import os
+import re
+import tempfile
+from functools import lru_cache
+
+PHOTO_DIR = "images"
+MASTER_MAX = 1600
+JPEG_QUALITY = 88
+PRINT_DPI = 300
+
+def mm_px(w_mm, h_mm, dpi=PRINT_DPI):
+    return round(w_mm / 25.4 * dpi), round(h_mm / 25.4 * dpi)
+
+# Turunan per pemakaian: tampilan profil (3:4), foto PDF profil 30x40 mm, foto ID card 18x22 mm
+DERIVATIVES = {
+    "profile": (300, 400),
+    "pdf": mm_px(30, 40),
+    "idcard": mm_px(18, 22),
+}
+HASH_NAME = re.compile(r"^[0-9a-f]{24}$")
+
+# ================== Normalisasi ==================
+def _open_normalized(data: bytes, min_size=None):
+    """Decode gambar apa pun yang dikenal Pillow menjadi RGB tegak (EXIF orientation diterapkan).
+
+    Dengan ``min_size`` JPEG boleh didekode langsung pada skala yang lebih kecil.
+    """
+    from PIL import Image, ImageOps
+    im = Image.open(io.BytesIO(data))
+    if min_size: im.draft("RGB", (max(min_size), max(min_size)))
+    im = ImageOps.exif_transpose(im)
+    if im.mode in ("RGBA", "LA", "P"):
+        im = im.convert("RGBA")
+        bg = Image.new("RGB", im.size, (255, 255, 255)); bg.paste(im, mask=im.getchannel("A"))
+        return bg
+    return im.convert("RGB")
+
+def _save_jpeg(im, path):
+    # Tulis ke file sementara lalu rename, aman bila beberapa proses membuat turunan yang sama
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f: im.save(f, "JPEG", quality=JPEG_QUALITY, optimize=True)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+
+def content_name(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=12).hexdigest()
+
+def derivative_path(foto, kind) -> str:
+    stem, _ = os.path.splitext(foto)
+    return f"{stem}_{kind}.jpg"
+
+def make_derivative(foto, kind):
+    from PIL import ImageOps
+    with open(foto, "rb") as f: im = _open_normalized(f.read(), DERIVATIVES[kind])
+    out = derivative_path(foto, kind)
+    _save_jpeg(ImageOps.fit(im, DERIVATIVES[kind]), out)
+    return out
+
+def store_photo(data: bytes, photo_dir=PHOTO_DIR) -> str:
+    """Simpan foto upload sebagai JPEG ter-normalisasi ``{hash}.jpg`` plus semua turunannya.
+
+    Nama file adalah hash isi upload, jadi upload yang sama tidak menulis ulang.
+    Mengembalikan path master untuk kolom FOTO. ``PIL.UnidentifiedImageError``
+    bila data bukan gambar.
+    """
+    os.makedirs(photo_dir, exist_ok=True)
+    master = os.path.join(photo_dir, f"{content_name(data)}.jpg")
+    if not os.path.exists(master):
+        im = _open_normalized(data)
+        im.thumbnail((MASTER_MAX, MASTER_MAX))
+        _save_jpeg(im, master)
+    for kind in DERIVATIVES:
+        if not os.path.exists(derivative_path(master, kind)): make_derivative(master, kind)
+    return master
+
+# ================== Akses ==================
+def photo_path(foto, kind):
+    """Path turunan ``kind`` untuk nilai kolom FOTO; dibuat bila belum ada atau lebih lama dari master.
+
+    ``None`` bila pegawai tidak punya foto atau file tidak bisa dibaca.
+    """
+    if not foto or not isinstance(foto, str) or not os.path.exists(foto): return None
+    out = derivative_path(foto, kind)
+    try:
+        if not os.path.exists(out) or os.path.getmtime(out) < os.path.getmtime(foto): make_derivative(foto, kind)
+    except Exception:
+        return None
+    return out
+
+@lru_cache(maxsize=256)
+def _read_cached(path, mtime_ns):
+    with open(path, "rb") as f: return f.read()
+
+def photo_bytes(foto, kind="profile"):
+    """Isi turunan foto dari cache LRU dalam proses (kunci path + mtime)."""
+    path = photo_path(foto, kind)
+    if path is None: return None
+    return _read_cached(path, os.stat(path).st_mtime_ns)
+
+def photo_cache_info(): return _read_cached.cache_info()
+
+# ================== Migrasi ==================
+def is_normalized(foto) -> bool:
+    if not foto or not isinstance(foto, str): return True
+    return bool(HASH_NAME.match(os.path.splitext(os.path.basename(foto))[0]))
+
+def migrate_photos(photo_dir=PHOTO_DIR, remove_legacy=True) -> dict:
+    """Migrasi sekali jalan: foto lama (mis. ``images/{nip}.jpg`` berisi PNG mentah) dinormalisasi.
+
+    Kolom FOTO diperbarui ke path hash dalam satu transaksi; file lama
+    dihapus setelahnya. Mengembalikan ``{"migrated": n, "missing": [...], "failed": [...]}``.
+    """
+    from simpeg.db import get_pool
+    rows = get_pool().query("SELECT NIP, FOTO FROM pegawai WHERE FOTO IS NOT NULL AND FOTO <> ''")
+    updates, missing, failed, legacy = [], [], [], set()
+    for nip, foto in rows:
+        if is_normalized(foto): continue
+        if not os.path.exists(foto):
+            missing.append(nip); continue
+        try:
+            with open(foto, "rb") as f: new = store_photo(f.read(), photo_dir)
+        except Exception:
+            failed.append(nip); continue
+        updates.append((new, nip)); legacy.add(foto)
+    if updates: get_pool().executemany("UPDATE pegawai SET FOTO = ? WHERE NIP = ?", updates)
+    if remove_legacy:
+        for path in legacy:
+            for p in [path] + [derivative_path(path, k) for k in DERIVATIVES]:
+                if os.path.exists(p): os.remove(p)
+    return {"migrated": len(updates), "missing": missing, "failed": failed}
+
+def needs_migration() -> bool:
+    from simpeg.db import get_pool
+    rows = get_pool().query("SELECT FOTO FROM pegawai WHERE FOTO IS NOT NULL AND FOTO <> ''")
+    return any(not is_normalized(r[0]) and os.path.exists(r[0]) for r in rows)
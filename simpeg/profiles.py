@@ -0,0 +1,166 @@
+"""PDF profil pegawai: satu profil, atau ekspor massal ke ZIP di disk yang diperbarui inkremental."""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import weakref
+import zipfile
+from dataclasses import dataclass
+
+from simpeg.db import EXPECTED_COLS, row_hash
+from simpeg.metrics import timed
+from simpeg.parallel import map_chunks
+from simpeg.photos import photo_path
+
+PROFILE_LABELS = ["NAMA","NIP","NAMA_JABATAN","JENIS_JABATAN","NAMA_UNOR","UNOR INDUK","TMT_JABATAN",
+                  "JENIS_KELAMIN","TANGGAL_LAHIR","TINGKAT_PENDIDIKAN","NAMA_PENDIDIKAN","EMAIL","NOMOR HP","ALAMAT"]
+
+EXPORT_DIR = "exports"
+# ZIP ekspor disimpan per (filter, himpunan pegawai); yang terlama dihapus di atas batas ini
+EXPORT_KEEP = 20
+MANIFEST = "manifest.json"
+CHUNK_PROFILES = 50
+
+# ================== Satu Profil ==================
+def _build_pdf(data, foto_path=None):
+    from fpdf import FPDF  # fpdf baru dimuat saat PDF pertama dibuat
+    pdf = FPDF(); pdf.add_page()
+    pdf.set_fill_color(33,150,243); pdf.set_text_color(255,255,255); pdf.set_font("Arial","B",16)
+    pdf.cell(0,12,"PROFIL PEGAWAI",ln=True,align="C",fill=True); pdf.ln(8)
+    foto_path = foto_path or photo_path(data.get("FOTO"), "pdf")
+    if foto_path and os.path.exists(foto_path):
+        try: pdf.image(foto_path,x=160,y=22,w=30,h=40)
+        except Exception: pass
+    pdf.set_text_color(0,0,0); pdf.set_font("Arial",size=12); pdf.ln(20)
+    for key in PROFILE_LABELS:
+        key_db=key.replace("_"," "); val=str(data.get(key,data.get(key_db,"")))
+        pdf.cell(60,9,key_db,border=1); pdf.cell(0,9,val.encode("latin-1","replace").decode("latin-1"),border=1,ln=True)
+    return pdf
+
+@timed("pdf")
+def generate_pdf_resmi(data, foto_path=None) -> bytes:
+    return _build_pdf(data, foto_path).output(dest="S").encode("latin-1")
+
+def profile_filename(data) -> str:
+    return f"profil_{re.sub(r'[^0-9A-Za-z_-]', '', str(data.get('NIP','')))}.pdf"
+
+# ================== Ekspor Massal ==================
+def photo_signature(path) -> str:
+    if not path or not isinstance(path, str) or not os.path.exists(path): return ""
+    st = os.stat(path)
+    return f"{path}:{st.st_size}:{st.st_mtime_ns}"
+
+def profile_key(data) -> str:
+    """Kunci perubahan satu profil: hash isi baris + tanda tangan file foto."""
+    return row_hash(*(data.get(c) for c in EXPECTED_COLS), photo_signature(data.get("FOTO")))
+
+@dataclass
+class ExportResult:
+    path: str
+    total: int = 0
+    rendered: int = 0
+    reused: int = 0
+
+def read_manifest(path) -> dict:
+    """``{nama_file: kunci}`` dari ekspor sebelumnya; kosong bila belum ada atau rusak."""
+    if not os.path.exists(path): return {}
+    try:
+        with zipfile.ZipFile(path) as zf: return json.loads(zf.read(MANIFEST))
+    except (zipfile.BadZipFile, KeyError, ValueError):
+        return {}
+
+def _render_chunk(job):
+    """Pekerja: tulis PDF tiap pegawai ke ``out_dir`` dan kembalikan pasangan (nama_file, path)."""
+    rows, out_dir = job
+    out = []
+    for data in rows:
+        name = profile_filename(data)
+        path = os.path.join(out_dir, name)
+        _build_pdf(data).output(path, "F")
+        out.append((name, path))
+    return out
+
+def export_path(rows, key="", directory=EXPORT_DIR) -> str:
+    """Path ZIP untuk satu ekspor: hash dari ``key`` (filter) dan himpunan NIP ``rows``."""
+    h = hashlib.blake2b(str(key).encode("utf-8"), digest_size=8)
+    for nip in sorted(str(data.get("NIP", "")) for data in rows): h.update(b"\0" + nip.encode("utf-8"))
+    return os.path.join(directory, f"profil_{h.hexdigest()}.zip")
+
+# Lock per path hanya hidup selama ada yang memegangnya, sehingga dict tidak tumbuh per filter
+_locks = weakref.WeakValueDictionary()
+_locks_guard = threading.Lock()
+
+def _path_lock(path) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(os.path.abspath(path), threading.Lock())
+
+def prune_exports(directory=EXPORT_DIR, keep=EXPORT_KEEP):
+    """Hapus ZIP profil terlama di atas ``keep``; ZIP yang sedang dibangun dilewati."""
+    try: names = [n for n in os.listdir(directory) if n.startswith("profil_") and n.endswith(".zip")]
+    except FileNotFoundError: return
+    paths = sorted((os.path.join(directory, n) for n in names), key=lambda p: os.path.getmtime(p), reverse=True)
+    for path in paths[keep:]:
+        lock = _path_lock(path)
+        if not lock.acquire(blocking=False): continue
+        try: os.remove(path)
+        except OSError: pass
+        finally: lock.release()
+
+@timed("pdf")
+def export_profiles(rows, out_path=None, workers=None, chunk=CHUNK_PROFILES, progress=None, key="") -> ExportResult:
+    """Ekspor PDF profil untuk ``rows`` (dict berisi semua kolom pegawai) ke ZIP ``out_path``.
+
+    Tanpa ``out_path`` ZIP ditaruh di ``export_path(rows, key)``, sehingga tiap
+    filter punya file sendiri dan ekspor bersamaan tidak saling menimpa; ekspor
+    ke path yang sama diserialkan dengan lock per path. PDF dirender di process
+    pool ke file sementara lalu dialirkan ke ZIP satu per satu, jadi memori tidak
+    bergantung pada jumlah pegawai. Pegawai yang kunci baris+fotonya sama dengan
+    ekspor sebelumnya disalin dari ZIP lama tanpa dirender ulang. ZIP lama diganti
+    atomik (``os.replace``) setelah selesai.
+    """
+    out_path = out_path or export_path(rows, key)
+    with _path_lock(out_path):
+        result = _export_profiles(rows, out_path, workers, chunk, progress)
+    if os.path.dirname(out_path) == EXPORT_DIR: prune_exports()
+    return result
+
+def _export_profiles(rows, out_path, workers, chunk, progress) -> ExportResult:
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    old = read_manifest(out_path)
+    manifest, reuse, render = {}, [], []
+    for data in rows:
+        name, key = profile_filename(data), profile_key(data)
+        if name in manifest: continue
+        manifest[name] = key
+        (reuse if old.get(name) == key else render).append((name, data))
+    result = ExportResult(out_path, total=len(manifest))
+    fd, tmp_zip = tempfile.mkstemp(prefix=".profil_", suffix=".zip", dir=os.path.dirname(out_path) or ".")
+    os.close(fd)
+    work_dir = tempfile.mkdtemp(prefix="profil_pdf_")
+    try:
+        # PDF dari FPDF sudah terkompresi, ZIP cukup menyimpan apa adanya
+        with zipfile.ZipFile(tmp_zip, "w", zipfile.ZIP_STORED) as zf:
+            if reuse:
+                with zipfile.ZipFile(out_path) as prev:
+                    for name, _ in reuse:
+                        with prev.open(name) as src, zf.open(name, "w") as dst: shutil.copyfileobj(src, dst)
+                        result.reused += 1
+                if progress: progress(result.reused, result.total)
+            data_rows = [data for _, data in render]
+            jobs = [(data_rows[i:i + chunk], work_dir) for i in range(0, len(data_rows), chunk)]
+            for done in map_chunks(_render_chunk, jobs, workers):
+                for name, path in done:
+                    zf.write(path, name); os.remove(path)
+                    result.rendered += 1
+                if progress: progress(result.reused + result.rendered, result.total)
+            zf.writestr(MANIFEST, json.dumps(manifest), zipfile.ZIP_DEFLATED)
+        os.replace(tmp_zip, out_path)
+    except BaseException:
+        if os.path.exists(tmp_zip): os.remove(tmp_zip)
+        raise
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return result
@@ -0,0 +1,111 @@
+"""Query builder tabel pegawai: filter Laporan dijalankan sebagai SQL berparameter."""
+import datetime
+from functools import lru_cache
+
+import pandas as pd
+
+from simpeg.db import EXPECTED_COLS, SEARCH_FIELDS, get_pool, quote_ident, table_version
+from simpeg.search import match_expression
+
+# Kolom FTS yang dipakai pencarian global Laporan (Nama/NIP)
+SEARCH_COLS = ["nama","nip"]
+
+# Grid halaman Pegawai: kolom awal yang ditampilkan dan ukuran halaman
+GRID_COLS = ["NIP","NAMA","NAMA JABATAN","JENIS JABATAN","UNOR INDUK","JENIS KELAMIN","TINGKAT PENDIDIKAN"]
+PAGE_SIZES = [25, 50, 100, 200]
+
+# Batas usia pensiun (BUP) umum
+RETIREMENT_AGE = 58
+
+def build_where(filters=None, search="", search_cols=SEARCH_COLS):
+    """Ubah ``{kolom: [nilai,...]}`` + kata kunci menjadi klausa WHERE dan parameternya.
+
+    Nilai tuple ``(dari, sampai)`` menjadi rentang inklusif (ujung ``None`` terbuka),
+    mis. rentang tanggal ISO yang memakai indeks kolom tanggal. Kata kunci
+    dicocokkan lewat indeks FTS5 ``pegawai_fts``.
+    """
+    clauses, params = [], []
+    for col, values in (filters or {}).items():
+        if not values: continue
+        if isinstance(values, tuple):
+            lo, hi = values
+            if lo is not None: clauses.append(f"{quote_ident(col)} >= ?"); params.append(lo)
+            if hi is not None: clauses.append(f"{quote_ident(col)} <= ?"); params.append(hi)
+            continue
+        clauses.append(f"{quote_ident(col)} IN ({','.join(['?'] * len(values))})")
+        params.extend(values)
+    expr = match_expression(search, search_cols) if search else None
+    if expr:
+        clauses.append("rowid IN (SELECT rowid FROM pegawai_fts WHERE pegawai_fts MATCH ?)")
+        params.append(expr)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+def select_sql(cols, where="", order_by=None, limit=None, offset=None) -> str:
+    sql = f"SELECT {','.join(quote_ident(c) for c in cols)} FROM pegawai{where}"
+    if order_by: sql += f" ORDER BY {order_by}"
+    if limit is not None: sql += f" LIMIT {int(limit)}"
+    if offset: sql += f" OFFSET {int(offset)}"
+    return sql
+
+def pegawai_sql(cols, filters=None, search="", order_by=None, limit=None, offset=None, search_cols=SEARCH_COLS):
+    where, params = build_where(filters, search, search_cols)
+    return select_sql(cols, where, order_by, limit, offset), params
+
+def query_pegawai(cols, filters=None, search="", order_by=None, limit=None, offset=None, search_cols=SEARCH_COLS) -> pd.DataFrame:
+    """Hanya baris yang cocok dan kolom ``cols`` yang dibaca dari database."""
+    return get_pool().read_frame(*pegawai_sql(cols, filters, search, order_by, limit, offset, search_cols))
+
+def pegawai_rows(nip) -> pd.DataFrame:
+    """Satu pegawai (semua kolom) lewat PRIMARY KEY NIP; frame kosong bila tidak ada."""
+    return get_pool().read_frame("SELECT * FROM pegawai WHERE NIP = ?", (str(nip),))
+
+def count_pegawai(filters=None, search="", search_cols=SEARCH_COLS) -> int:
+    where, params = build_where(filters, search, search_cols)
+    return get_pool().query(f"SELECT COUNT(*) FROM pegawai{where}", params)[0][0]
+
+def page_pegawai(cols, search="", sort_col="NAMA", descending=False, page=1, page_size=50, filters=None):
+    """Satu halaman grid: hanya ``page_size`` baris dan kolom ``cols`` yang dibaca.
+
+    Urutan dijalankan di SQL (``rowid`` sebagai pemecah seri agar halaman
+    stabil), pencarian memakai indeks FTS atas semua kolom pencarian.
+    Mengembalikan ``(DataFrame, total_baris, halaman)``; halaman dijepit ke rentang yang ada.
+    """
+    if sort_col not in EXPECTED_COLS: raise ValueError(sort_col)
+    cols = [c for c in cols if c in EXPECTED_COLS] or ["NIP"]
+    search_cols = list(SEARCH_FIELDS)
+    total = count_pegawai(filters, search, search_cols)
+    page = max(1, min(int(page), -(-total // page_size) or 1))
+    order_by = f"{quote_ident(sort_col)} {'DESC' if descending else 'ASC'}, rowid"
+    frame = query_pegawai(cols, filters, search, order_by, page_size, (page - 1) * page_size, search_cols)
+    return frame, total, page
+
+# ================== Rentang Tanggal ==================
+def _years_before(day: datetime.date, years: int) -> datetime.date:
+    try: return day.replace(year=day.year - years)
+    except ValueError: return day.replace(year=day.year - years, day=28)  # 29 Februari
+
+def age_range(min_age=None, max_age=None, today=None) -> tuple:
+    """Rentang TANGGAL LAHIR (ISO) untuk usia genap ``min_age``..``max_age`` tahun pada ``today``."""
+    today = today or datetime.date.today()
+    hi = _years_before(today, min_age).isoformat() if min_age is not None else None
+    lo = (_years_before(today, max_age + 1) + datetime.timedelta(days=1)).isoformat() if max_age is not None else None
+    return lo, hi
+
+def retirement_range(years_ahead=1, age=RETIREMENT_AGE, today=None) -> tuple:
+    """Rentang TANGGAL LAHIR pegawai yang mencapai usia ``age`` antara hari ini dan ``years_ahead`` tahun ke depan."""
+    today = today or datetime.date.today()
+    return (_years_before(today, age) + datetime.timedelta(days=1)).isoformat(), _years_before(today, age - years_ahead).isoformat()
+
+def date_range(start=None, end=None) -> tuple:
+    return (start.isoformat() if start else None, end.isoformat() if end else None)
+
+@lru_cache(maxsize=32)
+def _distinct(path, version, col):
+    q = quote_ident(col)
+    return [r[0] for r in get_pool().query(f"SELECT DISTINCT {q} FROM pegawai WHERE {q} IS NOT NULL ORDER BY {q}")]
+
+def distinct_values(col) -> list:
+    """Daftar opsi filter dari indeks kolom, di-cache per versi data."""
+    pool = get_pool()
+    with pool.reader() as conn: version = table_version(conn)
+    return _distinct(pool.path, version, col)
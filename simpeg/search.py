@@ -0,0 +1,101 @@
+"""Pencarian pegawai lewat indeks FTS5: prefix, toleran salah ketik, berperingkat dan berhalaman."""
+import re
+from functools import lru_cache
+
+import pandas as pd
+
+from simpeg.db import FUZZY_FIELDS, SEARCH_FIELDS, get_pool, quote_ident, table_version
+
+RESULT_COLS = ["NAMA","NIP","NIK","NAMA JABATAN","UNOR INDUK"]
+# Bobot bm25 per kolom FTS (urutan SEARCH_FIELDS): kecocokan NIP/NIK paling kuat
+RANK_WEIGHTS = {"nama": 4.0, "nip": 10.0, "nik": 10.0, "jabatan": 1.0}
+MAX_FUZZY_TERMS = 20
+
+def tokenize(text) -> list:
+    return [t for t in re.split(r"[\W_]+", str(text or "").lower()) if t]
+
+def _max_typos(token: str) -> int:
+    if token.isdigit() or len(token) < 4: return 0
+    return 1 if len(token) < 8 else 2
+
+def _distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein dengan batas; mengembalikan limit + 1 bila melewati batas."""
+    if abs(len(a) - len(b)) > limit: return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+        if min(cur) > limit: return limit + 1
+        prev = cur
+    return prev[-1]
+
+@lru_cache(maxsize=64)
+def _vocabulary(path, version, initial):
+    # Hanya term nama/jabatan berhuruf awal sama, dibaca lewat batasan rentang term fts5vocab; di-cache per versi data
+    marks = ",".join("?" * len(FUZZY_FIELDS))
+    rows = get_pool().query(f"SELECT DISTINCT term FROM pegawai_fts_col_vocab WHERE term >= ? AND term < ? AND col IN ({marks})",
+                            (initial, chr(ord(initial) + 1), *FUZZY_FIELDS))
+    return tuple(term for (term,) in rows)
+
+def similar_terms(token: str) -> list:
+    limit = _max_typos(token)
+    if not limit: return []
+    pool = get_pool()
+    with pool.reader() as conn: version = table_version(conn)
+    scored = []
+    for term in _vocabulary(pool.path, version, token[0]):
+        # Bandingkan juga dengan awalan term agar ketikan yang belum selesai tetap cocok
+        d = min(_distance(token, term, limit), _distance(token, term[:len(token)], limit))
+        if d <= limit: scored.append((d, term))
+    return [t for _, t in sorted(scored)[:MAX_FUZZY_TERMS]]
+
+def _columns_prefix(columns) -> str:
+    return "{" + " ".join(columns) + "} : " if columns else ""
+
+def _has_hits(expr: str) -> bool:
+    return bool(get_pool().query("SELECT 1 FROM pegawai_fts WHERE pegawai_fts MATCH ? LIMIT 1", (expr,)))
+
+def match_expression(text, columns=None, fuzzy=True):
+    """Bangun ekspresi MATCH FTS5; None bila teks tidak mengandung token.
+
+    Setiap token dicari sebagai prefix. Bila tidak ada hasil sama sekali,
+    token diperluas dengan term di indeks yang berjarak edit kecil.
+    """
+    tokens = tokenize(text)
+    if not tokens: return None
+    prefix = _columns_prefix(columns)
+    expr = prefix + "(" + " AND ".join(f'"{t}"*' for t in tokens) + ")"
+    if not fuzzy or _has_hits(expr): return expr
+    groups = []
+    for t in tokens:
+        alts = [f'"{t}"*'] + [f'"{s}"' for s in similar_terms(t) if s != t]
+        groups.append("(" + " OR ".join(alts) + ")")
+    return prefix + "(" + " AND ".join(groups) + ")"
+
+def search(text, cols=RESULT_COLS, limit=20, offset=0, columns=None):
+    """Cari pegawai; hasil berperingkat bm25. Mengembalikan (DataFrame halaman ini, total hasil)."""
+    expr = match_expression(text, columns)
+    if expr is None: return pd.DataFrame(columns=cols), 0
+    weights = ",".join(str(RANK_WEIGHTS[f]) for f in SEARCH_FIELDS)
+    select_cols = ",".join(f"p.{quote_ident(c)}" for c in cols)
+    pool = get_pool()
+    total = pool.query("SELECT COUNT(*) FROM pegawai_fts WHERE pegawai_fts MATCH ?", (expr,))[0][0]
+    frame = pool.read_frame(
+        f"""SELECT {select_cols} FROM pegawai_fts JOIN pegawai p ON p.rowid = pegawai_fts.rowid
+            WHERE pegawai_fts MATCH ? ORDER BY bm25(pegawai_fts, {weights}) LIMIT ? OFFSET ?""",
+        (expr, int(limit), int(offset)))
+    return frame, total
+
+def resolve_nip(nip):
+    """NIP tersimpan untuk masukan pengguna: cocok persis, atau token NIP yang sama (mis. tanpa tanda kutip)."""
+    if not nip: return None
+    pool = get_pool()
+    row = pool.query("SELECT NIP FROM pegawai WHERE NIP = ?", (str(nip),))
+    if row: return row[0][0]
+    tokens = tokenize(nip)
+    if not tokens: return None
+    expr = "{nip} : (" + " AND ".join(f'"{t}"' for t in tokens) + ")"
+    row = pool.query("SELECT p.NIP FROM pegawai_fts JOIN pegawai p ON p.rowid = pegawai_fts.rowid "
+                     "WHERE pegawai_fts MATCH ? LIMIT 1", (expr,))
+    return row[0][0] if row else None
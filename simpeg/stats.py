@@ -0,0 +1,60 @@
+"""Baca statistik pegawai dari tabel agregat ``pegawai_stats`` yang dipelihara trigger."""
+import datetime
+
+import pandas as pd
+
+from simpeg.db import STAT_DIMS, TMT_FIELDS, get_pool
+from simpeg.normalize import AGE_LABELS, age_buckets
+
+def stat_counts(dim, include_empty=False) -> pd.DataFrame:
+    """Kolom ``key`` dan ``jumlah`` untuk satu dimensi, terbanyak dulu."""
+    if dim not in STAT_DIMS: raise ValueError(dim)
+    where = "" if include_empty else " AND key <> ''"
+    return get_pool().read_frame(
+        f"SELECT key, jumlah FROM pegawai_stats WHERE dim = ?{where} ORDER BY jumlah DESC, key", (dim,))
+
+def stat_dict(dim) -> dict:
+    df = stat_counts(dim)
+    return dict(zip(df["key"], df["jumlah"].astype(int)))
+
+def total_pegawai() -> int:
+    rows = get_pool().query("SELECT jumlah FROM pegawai_stats WHERE dim = 'total'")
+    return int(rows[0][0]) if rows else 0
+
+def age_bucket_counts(today=None) -> pd.DataFrame:
+    """Kelompok usia dari hitungan per tahun lahir (usia = tahun ini - tahun lahir)."""
+    today = today or datetime.date.today()
+    df = stat_counts("tahun_lahir")
+    if df.empty: return pd.DataFrame({"Kelompok Usia": AGE_LABELS, "Jumlah": 0})
+    usia = today.year - pd.to_numeric(df["key"], errors="coerce")
+    bucket = age_buckets(usia)
+    counts = df["jumlah"].groupby(bucket, observed=False).sum()
+    return pd.DataFrame({"Kelompok Usia": AGE_LABELS, "Jumlah": counts.reindex(AGE_LABELS, fill_value=0).astype(int).values})
+
+# ================== Kubus TMT ==================
+def _tmt_where(field, units=None):
+    if field not in TMT_FIELDS: raise ValueError(field)
+    clauses, params = ["field = ?"], [field]
+    if units:
+        clauses.append(f"unor IN ({','.join(['?'] * len(units))})"); params.extend(units)
+    return " WHERE " + " AND ".join(clauses), params
+
+def tmt_units(field) -> list:
+    return [r[0] for r in get_pool().query(
+        "SELECT DISTINCT unor FROM tmt_cube WHERE field = ? AND unor <> '' ORDER BY unor", (field,))]
+
+def tmt_yearly(field, units=None) -> pd.DataFrame:
+    """Kolom TAHUN, JUMLAH; ``units`` kosong berarti semua UNOR INDUK."""
+    where, params = _tmt_where(field, units)
+    return get_pool().read_frame(f"SELECT tahun AS TAHUN, SUM(jumlah) AS JUMLAH FROM tmt_cube{where} GROUP BY tahun ORDER BY tahun", params)
+
+def tmt_monthly(field, tahun, units=None) -> pd.DataFrame:
+    where, params = _tmt_where(field, units)
+    return get_pool().read_frame(f"SELECT bulan AS BULAN, SUM(jumlah) AS JUMLAH FROM tmt_cube{where} AND tahun = ? "
+                                 f"GROUP BY bulan ORDER BY bulan", params + [int(tahun)])
+
+def tmt_yearly_by_unit(field, units) -> pd.DataFrame:
+    """Tabel TAHUN x UNOR INDUK untuk perbandingan tren antar unit."""
+    where, params = _tmt_where(field, units)
+    df = get_pool().read_frame(f"SELECT tahun, unor, SUM(jumlah) AS jumlah FROM tmt_cube{where} GROUP BY tahun, unor", params)
+    return df.pivot(index="tahun", columns="unor", values="jumlah").fillna(0).astype(int)
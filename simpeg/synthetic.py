@@ -0,0 +1,125 @@
+"""Generator data sintetis ber-seed: pegawai (EXPECTED_COLS) dan riwayat audit log, untuk benchmark."""
+import datetime
+import random
+
+from simpeg.db import EXPECTED_COLS, get_pool, upsert_sql
+
+CHUNK_ROWS = 5000
+
+FIRST_NAMES = ["AGUS","BUDI","DEWI","EKA","FRANSISKA","GABRIEL","HANA","IRMA","JOHANES","KORNELIA","LUKAS","MARIA",
+               "NURHAYATI","OKTAVIANUS","PETRUS","RATNA","SAHARUDDIN","TERESIA","YOHANA","YULIANUS","MARDIANA","DESILVA"]
+LAST_NAMES = ["", "", "WANIMBO","LAURENS","MAGAI","KOGOYA","RUMBIAK","SIMANJUNTAK","PASARIBU","NATKIME","BEANAL",
+              "MATURAN","RAHAYU","SANTOSO","TAPILATU","WAROMI","HUTAGALUNG"]
+TEMPAT_LAHIR = ["MIMIKA","JAYAPURA","TORAJA","FAK-FAK","MERAUKE","BIAK","MAKASSAR","AMBON","MANADO","SORONG"]
+# Variasi penulisan seperti di data asli (normalisasi gender/pendidikan harus menanganinya)
+GENDER_VARIANTS = [("F", 50), ("M", 40), ("P", 3), ("L", 3), ("Perempuan", 2), ("Laki-laki", 2)]
+EDUCATION_VARIANTS = [("S-1/Sarjana", 40), ("SLTA", 18), ("Diploma III/Sarjana Muda", 13), ("S-2", 12), ("SLTA Kejuruan", 5),
+                      ("S1", 3), ("SMA", 3), ("Diploma IV", 2), ("SLTP", 2), ("S-3", 1), ("D3", 1)]
+AGAMA = [("Kristen", 52), ("Katholik", 28), ("Islam", 19), ("Hindu", 0.5), ("Budha", 0.5)]
+JENIS_KAWIN = [("Menikah", 69), ("Belum Kawin", 29), ("Cerai Mati", 1), ("Cerai Hidup", 1)]
+GOLONGAN = ["II/a","II/b","II/c","II/d","III/a","III/b","III/c","III/d","IV/a","IV/b","IV/c"]
+JENIS_JABATAN = [("Jabatan Fungsional", 46), ("Jabatan Pelaksana", 41), ("Jabatan Struktural", 13)]
+JABATAN = {
+    "Jabatan Fungsional": ["Guru Ahli Pertama","Guru Ahli Muda","Perawat Terampil","Bidan Ahli Pertama","Dokter Ahli Pertama",
+                           "Analis Kebijakan Ahli Muda","Penyuluh Pertanian Ahli Pertama"],
+    "Jabatan Pelaksana": ["PELAKSANA","PENELAAH TEKNIS KEBIJAKAN","PENGADMINISTRASI PERKANTORAN","OPERATOR LAYANAN OPERASIONAL",
+                          "PENGOLAH DATA DAN INFORMASI"],
+    "Jabatan Struktural": ["Kepala Dinas","Sekretaris","Kepala Bidang","Kepala Sub Bagian","Kepala Seksi","Camat"],
+}
+UNOR_INDUK = [" Dinas Pendidikan"," Dinas Kesehatan"," Pemerintah Kabupaten Mimika"," Badan Pengelolaan Keuangan dan Asset Daerah",
+              " Dinas Kependudukan Dan Pencatatan Sipil"," Badan Kepegawaian dan Pengembangan Sumber Daya Manusia",
+              " Dinas Pekerjaan Umum dan Penataan Ruang"," Dinas Perhubungan"," Dinas Sosial"," Badan Kesatuan Bangsa Dan Politik",
+              " Dinas Satuan Polisi Pamong Praja"," Rumah Sakit Umum Daerah"," Dinas Pertanian"," Inspektorat",
+              " Badan Perencanaan Pembangunan Daerah"," Sekretariat DPRD"] + [f" Distrik {d}" for d in
+              ["Mimika Baru","Kuala Kencana","Wania","Kwamki Narama","Mimika Timur","Agimuga","Jila","Tembagapura"]]
+UNOR_WEIGHTS = [22, 12, 10] + [3] * (len(UNOR_INDUK) - 3)
+SUB_UNOR = ["Sub Bagian Umum dan Kepegawaian ","Sub Bagian Program dan Keuangan ","Bidang Pelayanan ","Bidang Pembinaan ",
+            "Seksi Data dan Informasi ","UPTD "]
+AUDIT_ACTIONS = [("LOGIN", 45), ("LOGOUT", 30), ("UPDATE", 12), ("INSERT", 5), ("DELETE", 2), ("EXPORT_PROFIL", 1),
+                 ("IDCARD_BATCH", 1), ("BACKUP", 2), ("RESTORE", 1), ("RESET_PASSWORD", 1)]
+AUDIT_USERS = [("admin", "Admin"), ("supervisor", "Supervisor"), ("user", "User")]
+
+def _pick(rng, weighted):
+    values, weights = zip(*weighted)
+    return rng.choices(values, weights)[0]
+
+def _date(d: datetime.date) -> str: return d.isoformat()
+
+def _rand_date(rng, start: datetime.date, end: datetime.date) -> datetime.date:
+    return start + datetime.timedelta(days=rng.randrange(max((end - start).days, 1)))
+
+def make_pegawai(rng, seq, today) -> dict:
+    """Satu pegawai dengan NIP/NIK yang konsisten dengan tanggal lahir, TMT dan gender."""
+    lahir = _rand_date(rng, datetime.date(today.year - 60, 1, 1), datetime.date(today.year - 20, 1, 1))
+    tmt_cpns = datetime.date(min(lahir.year + rng.randint(19, 40), today.year), rng.randint(1, 12), 1)
+    if tmt_cpns > today: tmt_cpns = datetime.date(today.year, 1, 1)
+    status = "C" if (today - tmt_cpns).days < 365 else "P"
+    tmt_pns = None if status == "C" else datetime.date(tmt_cpns.year + 1, tmt_cpns.month, 1)
+    gender = _pick(rng, GENDER_VARIANTS)
+    female = gender.upper() in ("F", "P", "PEREMPUAN")
+    nip = f"'{lahir:%Y%m%d}{tmt_cpns:%Y%m}{2 if female else 1}{seq % 1000:03d}"
+    nik = f"'9109{rng.randint(10, 99)}{lahir.day + (40 if female else 0):02d}{lahir:%m%y}{rng.randint(1, 9999):04d}"
+    jenis = _pick(rng, JENIS_JABATAN)
+    unor = rng.choices(UNOR_INDUK, UNOR_WEIGHTS)[0]
+    gol_awal = rng.choice(GOLONGAN[:5])
+    gol_akhir = GOLONGAN[min(GOLONGAN.index(gol_awal) + rng.randint(0, 4), len(GOLONGAN) - 1)]
+    mk_days = (today - tmt_cpns).days
+    tmt_gol = _rand_date(rng, tmt_cpns, today) if status == "P" else tmt_cpns
+    nama = (rng.choice(FIRST_NAMES) + " " + rng.choice(LAST_NAMES)).strip()
+    pendidikan = _pick(rng, EDUCATION_VARIANTS)
+    row = dict.fromkeys(EXPECTED_COLS)
+    row.update({
+        "NIP": nip, "NAMA": nama, "GELAR DEPAN": "dr" if rng.random() < 0.01 else None,
+        "GELAR BELAKANG": rng.choice([None, "S.Pd", "SE", "A.Md.Kep", "S.Kep", "ST", "S.Sos"]),
+        "TEMPAT LAHIR": rng.choice(TEMPAT_LAHIR), "TANGGAL LAHIR": _date(lahir), "JENIS KELAMIN": gender,
+        "AGAMA": _pick(rng, AGAMA), "JENIS KAWIN": _pick(rng, JENIS_KAWIN), "NIK": nik,
+        "NOMOR HP": f"08{rng.randint(1000000000, 9999999999)}", "EMAIL": f"{nama.split()[0].lower()}{seq}@example.go.id",
+        "ALAMAT": f"JL. {rng.choice(['BUDI UTOMO','HASANUDDIN','CENDERAWASIH','YOS SUDARSO'])} NO. {rng.randint(1, 200)}",
+        "NPWP": "'", "BPJS": "'", "JENIS PEGAWAI": "PNS Daerah Kab./Kota yang bekerja pada Kab./Kota",
+        "KEDUDUKAN HUKUM": "Aktif", "STATUS CPNS PNS": status, "KARTU ASN VIRTUAL": f"A{today.year}{seq:08d}",
+        "TMT CPNS": _date(tmt_cpns), "TMT PNS": _date(tmt_pns) if tmt_pns else None,
+        "GOL AWAL": gol_awal, "GOL AKHIR": gol_akhir, "TMT GOLONGAN": _date(tmt_gol),
+        "MK TAHUN": mk_days // 365, "MK BULAN": mk_days % 365 // 30,
+        "JENIS JABATAN": jenis, "NAMA JABATAN": rng.choice(JABATAN[jenis]),
+        "TMT JABATAN": _date(_rand_date(rng, tmt_cpns, today)), "TINGKAT PENDIDIKAN": pendidikan,
+        "NAMA PENDIDIKAN": f"{pendidikan.split('/')[0].upper()} {rng.choice(['EKONOMI','KEPERAWATAN','PENDIDIKAN GURU','HUKUM','TEKNIK SIPIL'])}",
+        "NAMA UNOR": None if rng.random() < 0.09 else rng.choice(SUB_UNOR) + unor.strip(),
+        "UNOR INDUK": unor, "FOTO": None,
+    })
+    return row
+
+def iter_pegawai(n, seed=42, today=None):
+    rng = random.Random(seed)
+    today = today or datetime.date.today()
+    for i in range(n): yield make_pegawai(rng, i, today)
+
+def iter_audit(n, seed=42, days=365, now=None):
+    rng = random.Random(seed + 1)
+    now = now or datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    step = days * 86400 / max(n, 1)
+    for i in range(n):
+        user, role = rng.choice(AUDIT_USERS)
+        action = _pick(rng, AUDIT_ACTIONS)
+        ts = now - datetime.timedelta(seconds=(n - i) * step)
+        yield (user, role, action, f"'{rng.randint(10**17, 10**18 - 1)}" if action in ("UPDATE", "INSERT", "DELETE") else user,
+               ts.strftime("%Y-%m-%d %H:%M:%S"))
+
+def fill_database(n_pegawai, n_audit=0, seed=42, chunk_rows=CHUNK_ROWS, progress=None):
+    """Isi database aktif (``init_db`` sudah dijalankan) dengan data sintetis; NIP yang sama ditimpa."""
+    pool = get_pool()
+    sql = upsert_sql(tuple(EXPECTED_COLS))
+    buf, done = [], 0
+    for row in iter_pegawai(n_pegawai, seed):
+        buf.append(tuple(row[c] for c in EXPECTED_COLS))
+        if len(buf) >= chunk_rows:
+            pool.executemany(sql, buf); done += len(buf); buf = []
+            if progress: progress("pegawai", done)
+    if buf: pool.executemany(sql, buf); done += len(buf)
+    buf, done = [], 0
+    for rec in iter_audit(n_audit, seed):
+        buf.append(rec)
+        if len(buf) >= chunk_rows:
+            pool.executemany("INSERT INTO audit_log (user, role, action, target, timestamp) VALUES (?,?,?,?,?)", buf)
+            done += len(buf); buf = []
+            if progress: progress("audit", done)
+    if buf: pool.executemany("INSERT INTO audit_log (user, role, action, target, timestamp) VALUES (?,?,?,?,?)", buf)
@@ -0,0 +1,178 @@
+"""Pengguna aplikasi: tabel ``users`` (hash bcrypt), cache baca per proses, verifikasi login terbatas."""
+import collections
+import concurrent.futures
+import threading
+import time
+from dataclasses import dataclass
+
+from simpeg.db import get_pool, table_version
+
+ROLES = ["Admin","User","Supervisor"]
+# Akun awal, di-hash sekali saat tabel users masih kosong
+DEFAULT_USERS = [("admin", "admin123!", "Admin"), ("supervisor", "Super123!", "Supervisor"), ("user", "User123!", "User")]
+
+LOGIN_WORKERS = 2
+LOGIN_QUEUE = 16
+LOGIN_TIMEOUT = 15
+MAX_FAILURES = 5
+FAILURE_WINDOW = 300
+# Batas username yang dilacak RateLimiter; yang paling lama tidak gagal dibuang lebih dulu
+MAX_TRACKED = 1024
+
+# ================== Hash ==================
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(LOGIN_QUEUE)
+
+def _pool() -> concurrent.futures.ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = concurrent.futures.ThreadPoolExecutor(LOGIN_WORKERS, thread_name_prefix="bcrypt")
+    return _executor
+
+class Busy(RuntimeError):
+    """Antrian bcrypt penuh; pemanggil sebaiknya meminta pengguna mencoba lagi."""
+
+def _run_bcrypt(fn, *args):
+    # bcrypt melepas GIL, tapi jumlah hash bersamaan tetap dibatasi agar rerun lain tidak kelaparan CPU
+    if not _slots.acquire(blocking=False): raise Busy()
+    try:
+        future = _pool().submit(fn, *args)
+    except BaseException:
+        _slots.release(); raise
+    # Slot baru dilepas saat hash benar-benar selesai, bukan saat pemanggil berhenti menunggu (timeout)
+    future.add_done_callback(lambda _: _slots.release())
+    return future.result(timeout=LOGIN_TIMEOUT)
+
+def _hashpw(pw):
+    import bcrypt
+    return bcrypt.hashpw(pw.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+
+def _checkpw(pw, h):
+    import bcrypt
+    return bcrypt.checkpw(pw.encode("utf-8"), h.encode("utf-8"))
+
+def hash_password(password: str) -> str: return _run_bcrypt(_hashpw, password)
+
+def check_password(password: str, password_hash: str) -> bool: return _run_bcrypt(_checkpw, password, password_hash)
+
+# ================== Cache Baca ==================
+class UserCache:
+    """``{username: {"role", "password_hash"}}`` bersama untuk semua sesi, dimuat ulang saat versi tabel berubah."""
+
+    def __init__(self):
+        self._data, self._key = None, None
+        self._lock = threading.Lock()
+
+    def get(self) -> dict:
+        pool = get_pool()
+        with pool.reader() as conn: key = (pool.path, table_version(conn, "users"))
+        data = self._data
+        if data is not None and self._key == key: return data
+        with self._lock:
+            if self._data is None or self._key != key:
+                rows = pool.query("SELECT username, password_hash, role FROM users ORDER BY rowid")
+                self._data = {u: {"password_hash": h, "role": r} for u, h, r in rows}
+                self._key = key
+            return self._data
+
+    def invalidate(self):
+        with self._lock: self._data = None
+
+_cache = UserCache()
+
+def get_users() -> dict:
+    return _cache.get()
+
+def ensure_default_users():
+    if get_pool().query("SELECT 1 FROM users LIMIT 1"): return
+    rows = [(u, hash_password(pw), role) for u, pw, role in DEFAULT_USERS]
+    get_pool().executemany("INSERT OR IGNORE INTO users (username, password_hash, role) VALUES (?,?,?)", rows)
+    _cache.invalidate()
+
+# ================== Tulis ==================
+def add_user(username, password, role):
+    """Tambah pengguna baru; ``ValueError`` bila username sudah ada atau role tidak dikenal."""
+    if role not in ROLES: raise ValueError(f"Role tidak dikenal: {role}")
+    if username in get_users(): raise ValueError("Username sudah ada.")
+    n = get_pool().execute("INSERT OR IGNORE INTO users (username, password_hash, role) VALUES (?,?,?)",
+                           (username, hash_password(password), role))
+    _cache.invalidate()
+    if n == 0: raise ValueError("Username sudah ada.")
+
+def set_password(username, password) -> bool:
+    """Ganti hash password; ``False`` bila username tidak ada."""
+    if username not in get_users(): return False
+    n = get_pool().execute("UPDATE users SET password_hash = ? WHERE username = ?", (hash_password(password), username))
+    _cache.invalidate()
+    return n > 0
+
+# ================== Login ==================
+class RateLimiter:
+    """Kunci username sementara setelah ``max_failures`` gagal dalam ``window`` detik."""
+
+    def __init__(self, max_failures=MAX_FAILURES, window=FAILURE_WINDOW, max_tracked=MAX_TRACKED):
+        self.max_failures, self.window, self.max_tracked = max_failures, window, max_tracked
+        # Urut dari kegagalan terakhir yang paling lama (LRU)
+        self._failures = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _prune(self, q, now):
+        while q and now - q[0] >= self.window: q.popleft()
+
+    def retry_after(self, username, now=None) -> float:
+        """Detik sampai boleh mencoba lagi; 0 bila tidak dikunci."""
+        now = now or time.monotonic()
+        with self._lock:
+            q = self._failures.get(username)
+            if not q: return 0.0
+            self._prune(q, now)
+            if len(q) < self.max_failures:
+                if not q: del self._failures[username]
+                return 0.0
+            return self.window - (now - q[0])
+
+    def failed(self, username, now=None):
+        now = now or time.monotonic()
+        with self._lock:
+            q = self._failures.pop(username, None) or collections.deque()
+            q.append(now)
+            self._prune(q, now)
+            self._failures[username] = q
+            # Buang jendela yang sudah kedaluwarsa, lalu yang tertua bila masih di atas batas
+            while self._failures:
+                oldest = next(iter(self._failures.values()))
+                if now - oldest[-1] < self.window and len(self._failures) <= self.max_tracked: break
+                self._failures.popitem(last=False)
+
+    def reset(self, username):
+        with self._lock: self._failures.pop(username, None)
+
+_limiter = RateLimiter()
+
+@dataclass
+class LoginResult:
+    ok: bool
+    role: str = None
+    reason: str = ""  # "", "unknown_user", "wrong_password", "locked", "busy"
+    retry_after: float = 0.0
+
+def verify_login(username, password) -> LoginResult:
+    """Verifikasi login di thread pool bcrypt terbatas, dengan batas gagal per username."""
+    wait = _limiter.retry_after(username)
+    if wait > 0: return LoginResult(False, reason="locked", retry_after=wait)
+    info = get_users().get(username)
+    if info is None:
+        # Username tak dikenal tidak dilacak agar isi limiter tidak bisa dibanjiri nama acak
+        return LoginResult(False, reason="unknown_user")
+    try:
+        ok = check_password(password, info["password_hash"])
+    except (Busy, concurrent.futures.TimeoutError):
+        return LoginResult(False, reason="busy")
+    if not ok:
+        _limiter.failed(username)
+        return LoginResult(False, reason="wrong_password")
+    _limiter.reset(username)
+    return LoginResult(True, role=info["role"])
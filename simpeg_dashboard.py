@@ -1,28 +1,33 @@
 import streamlit as st
 import pandas as pd
-import bcrypt
-import plotly.express as px
-from io import BytesIO
-from fpdf import FPDF
-import sqlite3
 import os
 import re
 from datetime import date
 import datetime
 
+from simpeg.db import (EXPECTED_COLS, TMT_FIELDS, init_db, replace_all, save_row, delete_by_nip, count_quarantine,
+                       load_quarantine, quarantine_sql)
+from simpeg.query import (GRID_COLS, PAGE_SIZES, RETIREMENT_AGE, query_pegawai, pegawai_rows, pegawai_sql, page_pegawai, distinct_values,
+                          age_range, retirement_range, date_range)
+from simpeg.backup import BACKUP_DIR, INTERVAL_HOURS, BackupScheduler, backup_now, list_backups
+from simpeg.export import HEADER_STYLE, XLSX_MIME, deferred
+from simpeg.cards import CARD_FIELDS, generate_id_card, build_id_cards
+from simpeg.profiles import generate_pdf_resmi, export_profiles
+from simpeg.photos import store_photo, photo_bytes, needs_migration, migrate_photos
+from simpeg.stats import stat_counts, age_bucket_counts, total_pegawai, tmt_units, tmt_yearly, tmt_monthly, tmt_yearly_by_unit
+from simpeg.search import search, resolve_nip
+from simpeg.columnar import analytics_counts
+from simpeg.figures import cached_figure, cached_frame, get_figure_cache, normalize_filters
+from simpeg.importer import import_file, plan_restore, preview_restore, apply_restore, discard_restore
+from simpeg.audit import (log_action, audit_log_sql, load_audit_page, count_by_action, distinct_audit_values,
+                          has_audit_log, load_today_logs, count_today_logs)
+from simpeg.metrics import (METRICS_FILE, METRICS_PORT, MetricsExporter, Profiler, Stopwatch, error_summary, get_registry,
+                            prometheus_text, summary as metrics_summary, timed)
+from simpeg.users import ROLES, Busy, add_user, ensure_default_users, get_users, set_password, verify_login
+
 # ================== Konfigurasi Halaman ==================
 st.set_page_config(page_title="SIMPEG Dashboard", page_icon="👥", layout="wide")
 
-# ================== Struktur Data ==================
-EXPECTED_COLS = [
-    "NAMA","NIP","GELAR DEPAN","GELAR BELAKANG","TEMPAT LAHIR","TANGGAL LAHIR",
-    "JENIS KELAMIN","AGAMA","JENIS KAWIN","NIK","NOMOR HP","EMAIL","ALAMAT",
-    "NPWP","BPJS","JENIS PEGAWAI","KEDUDUKAN HUKUM","STATUS CPNS PNS",
-    "KARTU ASN VIRTUAL","TMT CPNS","TMT PNS","GOL AWAL","GOL AKHIR",
-    "TMT GOLONGAN","MK TAHUN","MK BULAN","JENIS JABATAN","NAMA JABATAN",
-    "TMT JABATAN","TINGKAT PENDIDIKAN","NAMA PENDIDIKAN","NAMA UNOR","UNOR INDUK","FOTO"
-]
-
 # ================== Helpers Keamanan ==================
 def is_strong_password(pw: str) -> bool:
     if len(pw) < 8: return False
@@ -33,144 +38,59 @@ def is_strong_password(pw: str) -> bool:
     return True
 
 # ================== Session State ==================
-os.makedirs("images", exist_ok=True)
-os.makedirs("backups", exist_ok=True)
-
-if "users" not in st.session_state:
-    st.session_state.users = {
-        "admin": {
-            "password_hash": bcrypt.hashpw("admin123!".encode("utf-8"), bcrypt.gensalt()).decode("utf-8"),
-            "role": "Admin"
-        },
-        "supervisor": {
-            "password_hash": bcrypt.hashpw("Super123!".encode("utf-8"), bcrypt.gensalt()).decode("utf-8"),
-            "role": "Supervisor"
-        },
-        "user": {
-            "password_hash": bcrypt.hashpw("User123!".encode("utf-8"), bcrypt.gensalt()).decode("utf-8"),
-            "role": "User"
-        }
-    }
-
 if "auth" not in st.session_state:
     st.session_state.auth = {"logged_in": False, "username": None, "role": None}
 
-# ================== Database ==================
-DB_FILE = "simpeg.db"
-
-def conn_db(): return sqlite3.connect(DB_FILE)
-
-def init_db():
-    with conn_db() as conn:
-        cur = conn.cursor()
-        cur.execute("CREATE TABLE IF NOT EXISTS pegawai (NIP TEXT PRIMARY KEY)")
-        cur.execute("""CREATE TABLE IF NOT EXISTS audit_log (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user TEXT, role TEXT, action TEXT, target TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)""")
-        conn.commit()
-    ensure_columns()
-
-def ensure_columns():
-    with conn_db() as conn:
-        cur = conn.cursor()
-        cur.execute("PRAGMA table_info(pegawai)")
-        existing_cols = [row[1] for row in cur.fetchall()]
-        for col in EXPECTED_COLS:
-            if col not in existing_cols:
-                cur.execute(f"ALTER TABLE pegawai ADD COLUMN '{col}' TEXT")
-        conn.commit()
-
-def load_data():
-    with conn_db() as conn: return pd.read_sql_query("SELECT * FROM pegawai", conn)
-
-def save_row(row: dict):
-    for col in EXPECTED_COLS: row.setdefault(col, "")
-    with conn_db() as conn:
-        cols = list(row.keys())
-        placeholders = ",".join(["?"] * len(cols))
-        values = [row.get(c, "") for c in cols]
-        quoted_cols = ",".join([f'"{c}"' for c in cols])
-        conn.execute(f"INSERT OR REPLACE INTO pegawai ({quoted_cols}) VALUES ({placeholders})", values)
-        conn.commit()
-
-def delete_by_nip(nip: str):
-    with conn_db() as conn:
-        conn.execute("DELETE FROM pegawai WHERE NIP = ?", (nip,))
-        conn.commit()
-
-def replace_all(df: pd.DataFrame):
-    for col in EXPECTED_COLS:
-        if col not in df.columns: df[col] = ""
-    df = df[EXPECTED_COLS]
-    with conn_db() as conn:
-        conn.execute("DELETE FROM pegawai")
-        if not df.empty: df.to_sql("pegawai", conn, if_exists="append", index=False)
-
-# ================== Audit Log ==================
-def log_action(user, role, action, target=""):
-    with conn_db() as conn:
-        conn.execute("INSERT INTO audit_log (user, role, action, target) VALUES (?,?,?,?)", (user, role, action, target))
-        conn.commit()
-
-def load_today_logs():
-    with conn_db() as conn: df_log = pd.read_sql_query("SELECT * FROM audit_log", conn)
-    if df_log.empty: return pd.DataFrame()
-    df_log["timestamp"] = pd.to_datetime(df_log["timestamp"], errors="coerce")
-    today = pd.Timestamp.today().normalize()
-    return df_log[df_log["timestamp"].dt.date == today.date()]
-
-def count_today_logs(): return len(load_today_logs())
-
-# ================== PDF ==================
-def generate_pdf_resmi(data, foto_path=None):
-    pdf = FPDF(); pdf.add_page()
-    pdf.set_fill_color(33,150,243); pdf.set_text_color(255,255,255); pdf.set_font("Arial","B",16)
-    pdf.cell(0,12,"PROFIL PEGAWAI",ln=True,align="C",fill=True); pdf.ln(8)
-    if foto_path and os.path.exists(foto_path):
-        try: pdf.image(foto_path,x=160,y=22,w=30,h=40)
-        except: pass
-    pdf.set_text_color(0,0,0); pdf.set_font("Arial",size=12); pdf.ln(20)
-    labels=["NAMA","NIP","NAMA_JABATAN","JENIS_JABATAN","NAMA_UNOR","UNOR INDUK","TMT_JABATAN",
-            "JENIS_KELAMIN","TANGGAL_LAHIR","TINGKAT_PENDIDIKAN","NAMA_PENDIDIKAN","EMAIL","NOMOR HP","ALAMAT"]
-    for key in labels:
-        key_db=key.replace("_"," "); val=str(data.get(key,data.get(key_db,"")))
-        pdf.cell(60,9,key_db,border=1); pdf.cell(0,9,val,border=1,ln=True)
-    return pdf.output(dest="S").encode("latin-1")
-
-def generate_id_card(pegawai):
-    pdf=FPDF("P","mm",(85,54)); pdf.add_page(); pdf.set_fill_color(33,150,243); pdf.rect(0,0,85,54,"F")
-    foto_path=pegawai.get("FOTO","")
-    if foto_path and os.path.exists(foto_path):
-        try: pdf.image(foto_path,x=5,y=6,w=18,h=22)
-        except: pass
-    nama=str(pegawai.get("NAMA","")).strip()
-    nip=str(pegawai.get("NIP","")).strip()
-    jabatan=str(pegawai.get("NAMA JABATAN","")).strip()
-    unit=str(pegawai.get("NAMA UNOR","")).strip()
-    pdf.set_text_color(255,255,255)
-    pdf.set_font("Arial","B",10); pdf.text(28,12,nama[:30])
-    pdf.set_font("Arial","",8)
-    pdf.text(28,17,f"NIP: {nip[:28]}")
-    pdf.text(28,22,f"Jabatan: {jabatan[:28]}")
-    pdf.text(28,27,f"Unit: {unit[:28]}")
-    pdf.set_font("Arial","B",8); pdf.text(5,50,"SIMPEG - Kartu Pegawai")
-    return pdf.output(dest="S").encode("latin-1")
+# ================== Unduhan ==================
+def read_file(path) -> bytes:
+    with open(path, "rb") as f: return f.read()
+
+# ================== Impor ==================
+def run_with_progress(job, uploaded_file, **kwargs):
+    bar = st.progress(0.0, text="Membaca file...")
+    def progress(done, result):
+        text = f"{result.rows} baris diproses ({result.chunks} chunk)"
+        bar.progress(done if done is not None else 0.0, text=text)
+    try:
+        out = job(uploaded_file, uploaded_file.name, progress=progress, **kwargs)
+    except Exception as e:
+        bar.empty()
+        st.error(f"Impor gagal, data pegawai tidak diubah: {e}")
+        return None
+    bar.empty()
+    return out
+
+def show_import_result(result):
+    if result.duplicates: st.warning(f"{result.duplicates} baris dengan NIP ganda digabung (baris terakhir dipakai).")
+    if result.errors:
+        st.warning(f"{result.skipped} baris dilewati.")
+        st.dataframe(pd.DataFrame(result.errors), use_container_width=True)
+    if result.quarantined:
+        st.warning(f"{len(result.quarantined)} nilai tanggal/masa kerja tidak valid dikosongkan dan dicatat di karantina.")
+
+def run_import(uploaded_file, mode="replace"):
+    result = run_with_progress(import_file, uploaded_file, mode=mode)
+    if result:
+        st.info(f"{result.rows} baris diimpor.")
+        show_import_result(result)
+    return result
 
 # ================== Auth helpers ==================
+BUSY_MSG = "Server sedang sibuk memproses login. Coba lagi sebentar."
+
+@timed("login")
 def login(u, p):
-    if u in st.session_state.users:
-        info = st.session_state.users[u]
-        if bcrypt.checkpw(p.encode("utf-8"), info["password_hash"].encode("utf-8")):
-            st.session_state.auth={"logged_in":True,"username":u,"role":info["role"]}
-            log_action(u, info["role"], "LOGIN", u)
-            return True
-        else:
-            st.error("Password salah.")
-            return False
-    else:
-        st.error("Username tidak ditemukan.")
-        return False
+    # Hash tersimpan di tabel users; bcrypt berjalan di thread pool terbatas dengan batas gagal per username
+    res = verify_login(u, p)
+    if res.ok:
+        st.session_state.auth={"logged_in":True,"username":u,"role":res.role}
+        log_action(u, res.role, "LOGIN", u)
+        return True
+    if res.reason == "unknown_user": st.error("Username tidak ditemukan.")
+    elif res.reason == "wrong_password": st.error("Password salah.")
+    elif res.reason == "locked": st.error(f"Terlalu banyak percobaan gagal. Coba lagi dalam {int(res.retry_after) + 1} detik.")
+    else: st.error(BUSY_MSG)
+    return False
 
 def logout():
     if st.session_state.auth["logged_in"]:
@@ -180,11 +100,21 @@ def logout():
 def is_admin(): return st.session_state.auth["role"]=="Admin"
 def is_supervisor(): return st.session_state.auth["role"]=="Supervisor"
 
-# ================== Init DB ==================
-init_db()
-if "pegawai" not in st.session_state: st.session_state.pegawai=load_data()
-
-# ================== Halaman Login + Reset Password ==================
+# ================== Bootstrap ==================
+@st.cache_resource
+def bootstrap():
+    # Sekali per proses, bukan per rerun: folder, migrasi skema (PRAGMA user_version), akun awal,
+    # migrasi foto lama images/{nip}.jpg ke nama hash, lalu thread latar backup dan metrik
+    os.makedirs("images", exist_ok=True)
+    os.makedirs("backups", exist_ok=True)
+    init_db()
+    ensure_default_users()
+    return {"photos": migrate_photos() if needs_migration() else None,
+            "backup": BackupScheduler().start(), "metrics": MetricsExporter().start()}
+
+bootstrap()
+
+# ================== Halaman Login ==================
 if not st.session_state.auth["logged_in"]:
     st.markdown("<h2 style='text-align:center;color:#2196f3;'>SISTEM INFORMASI KEPEGAWAIAN</h2>", unsafe_allow_html=True)
     st.markdown("<p style='text-align:center;'>Halaman Login • Admin • Supervisor • User</p>", unsafe_allow_html=True)
@@ -201,24 +131,10 @@ if not st.session_state.auth["logged_in"]:
         else:
             st.error("Login gagal. Periksa username/password.")
 
-    # Bantuan reset sebelum login
+    # Reset password hanya lewat menu Keamanan (Admin); tabel users dipakai bersama semua sesi
     st.markdown("---")
     st.subheader("🔐 Bantuan Login")
-    st.info("Jika lupa password, reset di sini.")
-
-    with st.form("reset_pw_form"):
-        target_user = st.text_input("Username")
-        new_pw = st.text_input("Password baru", type="password")
-        submit_pw = st.form_submit_button("Reset Password")
-    if submit_pw:
-        if target_user not in st.session_state.users:
-            st.error("Username tidak ditemukan.")
-        elif not is_strong_password(new_pw):
-            st.error("Password terlalu lemah. Minimal 8 karakter dan wajib ada huruf besar, kecil, angka, dan simbol.")
-        else:
-            st.session_state.users[target_user]["password_hash"] = bcrypt.hashpw(new_pw.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-            log_action("SYSTEM", "Admin", "RESET_PASSWORD", target_user)
-            st.success(f"Password {target_user} berhasil direset!")
+    st.info("Jika lupa password, hubungi Admin untuk mereset password melalui menu Keamanan.")
 
     st.stop()
 
@@ -227,7 +143,7 @@ st.sidebar.title("PANEL")
 if is_admin():
     menu = st.sidebar.radio("Navigasi",
         ["Dashboard","Pegawai","Pegawai Grafik","Laporan","Rekapitulasi",
-         "Profil Pegawai","ID Card","Backup/Hapus Data","Audit Log","Keamanan"])
+         "Profil Pegawai","ID Card","Backup/Hapus Data","Audit Log","Keamanan","Performance"])
 elif is_supervisor():
     menu = st.sidebar.radio("Navigasi",
         ["Dashboard","Pegawai","Pegawai Grafik","Laporan","Rekapitulasi","Profil Pegawai","ID Card","Backup/Hapus Data"])
@@ -264,18 +180,22 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# ================== Instrumentasi ==================
+# Durasi cabang halaman diukur sampai footer; rerun yang berhenti lewat st.stop tidak dicatat
+page_timer = Stopwatch("page", menu)
+profiler = Profiler() if is_admin() and st.session_state.pop("profile_next_run", False) else None
+
 # ================== Dashboard ==================
 if menu == "Dashboard":
-    df = st.session_state.pegawai
-    total = len(df)
-    user_count = len(st.session_state.users)
-
-    if "JENIS KELAMIN" in df.columns and not df.empty:
-        jk = df["JENIS KELAMIN"].astype(str).str.strip().str.upper()
-        laki = jk.isin(["M","LAKI-LAKI","L","PRIA"]).sum()
-        perempuan = jk.isin(["F","PEREMPUAN","P","WANITA"]).sum()
-    else:
-        laki, perempuan = 0, 0
+    import plotly.express as px  # plotly hanya dimuat di halaman yang menggambar grafik
+    total = total_pegawai()
+    user_count = len(get_users())
+
+    # Kartu dan pie dibaca dari tabel agregat pegawai_stats
+    jk_counts = stat_counts("gender")
+    gender_counts = dict(zip(jk_counts["key"], jk_counts["jumlah"]))
+    laki = gender_counts.get("LAKI-LAKI", 0)
+    perempuan = gender_counts.get("PEREMPUAN", 0)
 
     c1, c2, c3, c4 = st.columns(4)
     with c1:
@@ -287,18 +207,14 @@ if menu == "Dashboard":
     with c4:
         st.markdown(f'<div class="card" style="background:linear-gradient(135deg,#4caf50,#81c784);">👥<h4>PEGAWAI</h4><h2>{total}</h2></div>', unsafe_allow_html=True)
 
-    if not df.empty and "JENIS KELAMIN" in df.columns:
-        jk_series = df["JENIS KELAMIN"].astype(str).str.strip().str.upper()
-        label_map = {"M":"LAKI-LAKI","L":"LAKI-LAKI","PRIA":"LAKI-LAKI","LAKI-LAKI":"LAKI-LAKI",
-                     "F":"PEREMPUAN","P":"PEREMPUAN","WANITA":"PEREMPUAN","PEREMPUAN":"PEREMPUAN"}
-        jk_mapped = jk_series.map(lambda x: label_map.get(x, x))
-        jk_counts = jk_mapped.value_counts().reset_index()
-        jk_counts.columns = ["Jenis Kelamin","Jumlah"]
-        fig = px.pie(jk_counts, names="Jenis Kelamin", values="Jumlah",
-                     color="Jenis Kelamin",
-                     color_discrete_map={"LAKI-LAKI":"#2196f3","PEREMPUAN":"#e91e63"},
-                     title="Distribusi Gender Pegawai")
-        st.plotly_chart(fig, use_container_width=True)
+    if gender_counts:
+        def gender_pie():
+            jk_counts.columns = ["Jenis Kelamin","Jumlah"]
+            return px.pie(jk_counts, names="Jenis Kelamin", values="Jumlah",
+                          color="Jenis Kelamin",
+                          color_discrete_map={"LAKI-LAKI":"#2196f3","PEREMPUAN":"#e91e63"},
+                          title="Distribusi Gender Pegawai")
+        st.plotly_chart(cached_figure("Dashboard", "gender", gender_pie), use_container_width=True)
 
     # Ringkasan aktivitas hari ini (Admin)
     if is_admin():
@@ -324,43 +240,64 @@ if menu == "Dashboard":
         with st.form("add_user_form"):
             u = st.text_input("Username baru")
             p = st.text_input("Password baru", type="password")
-            r = st.selectbox("Role", ["Admin","User","Supervisor"])
+            r = st.selectbox("Role", ROLES)
             submit_u = st.form_submit_button("Tambah")
         if submit_u and u and p:
-            if u in st.session_state.users:
+            if u in get_users():
                 st.warning("Username sudah ada.")
             elif not is_strong_password(p):
                 st.error("Password terlalu lemah. Minimal 8 karakter, huruf besar/kecil, angka, simbol.")
             else:
-                st.session_state.users[u] = {
-                    "password_hash": bcrypt.hashpw(p.encode("utf-8"), bcrypt.gensalt()).decode("utf-8"),
-                    "role": r
-                }
-                log_action(st.session_state.auth["username"], st.session_state.auth["role"], "ADD_USER", u)
-                st.success(f"Pengguna {u} ({r}) berhasil ditambahkan!")
+                try:
+                    add_user(u, p, r)
+                except Busy:
+                    st.error(BUSY_MSG)
+                except ValueError as e:
+                    st.warning(str(e))
+                else:
+                    log_action(st.session_state.auth["username"], st.session_state.auth["role"], "ADD_USER", u)
+                    st.success(f"Pengguna {u} ({r}) berhasil ditambahkan!")
         st.dataframe(pd.DataFrame(
-            [{"Username": uname, "Role": info["role"]} for uname, info in st.session_state.users.items()]),
+            [{"Username": uname, "Role": info["role"]} for uname, info in get_users().items()]),
             use_container_width=True
         )
 
 # ================== Pegawai (CRUD + View) ==================
 elif menu == "Pegawai":
     st.header("Data Pegawai")
-    df = st.session_state.pegawai
-    st.dataframe(df, use_container_width=True)
+    # Grid server-side: hanya halaman dan kolom yang tampil yang dibaca dan dikirim ke browser
+    grid_cols = st.multiselect("Kolom", EXPECTED_COLS, default=GRID_COLS)
+    g1, g2, g3, g4 = st.columns([3, 2, 1, 1])
+    grid_search = g1.text_input("Cari (Nama/NIP/NIK/Jabatan)")
+    sort_col = g2.selectbox("Urutkan", EXPECTED_COLS, index=EXPECTED_COLS.index("NAMA"))
+    descending = g3.selectbox("Arah", ["Naik", "Turun"]) == "Turun"
+    page_size = g4.selectbox("Baris", PAGE_SIZES, index=1)
+    grid_key = (grid_search, sort_col, descending, page_size)
+    if st.session_state.get("grid_key") != grid_key:
+        st.session_state.grid_key = grid_key
+        st.session_state.grid_page = 1
+    df_page, grid_total, grid_page = page_pegawai(grid_cols, grid_search, sort_col, descending,
+                                                  st.session_state.grid_page, page_size)
+    st.session_state.grid_page = grid_page
+    st.dataframe(df_page, use_container_width=True, hide_index=True)
+    grid_pages = max(1, -(-grid_total // page_size))
+    nav1, nav2, nav3 = st.columns([1, 1, 4])
+    first = (grid_page - 1) * page_size
+    nav3.caption(f"Halaman {grid_page}/{grid_pages} • baris {first + 1 if grid_total else 0}–{first + len(df_page)} dari {grid_total}")
+    if nav1.button("⬅️ Sebelumnya", disabled=grid_page <= 1):
+        st.session_state.grid_page -= 1; st.rerun()
+    if nav2.button("Berikutnya ➡️", disabled=grid_page >= grid_pages):
+        st.session_state.grid_page += 1; st.rerun()
 
     if is_admin():
         st.subheader("Upload data pegawai (CSV/Excel)")
         uploaded_file = st.file_uploader("Pilih file", type=["csv","xlsx"])
         if uploaded_file:
-            df_new = pd.read_csv(uploaded_file) if uploaded_file.name.endswith(".csv") else pd.read_excel(uploaded_file)
-            df_new.columns = [str(c).strip().upper() for c in df_new.columns]
-            for col in EXPECTED_COLS:
-                if col not in df_new.columns: df_new[col] = ""
-            replace_all(df_new[EXPECTED_COLS])
-            log_action(st.session_state.auth["username"], st.session_state.auth["role"], "RESTORE", "UPLOAD")
-            st.session_state.pegawai = load_data()
-            st.success("Data pegawai berhasil diimpor!")
+            mode_impor = st.radio("Mode impor", ["Ganti semua data", "Tambah/perbarui per NIP"], horizontal=True)
+            if st.button("Impor", type="primary"):
+                if run_import(uploaded_file, "replace" if mode_impor == "Ganti semua data" else "upsert"):
+                    log_action(st.session_state.auth["username"], st.session_state.auth["role"], "RESTORE", "UPLOAD")
+                    st.success("Data pegawai berhasil diimpor!")
 
         st.download_button("Unduh template CSV (header standar)",
                            (",".join(EXPECTED_COLS) + "\n"),
@@ -384,13 +321,13 @@ elif menu == "Pegawai":
             })
             save_row(new_row)
             log_action(st.session_state.auth["username"], st.session_state.auth["role"], "INSERT", nip)
-            st.session_state.pegawai = load_data()
             st.success("Pegawai ditambahkan!")
 
         st.subheader("Edit / Hapus Pegawai")
         nip_search = st.text_input("Masukkan NIP pegawai untuk edit/hapus")
         if nip_search:
-            df_match = st.session_state.pegawai[st.session_state.pegawai["NIP"].astype(str) == str(nip_search)]
+            nip_key = resolve_nip(nip_search)
+            df_match = pegawai_rows(nip_key) if nip_key else pd.DataFrame()
             if not df_match.empty:
                 st.dataframe(df_match, use_container_width=True)
                 def default_tmt_value(val):
@@ -406,9 +343,9 @@ elif menu == "Pegawai":
                     tmt_edit = st.date_input("TMT JABATAN", value=default_tmt_value(tmt_raw))
                     submit_edit = st.form_submit_button("Simpan Perubahan")
                 if submit_edit:
-                    updated_row = {col: str(df_match.iloc[0].get(col,"")) for col in EXPECTED_COLS}
+                    updated_row = {col: df_match.iloc[0].get(col) for col in EXPECTED_COLS}  # nilai kosong tetap NULL, bukan "None"
                     updated_row.update({
-                        "NIP": str(df_match.iloc[0].get("NIP", nip_search)),
+                        "NIP": str(df_match.iloc[0].get("NIP", nip_key)),
                         "NAMA": nama_edit,
                         "NAMA JABATAN": jabatan_edit,
                         "JENIS JABATAN": jenis_jabatan_edit,
@@ -417,16 +354,14 @@ elif menu == "Pegawai":
                         "TMT JABATAN": str(tmt_edit),
                     })
                     save_row(updated_row)
-                    log_action(st.session_state.auth["username"], st.session_state.auth["role"], "UPDATE", nip_search)
-                    st.session_state.pegawai = load_data()
+                    log_action(st.session_state.auth["username"], st.session_state.auth["role"], "UPDATE", nip_key)
                     st.success("Data pegawai berhasil diperbarui!")
                 st.write("Aksi hapus memerlukan konfirmasi:")
                 if st.button("Hapus Pegawai"):
                     st.warning("Klik tombol konfirmasi di bawah untuk menghapus.")
                     if st.button("Konfirmasi Hapus", type="primary"):
-                        delete_by_nip(nip_search)
-                        log_action(st.session_state.auth["username"], st.session_state.auth["role"], "DELETE", nip_search)
-                        st.session_state.pegawai = load_data()
+                        delete_by_nip(nip_key)
+                        log_action(st.session_state.auth["username"], st.session_state.auth["role"], "DELETE", nip_key)
                         st.success("Pegawai berhasil dihapus!")
             else:
                 st.warning("Pegawai dengan NIP tersebut tidak ditemukan.")
@@ -437,203 +372,225 @@ elif menu == "Pegawai":
 
 # ================== Pegawai Grafik ==================
 elif menu == "Pegawai Grafik":
+    import plotly.express as px
     st.header("Grafik Pegawai")
-    df = st.session_state.pegawai
+    # Semua grafik dibaca dari tabel agregat pegawai_stats (dipelihara trigger); figur di-cache per versi data
 
-    st.subheader("Distribusi Gender")
-    if not df.empty and "JENIS KELAMIN" in df.columns:
-        jk_series = df["JENIS KELAMIN"].astype(str).str.strip().str.upper()
-        label_map = {"M":"LAKI-LAKI","L":"LAKI-LAKI","PRIA":"LAKI-LAKI","LAKI-LAKI":"LAKI-LAKI",
-                     "F":"PEREMPUAN","P":"PEREMPUAN","WANITA":"PEREMPUAN","PEREMPUAN":"PEREMPUAN"}
-        jk_mapped = jk_series.map(lambda x: label_map.get(x, x))
-        jk_counts = jk_mapped.value_counts().reset_index()
+    def grafik_gender():
+        jk_counts = stat_counts("gender")
+        if jk_counts.empty: return None
         jk_counts.columns = ["Jenis Kelamin","Jumlah"]
-        fig_gender = px.bar(jk_counts, x="Jenis Kelamin", y="Jumlah", color="Jenis Kelamin",
-                            color_discrete_map={"LAKI-LAKI":"#2196f3","PEREMPUAN":"#e91e63"},
-                            title="Distribusi Gender Pegawai")
-        st.plotly_chart(fig_gender, use_container_width=True)
-    else:
-        st.info("Data pegawai atau kolom JENIS KELAMIN belum tersedia.")
+        return px.bar(jk_counts, x="Jenis Kelamin", y="Jumlah", color="Jenis Kelamin",
+                      color_discrete_map={"LAKI-LAKI":"#2196f3","PEREMPUAN":"#e91e63"},
+                      title="Distribusi Gender Pegawai")
+
+    def grafik_usia():
+        usia_counts = age_bucket_counts()
+        if usia_counts["Jumlah"].sum() == 0: return None
+        usia_counts.columns = ["Rentang Usia","Jumlah"]
+        return px.bar(usia_counts, x="Rentang Usia", y="Jumlah", color="Rentang Usia", title="Distribusi Usia Pegawai")
+
+    def grafik_pendidikan():
+        pend_counts = stat_counts("pendidikan")
+        if pend_counts.empty: return None
+        pend_counts.columns = ["Tingkat Pendidikan","Jumlah"]
+        return px.bar(pend_counts, x="Tingkat Pendidikan", y="Jumlah", color="Tingkat Pendidikan",
+                      title="Distribusi Tingkat Pendidikan Pegawai")
+
+    st.subheader("Distribusi Gender")
+    fig_gender = cached_figure("Pegawai Grafik", "gender", grafik_gender)
+    if fig_gender is not None: st.plotly_chart(fig_gender, use_container_width=True)
+    else: st.info("Data pegawai atau kolom JENIS KELAMIN belum tersedia.")
 
     st.subheader("Distribusi Usia")
-    if not df.empty and "TANGGAL LAHIR" in df.columns:
-        df_age = df.copy()
-        df_age["TANGGAL LAHIR"] = pd.to_datetime(df_age["TANGGAL LAHIR"], errors="coerce")
-        df_age["USIA"] = df_age["TANGGAL LAHIR"].apply(lambda x: (pd.Timestamp.today().year - x.year) if pd.notnull(x) else None)
-        usia_series = df_age["USIA"].dropna().astype(int)
-        if not usia_series.empty:
-            bins = [0, 20, 30, 40, 50, 60, 150]
-            labels = ["<20","20–29","30–39","40–49","50–59","60+"]
-            usia_bucket = pd.cut(usia_series, bins=bins, labels=labels, right=False, include_lowest=True)
-            usia_counts = usia_bucket.value_counts().reindex(labels).fillna(0).astype(int).reset_index()
-            usia_counts.columns = ["Rentang Usia","Jumlah"]
-            fig_age = px.bar(usia_counts, x="Rentang Usia", y="Jumlah", color="Rentang Usia", title="Distribusi Usia Pegawai")
-            st.plotly_chart(fig_age, use_container_width=True)
-        else:
-            st.info("Data usia pegawai tidak tersedia atau tidak valid.")
-    else:
-        st.info("Kolom TANGGAL LAHIR belum tersedia.")
+    # Usia dihitung terhadap tahun berjalan, jadi tahun ikut menjadi kunci cache
+    fig_age = cached_figure("Pegawai Grafik", "usia", grafik_usia, {"tahun": date.today().year})
+    if fig_age is not None: st.plotly_chart(fig_age, use_container_width=True)
+    else: st.info("Data usia pegawai tidak tersedia atau tidak valid.")
 
     st.subheader("Distribusi Tingkat Pendidikan")
-    if not df.empty and "TINGKAT PENDIDIKAN" in df.columns:
-        pend_series = df["TINGKAT PENDIDIKAN"].astype(str).str.strip().str.upper()
-        norm_map = {
-            "SD":"SD","SEKOLAH DASAR":"SD","ELEMENTARY SCHOOL":"SD",
-            "SMP":"SMP","SEKOLAH MENENGAH PERTAMA":"SMP","JUNIOR HIGH":"SMP",
-            "SMA":"SMA","SMU":"SMA","SMK":"SMA","MA":"SMA","HIGH SCHOOL":"SMA",
-            "D1":"D1","DIPLOMA I":"D1","D2":"D2","DIPLOMA II":"D2",
-            "D3":"D3","DIPLOMA III":"D3","AHLI MADYA":"D3",
-            "D4":"D4","DIPLOMA IV":"D4","SARJANA TERAPAN":"D4",
-            "S1":"S1","SARJANA":"S1","UNDERGRADUATE":"S1","BACHELOR":"S1",
-            "S2":"S2","MAGISTER":"S2","MASTER":"S2","POSTGRADUATE":"S2",
-            "S3":"S3","DOKTOR":"S3","PHD":"S3","DOCTORATE":"S3"
-        }
-        pend_norm = pend_series.map(lambda x: norm_map.get(x, x))
-        pend_counts = pend_norm.value_counts().reset_index()
-        pend_counts.columns = ["Tingkat Pendidikan","Jumlah"]
-        fig_pend = px.bar(pend_counts, x="Tingkat Pendidikan", y="Jumlah", color="Tingkat Pendidikan",
-                          title="Distribusi Tingkat Pendidikan Pegawai")
-        st.plotly_chart(fig_pend, use_container_width=True)
-    else:
-        st.info("Kolom TINGKAT PENDIDIKAN belum tersedia.")
+    fig_pend = cached_figure("Pegawai Grafik", "pendidikan", grafik_pendidikan)
+    if fig_pend is not None: st.plotly_chart(fig_pend, use_container_width=True)
+    else: st.info("Kolom TINGKAT PENDIDIKAN belum tersedia.")
 
 # ================== Laporan ==================
 elif menu == "Laporan":
+    import plotly.express as px
     st.header("Laporan Pegawai")
-    df = st.session_state.pegawai
-    if not df.empty:
-        units = df["UNOR INDUK"].dropna().unique() if "UNOR INDUK" in df.columns else []
-        jabatans = df["NAMA JABATAN"].dropna().unique() if "NAMA JABATAN" in df.columns else []
-        jenis_jabatans = df["JENIS JABATAN"].dropna().unique() if "JENIS JABATAN" in df.columns else []
-        pendidikans = df["TINGKAT PENDIDIKAN"].dropna().unique() if "TINGKAT PENDIDIKAN" in df.columns else []
-
-        unit_filter = st.multiselect("Filter UNOR INDUK", sorted(list(units)))
-        jabatan_filter = st.multiselect("Filter Jabatan", sorted(list(jabatans)))
-        jenis_jabatan_filter = st.multiselect("Filter Jenis Jabatan", sorted(list(jenis_jabatans)))
-        pendidikan_filter = st.multiselect("Filter Pendidikan", sorted(list(pendidikans)))
+    if total_pegawai() > 0:
+        # Opsi filter dari SELECT DISTINCT atas indeks, filter dijalankan di SQL
+        unit_filter = st.multiselect("Filter UNOR INDUK", distinct_values("UNOR INDUK"))
+        jabatan_filter = st.multiselect("Filter Jabatan", distinct_values("NAMA JABATAN"))
+        jenis_jabatan_filter = st.multiselect("Filter Jenis Jabatan", distinct_values("JENIS JABATAN"))
+        pendidikan_filter = st.multiselect("Filter Pendidikan", distinct_values("TINGKAT PENDIDIKAN"))
+        # Rentang tanggal dijalankan di SQL atas indeks kolom tanggal (format ISO)
+        col_usia, col_tmt = st.columns(2)
+        with col_usia:
+            usia_filter = st.slider("Rentang usia", 18, 70, (18, 70))
+            pensiun_filter = st.checkbox(f"Mencapai BUP {RETIREMENT_AGE} tahun dalam 12 bulan ke depan")
+        with col_tmt:
+            tmt_filter = st.date_input("Rentang TMT JABATAN", value=(), min_value=date(1950, 1, 1), max_value=date.today())
         search_term = st.text_input("Pencarian global (Nama/NIP)")
 
-        df_filtered = df.copy()
-        if unit_filter: df_filtered = df_filtered[df_filtered["UNOR INDUK"].isin(unit_filter)]
-        if jabatan_filter: df_filtered = df_filtered[df_filtered["NAMA JABATAN"].isin(jabatan_filter)]
-        if jenis_jabatan_filter: df_filtered = df_filtered[df_filtered["JENIS JABATAN"].isin(jenis_jabatan_filter)]
-        if pendidikan_filter: df_filtered = df_filtered[df_filtered["TINGKAT PENDIDIKAN"].isin(pendidikan_filter)]
-        if search_term:
-            df_filtered = df_filtered[
-                df_filtered["NIP"].astype(str).str.contains(search_term, case=False, na=False) |
-                df_filtered["NAMA"].astype(str).str.contains(search_term, case=False, na=False)
-            ]
+        if pensiun_filter: lahir_range = retirement_range()
+        elif usia_filter != (18, 70): lahir_range = age_range(*usia_filter)
+        else: lahir_range = None
+        cols_show = ["NAMA","NIP","NAMA JABATAN","JENIS JABATAN","UNOR INDUK","NAMA UNOR","TMT JABATAN"]
+        laporan_filters = {
+            "UNOR INDUK": unit_filter, "NAMA JABATAN": jabatan_filter,
+            "JENIS JABATAN": jenis_jabatan_filter, "TINGKAT PENDIDIKAN": pendidikan_filter,
+            "TANGGAL LAHIR": lahir_range, "TMT JABATAN": date_range(*tmt_filter) if len(tmt_filter) == 2 else None,
+        }
+        df_filtered = query_pegawai(cols_show, laporan_filters, search_term)
 
         st.metric("Total Pegawai", len(df_filtered))
 
-        # Grafik distribusi Unit
-        if "UNOR INDUK" in df_filtered.columns and not df_filtered.empty:
-            chart_df = df_filtered["UNOR INDUK"].astype(str).str.strip().value_counts().reset_index()
+        # Tanpa filter, distribusi dibaca dari tabel agregat; dengan filter dari snapshot kolumnar (hanya kolom yang dihitung),
+        # dengan pencarian FTS dari hasil query
+        no_filter = not (any(laporan_filters.values()) or search_term)
+        def laporan_counts(col, dim):
+            if no_filter: return stat_counts(dim)
+            if not search_term: return analytics_counts(col, laporan_filters)
+            return df_filtered[col].astype(str).str.strip().value_counts().reset_index()
+
+        # Figur di-cache per (versi data, filter, kata kunci) dan dipakai bersama semua sesi
+        chart_key = {**laporan_filters, "cari": search_term.strip().lower()}
+
+        def grafik_unit():
+            chart_df = laporan_counts("UNOR INDUK", "unor_induk")
             chart_df.columns = ["UNOR INDUK","JUMLAH"]
-            fig_unit = px.bar(chart_df, x="UNOR INDUK", y="JUMLAH", color="UNOR INDUK",
-                         title="Pegawai per Unit Organisasi",
-                         color_discrete_sequence=px.colors.qualitative.Set2)
-            st.plotly_chart(fig_unit, use_container_width=True)
-        else:
-            st.info("Kolom UNOR INDUK tidak ditemukan atau data kosong.")
+            return px.bar(chart_df, x="UNOR INDUK", y="JUMLAH", color="UNOR INDUK",
+                          title="Pegawai per Unit Organisasi",
+                          color_discrete_sequence=px.colors.qualitative.Set2)
 
-        # Grafik distribusi Jenis Jabatan
-        if "JENIS JABATAN" in df_filtered.columns and not df_filtered.empty:
-            jabatan_chart = df_filtered["JENIS JABATAN"].astype(str).str.strip().value_counts().reset_index()
+        def grafik_jenis_jabatan():
+            jabatan_chart = laporan_counts("JENIS JABATAN", "jenis_jabatan")
             jabatan_chart.columns = ["Jenis Jabatan","Jumlah"]
-            fig_jabatan = px.bar(
+            return px.bar(
                 jabatan_chart,
                 x="Jenis Jabatan", y="Jumlah",
                 color="Jenis Jabatan",
                 title="Distribusi Pegawai per Jenis Jabatan",
                 color_discrete_sequence=px.colors.qualitative.Set3
             )
-            st.plotly_chart(fig_jabatan, use_container_width=True)
+
+        # Grafik distribusi Unit
+        if "UNOR INDUK" in df_filtered.columns and not df_filtered.empty:
+            st.plotly_chart(cached_figure("Laporan", "unit", grafik_unit, chart_key), use_container_width=True)
+        else:
+            st.info("Kolom UNOR INDUK tidak ditemukan atau data kosong.")
+
+        # Grafik distribusi Jenis Jabatan
+        if "JENIS JABATAN" in df_filtered.columns and not df_filtered.empty:
+            st.plotly_chart(cached_figure("Laporan", "jenis_jabatan", grafik_jenis_jabatan, chart_key), use_container_width=True)
 
         st.markdown("---")
-        cols_show = ["NAMA","NIP","NAMA JABATAN","JENIS JABATAN","UNOR INDUK","NAMA UNOR","TMT JABATAN"]
-        cols_show = [c for c in cols_show if c in df_filtered.columns]
         st.dataframe(df_filtered[cols_show], use_container_width=True)
 
         if not df_filtered.empty and (is_admin() or is_supervisor()):
-            out_xlsx = BytesIO()
-            with pd.ExcelWriter(out_xlsx, engine="xlsxwriter") as writer:
-                df_filtered[cols_show].to_excel(writer, index=False, sheet_name="Nominatif")
-                workbook = writer.book
-                worksheet = writer.sheets["Nominatif"]
-                header_format = workbook.add_format({"bold": True, "bg_color": "#DCE6F1"})
-                for col_num, value in enumerate(df_filtered[cols_show].columns.values):
-                    worksheet.write(0, col_num, value, header_format)
-            st.download_button("💾 Unduh Excel", out_xlsx.getvalue(),
-                               file_name="laporan_nominatif.xlsx",
-                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-            st.download_button("💾 Unduh CSV",
-                               df_filtered[cols_show].to_csv(index=False).encode("utf-8"),
+            # Ekspor dialirkan dari cursor ke file sementara, baru dijalankan saat tombol diklik
+            laporan_sql, laporan_params = pegawai_sql(cols_show, laporan_filters, search_term)
+            st.download_button("💾 Unduh Excel",
+                               deferred("xlsx", laporan_sql, laporan_params, sheet_name="Nominatif", header_style=HEADER_STYLE),
+                               file_name="laporan_nominatif.xlsx", mime=XLSX_MIME)
+            st.download_button("💾 Unduh CSV", deferred("csv", laporan_sql, laporan_params),
                                file_name="laporan_nominatif.csv", mime="text/csv")
+
+            # PDF profil semua pegawai terfilter; pegawai yang tidak berubah sejak ekspor terakhir tidak dirender ulang
+            st.markdown("---")
+            export_key = normalize_filters(chart_key)
+            if st.button(f"📄 Ekspor PDF profil ({len(df_filtered)} pegawai, ZIP)"):
+                bar = st.progress(0.0, text="Menyiapkan PDF profil...")
+                def progress(done, total): bar.progress(done / total if total else 1.0, text=f"{done}/{total} profil")
+                rows = query_pegawai(EXPECTED_COLS, laporan_filters, search_term).to_dict("records")
+                hasil = export_profiles(rows, progress=progress, key=repr(export_key))
+                bar.empty()
+                st.session_state.profil_export = {"path": hasil.path, "key": export_key}
+                st.info(f"{hasil.rendered} profil dirender, {hasil.reused} tidak berubah sejak ekspor terakhir.")
+                log_action(st.session_state.auth["username"], st.session_state.auth["role"], "EXPORT_PROFIL", f"{hasil.total} profil")
+            # ZIP per filter dan himpunan pegawai; hanya ekspor sesi ini untuk filter yang sedang aktif yang ditawarkan
+            ekspor = st.session_state.get("profil_export")
+            if ekspor and ekspor["key"] == export_key and os.path.exists(ekspor["path"]):
+                # File dibaca saat tombol diklik, bukan di setiap rerun
+                st.download_button("💾 Unduh ZIP PDF profil", lambda path=ekspor["path"]: read_file(path),
+                                   file_name="profil_pegawai.zip", mime="application/zip")
     else:
         st.info("Belum ada data pegawai untuk ditampilkan.")
 
 # ================== Rekapitulasi ==================
 elif menu == "Rekapitulasi":
-    st.header("Rekapitulasi Tren TMT JABATAN")
-    df = st.session_state.pegawai
-    if "TMT JABATAN" in df.columns and not df.empty:
-        df_ts = df.copy()
-        df_ts["TMT JABATAN"] = pd.to_datetime(df_ts["TMT JABATAN"], errors="coerce")
-        df_ts = df_ts.dropna(subset=["TMT JABATAN"])
-        if df_ts.empty:
-            st.info("Tidak ada TMT JABATAN yang valid untuk direkap.")
-        else:
-            units = sorted([u for u in df_ts["UNOR INDUK"].dropna().astype(str).str.strip().unique()]) if "UNOR INDUK" in df_ts.columns else []
-            unit_filter = st.selectbox("Filter UNOR INDUK (opsional)", ["Semua"] + units) if len(units) > 0 else "Semua"
-            df_filtered = df_ts.copy()
-            if unit_filter != "Semua" and "UNOR INDUK" in df_filtered.columns:
-                df_filtered = df_filtered[df_filtered["UNOR INDUK"].astype(str).str.strip() == unit_filter]
-
-            tahun_list = sorted(df_filtered["TMT JABATAN"].dt.year.unique())
-            tahun = st.selectbox("Pilih Tahun", tahun_list) if len(tahun_list) > 0 else None
-
-            if tahun is not None:
-                df_year = df_filtered[df_filtered["TMT JABATAN"].dt.year == tahun]
-                rekap_bulan = df_year.groupby(df_year["TMT JABATAN"].dt.month).size().reset_index(name="JUMLAH")
-                rekap_bulan["BULAN"] = rekap_bulan["TMT JABATAN"].apply(lambda x: f"Bulan {x}")
-                st.subheader(f"Tren Bulanan Tahun {tahun}" + (f" • UNOR INDUK: {unit_filter}" if unit_filter != "Semua" else ""))
-                st.dataframe(rekap_bulan[["BULAN","JUMLAH"]], use_container_width=True)
-                st.line_chart(rekap_bulan.set_index("BULAN")["JUMLAH"])
-
-                st.markdown("---")
-                rekap_tahun = df_filtered.groupby(df_filtered["TMT JABATAN"].dt.year).size().reset_index(name="JUMLAH")
-                rekap_tahun.columns = ["TAHUN","JUMLAH"]
-                st.subheader("Tren Tahunan" + (f" • UNOR INDUK: {unit_filter}" if unit_filter != "Semua" else ""))
-                st.dataframe(rekap_tahun, use_container_width=True)
-                st.line_chart(rekap_tahun.set_index("TAHUN")["JUMLAH"])
-            else:
-                st.info("Tidak ada tahun yang dapat dipilih pada data terfilter.")
+    # Hitungan dibaca dari kubus tmt_cube (UNOR INDUK x tahun x bulan) yang dipelihara trigger;
+    # frame grafik di-cache per (versi data, jenis TMT, unit, tahun)
+    tmt_field = st.selectbox("Jenis TMT", TMT_FIELDS)
+    st.header(f"Rekapitulasi Tren {tmt_field}")
+    rekap_semua = cached_frame("Rekapitulasi", "tahunan", lambda: tmt_yearly(tmt_field), {"field": tmt_field})
+    if rekap_semua.empty:
+        st.info(f"Tidak ada {tmt_field} yang valid untuk direkap.")
     else:
-        st.info("Kolom TMT JABATAN belum tersedia atau kosong.")
+        units = tmt_units(tmt_field)
+        unit_filter = st.selectbox("Filter UNOR INDUK (opsional)", ["Semua"] + units) if len(units) > 0 else "Semua"
+        unit_sel = [] if unit_filter == "Semua" else [unit_filter]
+        rekap_tahun = (cached_frame("Rekapitulasi", "tahunan", lambda: tmt_yearly(tmt_field, unit_sel),
+                                    {"field": tmt_field, "unit": unit_sel}) if unit_sel else rekap_semua)
+
+        tahun_list = rekap_tahun["TAHUN"].tolist()
+        tahun = st.selectbox("Pilih Tahun", tahun_list) if len(tahun_list) > 0 else None
+
+        if tahun is not None:
+            def rekap_bulanan():
+                df = tmt_monthly(tmt_field, tahun, unit_sel)
+                df["BULAN"] = "Bulan " + df["BULAN"].astype(str)
+                return df
+            rekap_bulan = cached_frame("Rekapitulasi", "bulanan", rekap_bulanan, {"field": tmt_field, "unit": unit_sel, "tahun": tahun})
+            st.subheader(f"Tren Bulanan Tahun {tahun}" + (f" • UNOR INDUK: {unit_filter}" if unit_filter != "Semua" else ""))
+            st.dataframe(rekap_bulan[["BULAN","JUMLAH"]], use_container_width=True)
+            st.line_chart(rekap_bulan.set_index("BULAN")["JUMLAH"])
+
+            st.markdown("---")
+            st.subheader("Tren Tahunan" + (f" • UNOR INDUK: {unit_filter}" if unit_filter != "Semua" else ""))
+            st.dataframe(rekap_tahun, use_container_width=True)
+            st.line_chart(rekap_tahun.set_index("TAHUN")["JUMLAH"])
+        else:
+            st.info("Tidak ada tahun yang dapat dipilih pada data terfilter.")
+
+        st.markdown("---")
+        st.subheader("Perbandingan Tren Tahunan antar UNOR INDUK")
+        banding = st.multiselect("Pilih UNOR INDUK untuk dibandingkan", units)
+        if banding:
+            pivot = cached_frame("Rekapitulasi", "banding", lambda: tmt_yearly_by_unit(tmt_field, banding),
+                                 {"field": tmt_field, "unit": banding})
+            st.line_chart(pivot)
+            st.dataframe(pivot, use_container_width=True)
 
 # ================== Profil Pegawai ==================
 elif menu == "Profil Pegawai":
     st.header("Profil Pegawai")
-    df = st.session_state.pegawai
-    if df.empty:
+    if total_pegawai() == 0:
         st.info("Belum ada data pegawai.")
     else:
         search_nip = st.text_input("Masukkan NIP pegawai")
         search_nama = st.text_input("Atau masukkan Nama pegawai")
         df_match = pd.DataFrame()
         if search_nip:
-            df_match = df[df["NIP"].astype(str) == search_nip]
+            nip_key = resolve_nip(search_nip)
+            if nip_key: df_match = pegawai_rows(nip_key)
         elif search_nama:
-            df_match = df[df["NAMA"].astype(str).str.contains(search_nama, case=False, na=False)]
+            hasil, total_hasil = search(search_nama, cols=["NIP","NAMA","NAMA JABATAN"], limit=20, columns=["nama"])
+            if not hasil.empty:
+                pilihan = 0
+                if len(hasil) > 1:
+                    st.caption(f"{total_hasil} pegawai cocok, menampilkan {len(hasil)} teratas.")
+                    pilihan = st.selectbox("Pilih pegawai", range(len(hasil)),
+                                           format_func=lambda i: f"{hasil.iloc[i]['NAMA']} • {hasil.iloc[i]['NIP']} • {hasil.iloc[i]['NAMA JABATAN']}")
+                df_match = pegawai_rows(hasil.iloc[pilihan]["NIP"])
 
         if not df_match.empty:
             pegawai = df_match.iloc[0].to_dict()
             nip_val = str(pegawai.get("NIP",""))
 
-            foto_path = pegawai.get("FOTO","")
-            if isinstance(foto_path, str) and len(foto_path) > 0 and os.path.exists(foto_path):
-                st.image(foto_path, caption=f"Foto {pegawai.get('NAMA','')}", width=200)
+            foto_bytes = photo_bytes(pegawai.get("FOTO"), "profile")
+            if foto_bytes:
+                st.image(foto_bytes, caption=f"Foto {pegawai.get('NAMA','')}", width=200)
             else:
                 st.info("Belum ada foto untuk pegawai ini.")
 
@@ -657,17 +614,20 @@ elif menu == "Profil Pegawai":
                 st.subheader("Upload/Update Foto Pegawai")
                 foto_file = st.file_uploader("Pilih foto (jpg/png)", type=["jpg","jpeg","png"])
                 if foto_file:
-                    file_path = os.path.join("images", f"{nip_val}.jpg")
-                    with open(file_path, "wb") as f: f.write(foto_file.getbuffer())
-                    pegawai["FOTO"] = file_path
-                    save_row(pegawai)
-                    log_action(st.session_state.auth["username"], st.session_state.auth["role"], "UPDATE", f"{nip_val}-FOTO")
-                    st.session_state.pegawai = load_data()
-                    st.success("Foto disimpan!")
+                    # Disimpan sebagai JPEG ter-normalisasi + turunan profil/PDF/ID card, nama = hash isi
+                    try: file_path = store_photo(foto_file.getvalue())
+                    except Exception: file_path = None
+                    if file_path is None:
+                        st.error("File bukan gambar yang valid.")
+                    elif pegawai.get("FOTO") != file_path:
+                        pegawai["FOTO"] = file_path
+                        save_row(pegawai)
+                        log_action(st.session_state.auth["username"], st.session_state.auth["role"], "UPDATE", f"{nip_val}-FOTO")
+                        st.success("Foto disimpan!")
 
             if is_admin() or is_supervisor():
                 st.subheader("Ekspor Profil (PDF)")
-                pdf_data = generate_pdf_resmi(pegawai, foto_path=pegawai.get("FOTO", None))
+                pdf_data = generate_pdf_resmi(pegawai)
                 st.download_button("💾 Unduh Profil (PDF)", pdf_data, file_name=f"profil_{nip_val}.pdf", mime="application/pdf")
         else:
             st.warning("Pegawai tidak ditemukan. Masukkan NIP atau Nama yang valid.")
@@ -675,12 +635,12 @@ elif menu == "Profil Pegawai":
 # ================== ID Card ==================
 elif menu == "ID Card":
     st.header("Cetak ID Card Pegawai")
-    df = st.session_state.pegawai
-    if df.empty:
+    if total_pegawai() == 0:
         st.info("Belum ada data pegawai.")
     else:
         nip_input = st.text_input("Masukkan NIP pegawai untuk ID Card")
-        df_match = df[df["NIP"].astype(str) == str(nip_input)] if nip_input else pd.DataFrame()
+        nip_key = resolve_nip(nip_input) if nip_input else None
+        df_match = pegawai_rows(nip_key) if nip_key else pd.DataFrame()
         if not df_match.empty:
             pegawai = df_match.iloc[0].to_dict()
             st.write(f"Pegawai: {pegawai.get('NAMA','')} • NIP: {pegawai.get('NIP','')}")
@@ -690,39 +650,113 @@ elif menu == "ID Card":
             if nip_input:
                 st.warning("Pegawai tidak ditemukan. Periksa NIP.")
 
+        st.markdown("---")
+        st.subheader("Cetak Massal")
+        mode_massal = st.radio("Pilih pegawai berdasarkan", ["UNOR INDUK","Jabatan","Daftar NIP"], horizontal=True)
+        rows_massal, tidak_ditemukan = [], []
+        if mode_massal == "UNOR INDUK":
+            pilihan = st.multiselect("UNOR INDUK", distinct_values("UNOR INDUK"))
+            if pilihan: rows_massal = query_pegawai(CARD_FIELDS, {"UNOR INDUK": pilihan}, order_by="NAMA").to_dict("records")
+        elif mode_massal == "Jabatan":
+            pilihan = st.multiselect("Nama Jabatan", distinct_values("NAMA JABATAN"))
+            if pilihan: rows_massal = query_pegawai(CARD_FIELDS, {"NAMA JABATAN": pilihan}, order_by="NAMA").to_dict("records")
+        else:
+            daftar = st.text_area("Daftar NIP (pisahkan dengan baris baru, spasi atau koma)")
+            nips = []
+            for n in re.split(r"[\s,;]+", daftar.strip()) if daftar.strip() else []:
+                key = resolve_nip(n)
+                if key: nips.append(key)
+                else: tidak_ditemukan.append(n)
+            if nips: rows_massal = query_pegawai(CARD_FIELDS, {"NIP": list(dict.fromkeys(nips))}).to_dict("records")
+        if tidak_ditemukan: st.warning(f"NIP tidak ditemukan: {', '.join(tidak_ditemukan[:20])}" + (" ..." if len(tidak_ditemukan) > 20 else ""))
+        st.write(f"{len(rows_massal)} pegawai terpilih.")
+        layout = st.radio("Format keluaran", ["ZIP (satu PDF per pegawai)","Lembar A4 (10 kartu per halaman)"])
+        if rows_massal and st.button("Buat ID Card massal"):
+            bar = st.progress(0.0, text="Menyiapkan kartu...")
+            def progress(done, total): bar.progress(done / total, text=f"{done}/{total} kartu")
+            zip_mode = layout.startswith("ZIP")
+            path = build_id_cards(rows_massal, "zip" if zip_mode else "sheet", progress=progress)
+            # Session hanya menyimpan path file sementara; batch sebelumnya dihapus
+            lama = st.session_state.get("idcard_batch")
+            if lama:
+                try: os.remove(lama[0])
+                except OSError: pass
+            st.session_state.idcard_batch = (path, "zip" if zip_mode else "pdf")
+            bar.empty()
+            log_action(st.session_state.auth["username"], st.session_state.auth["role"], "IDCARD_BATCH", f"{len(rows_massal)} kartu")
+        batch = st.session_state.get("idcard_batch")
+        if batch and os.path.exists(batch[0]):
+            path, ext = batch
+            st.download_button("📦 Unduh ID Card massal", lambda path=path: read_file(path), file_name=f"idcard_massal.{ext}",
+                               mime="application/zip" if ext == "zip" else "application/pdf")
+
 # ================== Backup/Hapus Data ==================
 elif menu == "Backup/Hapus Data":
     st.header("Backup & Restore Data Pegawai")
     if is_admin():
         st.subheader("Backup Data Pegawai")
-        df = load_data()
-        if not df.empty:
-            csv_bytes = df.to_csv(index=False).encode("utf-8")
-            ts = pd.Timestamp.now().strftime("%Y%m%d_%H%M%S")
-            with open(os.path.join("backups", f"backup_pegawai_{ts}.csv"), "wb") as f: f.write(csv_bytes)
-            out = BytesIO()
-            with pd.ExcelWriter(out, engine="xlsxwriter") as writer:
-                df.to_excel(writer, index=False, sheet_name="Pegawai")
-            st.download_button("💾 Backup CSV", csv_bytes, file_name="backup_pegawai.csv", mime="text/csv")
-            st.download_button("💾 Backup Excel", out.getvalue(), file_name="backup_pegawai.xlsx",
-                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        # Snapshot database lewat SQLite backup API (gzip, dedup, retensi); tidak ada yang ditulis saat halaman dibuka
+        if st.button("🗄️ Buat snapshot sekarang"):
+            name, created = backup_now()
+            log_action(st.session_state.auth["username"], st.session_state.auth["role"], "BACKUP", name)
+            if created: st.success(f"Snapshot dibuat: {name}")
+            else: st.info(f"Data tidak berubah sejak snapshot terakhir ({name}).")
+        snapshots = list_backups()
+        if not snapshots.empty:
+            st.caption(f"{len(snapshots)} snapshot tersimpan di folder {BACKUP_DIR}/ (otomatis tiap {INTERVAL_HOURS:g} jam)"
+                       if INTERVAL_HOURS > 0 else f"{len(snapshots)} snapshot tersimpan di folder {BACKUP_DIR}/")
+            st.dataframe(snapshots[["file","waktu","ukuran"]], use_container_width=True)
+        if total_pegawai() > 0:
+            # CSV/Excel dibuat saat tombol diklik, bukan di setiap rerun
+            st.download_button("💾 Backup CSV", deferred("csv", "SELECT * FROM pegawai"), file_name="backup_pegawai.csv", mime="text/csv")
+            st.download_button("💾 Backup Excel", deferred("xlsx", "SELECT * FROM pegawai", sheet_name="Pegawai"),
+                               file_name="backup_pegawai.xlsx", mime=XLSX_MIME)
         else:
             st.info("Tidak ada data pegawai untuk dibackup.")
 
         st.markdown("---")
         st.subheader("Restore Data Pegawai dari Backup")
         uploaded_file = st.file_uploader("Pilih file backup (CSV/Excel)", type=["csv","xlsx"])
+        plan = st.session_state.get("restore_plan")
+        if not uploaded_file and plan:
+            discard_restore(plan); del st.session_state["restore_plan"]; plan = None
         if uploaded_file:
-            df_new = pd.read_csv(uploaded_file) if uploaded_file.name.endswith(".csv") else pd.read_excel(uploaded_file)
-            df_new.columns = [str(c).strip().upper() for c in df_new.columns]
-            for col in EXPECTED_COLS:
-                if col not in df_new.columns: df_new[col] = ""
-            st.warning("Restore akan menimpa seluruh data pegawai yang ada.")
-            if st.button("Konfirmasi Restore", type="primary"):
-                replace_all(df_new[EXPECTED_COLS])
-                log_action(st.session_state.auth["username"], st.session_state.auth["role"], "RESTORE", "ALL")
-                st.session_state.pegawai = load_data()
-                st.success("Data pegawai berhasil direstore!")
+            # Restore hanya menerapkan perbedaan (per NIP) terhadap data saat ini
+            if st.button("Bandingkan dengan data saat ini"):
+                if plan: discard_restore(plan)
+                plan = run_with_progress(plan_restore, uploaded_file)
+                if plan: st.session_state.restore_plan = plan
+                else: st.session_state.pop("restore_plan", None)
+        if plan:
+            show_import_result(plan.result)
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric("Baru", plan.inserts); m2.metric("Berubah", plan.updates)
+            m3.metric("Dihapus", plan.deletes); m4.metric("Tetap", plan.unchanged)
+            tab_ins, tab_upd, tab_del = st.tabs(["Baru", "Berubah", "Dihapus"])
+            for tab, kind in ((tab_ins, "insert"), (tab_upd, "update"), (tab_del, "delete")):
+                with tab: st.dataframe(preview_restore(plan, kind), use_container_width=True)
+            if plan.changes == 0:
+                st.info("Tidak ada perbedaan dengan data saat ini.")
+            elif st.button("Terapkan perubahan", type="primary"):
+                changed = apply_restore(plan)
+                del st.session_state["restore_plan"]
+                user, role = st.session_state.auth["username"], st.session_state.auth["role"]
+                for action, kind in (("INSERT", "insert"), ("UPDATE", "update"), ("DELETE", "delete")):
+                    for nip in changed[kind]: log_action(user, role, action, f"{nip}-RESTORE")
+                st.success(f"Restore selesai: {len(changed['insert'])} baru, {len(changed['update'])} berubah, "
+                           f"{len(changed['delete'])} dihapus.")
+
+        st.markdown("---")
+        st.subheader("Karantina Nilai Tidak Valid")
+        # Nilai tanggal/masa kerja yang gagal dikonversi saat migrasi, impor atau restore
+        n_quarantine = count_quarantine()
+        if n_quarantine:
+            st.caption(f"{n_quarantine} nilai dikosongkan karena formatnya tidak valid (menampilkan 500 terbaru).")
+            st.dataframe(load_quarantine(), use_container_width=True)
+            st.download_button("💾 Unduh Laporan Karantina", deferred("csv", *quarantine_sql()),
+                               file_name="karantina_pegawai.csv", mime="text/csv")
+        else:
+            st.info("Tidak ada nilai yang dikarantina.")
 
         st.markdown("---")
         st.warning("Aksi ini akan menghapus semua data pegawai di SQLite dan tidak bisa dibatalkan.")
@@ -730,7 +764,6 @@ elif menu == "Backup/Hapus Data":
         if st.button("🗑️ Hapus Semua Data Pegawai", disabled=not confirm):
             replace_all(pd.DataFrame(columns=EXPECTED_COLS))
             log_action(st.session_state.auth["username"], st.session_state.auth["role"], "DELETE", "ALL")
-            st.session_state.pegawai = load_data()
             st.success("Semua data pegawai berhasil dihapus!")
     else:
         st.warning("Menu ini hanya bisa diakses oleh Admin.")
@@ -738,51 +771,50 @@ elif menu == "Backup/Hapus Data":
 # ================== Audit Log ==================
 elif menu == "Audit Log":
     st.header("Audit Log Aktivitas")
-    with conn_db() as conn:
-        df_log = pd.read_sql_query("SELECT * FROM audit_log ORDER BY timestamp DESC", conn)
-    if df_log.empty:
+    if not has_audit_log():
         st.info("Belum ada aktivitas tercatat.")
     else:
-        role_filter = st.multiselect("Filter Role", sorted([r for r in df_log["role"].dropna().unique()]))
-        action_filter = st.multiselect("Filter Action", sorted([a for a in df_log["action"].dropna().unique()]))
+        role_filter = st.multiselect("Filter Role", distinct_audit_values("role"))
+        action_filter = st.multiselect("Filter Action", distinct_audit_values("action"))
         search_term = st.text_input("Cari Username atau Target (mis. NIP)")
-        df_filtered = df_log.copy()
-        if role_filter: df_filtered = df_filtered[df_filtered["role"].isin(role_filter)]
-        if action_filter: df_filtered = df_filtered[df_filtered["action"].isin(action_filter)]
-        if search_term:
-            df_filtered = df_filtered[
-                df_filtered["user"].astype(str).str.contains(search_term, case=False, na=False) |
-                df_filtered["target"].astype(str).str.contains(search_term, case=False, na=False)
-            ]
-        st.dataframe(df_filtered, use_container_width=True)
+
+        # Paginasi keyset: simpan cursor tiap halaman, reset saat filter berubah
+        filter_key = (tuple(role_filter), tuple(action_filter), search_term)
+        if st.session_state.get("audit_filter_key") != filter_key:
+            st.session_state.audit_filter_key = filter_key
+            st.session_state.audit_cursors = [None]
+        cursors = st.session_state.audit_cursors
+        df_page, next_cursor = load_audit_page(role_filter, action_filter, search_term, cursor=cursors[-1])
+        st.dataframe(df_page, use_container_width=True)
+        nav1, nav2, nav3 = st.columns([1, 1, 4])
+        nav3.caption(f"Halaman {len(cursors)}")
+        if nav1.button("⬅️ Sebelumnya", disabled=len(cursors) <= 1):
+            cursors.pop(); st.rerun()
+        if nav2.button("Berikutnya ➡️", disabled=next_cursor is None):
+            cursors.append(next_cursor); st.rerun()
+
         st.markdown("---")
         st.subheader("Ringkasan Aktivitas")
-        if not df_filtered.empty:
-            summary = df_filtered.groupby("action").size().reset_index(name="Jumlah")
+        summary = count_by_action(role_filter, action_filter, search_term)
+        if not summary.empty:
             st.bar_chart(summary.set_index("action"))
         else:
             st.info("Tidak ada data untuk diringkas.")
         st.markdown("---")
         st.subheader("Ekspor Audit Log")
-        st.download_button("💾 Unduh CSV", df_filtered.to_csv(index=False).encode("utf-8"),
+        audit_sql, audit_params = audit_log_sql(role_filter, action_filter, search_term)
+        st.download_button("💾 Unduh CSV", deferred("csv", audit_sql, audit_params),
                            file_name="audit_log.csv", mime="text/csv")
-        out_xlsx = BytesIO()
-        with pd.ExcelWriter(out_xlsx, engine="xlsxwriter") as writer:
-            df_filtered.to_excel(writer, index=False, sheet_name="AuditLog")
-            workbook = writer.book; worksheet = writer.sheets["AuditLog"]
-            header_format = workbook.add_format({"bold": True, "bg_color": "#DCE6F1"})
-            for col_num, value in enumerate(df_filtered.columns.values):
-                worksheet.write(0, col_num, value, header_format)
-        st.download_button("💾 Unduh Excel", out_xlsx.getvalue(),
-                           file_name="audit_log.xlsx",
-                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        st.download_button("💾 Unduh Excel",
+                           deferred("xlsx", audit_sql, audit_params, sheet_name="AuditLog", header_style=HEADER_STYLE),
+                           file_name="audit_log.xlsx", mime=XLSX_MIME)
 
 # ================== Keamanan (Admin) ==================
 elif menu == "Keamanan" and is_admin():
     st.header("🔐 Keamanan Sistem")
     st.info("Kelola reset password untuk user.")
 
-    usernames = list(st.session_state.users.keys())
+    usernames = list(get_users())
     selected_user = st.selectbox("Pilih User", usernames)
 
     if selected_user:
@@ -794,9 +826,63 @@ elif menu == "Keamanan" and is_admin():
             if not is_strong_password(new_pw):
                 st.error("Password terlalu lemah. Minimal 8 karakter dan wajib ada huruf besar, kecil, angka, dan simbol.")
             else:
-                st.session_state.users[selected_user]["password_hash"] = bcrypt.hashpw(new_pw.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-                log_action(st.session_state.auth["username"], st.session_state.auth["role"], "RESET_PASSWORD", selected_user)
-                st.success(f"Password {selected_user} berhasil direset!")
+                try:
+                    set_password(selected_user, new_pw)
+                except Busy:
+                    st.error(BUSY_MSG)
+                else:
+                    log_action(st.session_state.auth["username"], st.session_state.auth["role"], "RESET_PASSWORD", selected_user)
+                    st.success(f"Password {selected_user} berhasil direset!")
+
+# ================== Performance (Admin) ==================
+elif menu == "Performance" and is_admin():
+    import plotly.express as px
+    st.header("⏱️ Performance")
+    registry = get_registry()
+    st.caption(f"Metrik sejak {datetime.datetime.fromtimestamp(registry.started):%Y-%m-%d %H:%M:%S} "
+               "(per proses server, semua sesi).")
+    df_metrics = metrics_summary()
+    if df_metrics.empty:
+        st.info("Belum ada metrik.")
+    else:
+        jenis = st.multiselect("Jenis", sorted(df_metrics["jenis"].unique()), default=sorted(df_metrics["jenis"].unique()))
+        df_metrics = df_metrics[df_metrics["jenis"].isin(jenis)].sort_values("total_s", ascending=False, ignore_index=True)
+        st.dataframe(df_metrics.round({"total_s": 3, "rata2_ms": 2, "p50_ms": 2, "p95_ms": 2, "maks_ms": 2}),
+                     use_container_width=True, hide_index=True)
+        top = df_metrics.nlargest(15, "p95_ms")
+        st.plotly_chart(px.bar(top, x="p95_ms", y=top["jenis"] + " · " + top["nama"], orientation="h",
+                               labels={"y": "", "p95_ms": "p95 (ms)"}, title="p95 terlama"), use_container_width=True)
+    df_errors = error_summary()
+    if not df_errors.empty:
+        st.warning("Ada operasi latar yang gagal (audit log, backup terjadwal, ekspor metrik).")
+        st.dataframe(df_errors, use_container_width=True, hide_index=True)
+    col_a, col_b = st.columns(2)
+    with col_a:
+        st.download_button("💾 Unduh metrik (Prometheus)", prometheus_text, file_name="simpeg_metrics.prom", mime="text/plain")
+    with col_b:
+        if st.button("♻️ Reset metrik"):
+            registry.reset(); st.rerun()
+    if METRICS_FILE: st.caption(f"Textfile Prometheus: `{METRICS_FILE}`")
+    if METRICS_PORT: st.caption(f"Endpoint Prometheus: `http://127.0.0.1:{METRICS_PORT}/metrics`")
+
+    st.subheader("🖼️ Cache Figur")
+    fig_cache = get_figure_cache()
+    fc = fig_cache.stats()
+    k1, k2, k3, k4 = st.columns(4)
+    k1.metric("Hit rate", f"{fc['hit_rate']:.0%}", help=f"{fc['hit']} hit, {fc['miss']} miss")
+    k2.metric("Entri", fc["entri"])
+    k3.metric("Ukuran", f"{fc['bytes'] / 2**20:.1f} / {fc['maks_bytes'] / 2**20:.0f} MB")
+    k4.metric("Evict", fc["evict"])
+    if st.button("🧹 Kosongkan cache figur"):
+        fig_cache.clear(); st.rerun()
+
+    st.subheader("🧪 cProfile")
+    if st.button("Profil rerun berikutnya"):
+        st.session_state.profile_next_run = True
+        st.info("Rerun berikutnya (mis. pindah halaman) akan diprofil; hasilnya tampil di sini.")
+    if st.session_state.get("profile_report"):
+        st.caption(f"Halaman terprofil: {st.session_state.profile_menu}")
+        st.code(st.session_state.profile_report, language="text")
 
 # ================== Footer ==================
 st.markdown("""
@@ -805,3 +891,8 @@ st.markdown("""
     © 2025 SIMPEG Dashboard • Dikembangkan oleh Tim IT • Powered by Streamlit
 </div>
 """, unsafe_allow_html=True)
+
+page_timer.stop()
+if profiler:
+    st.session_state.profile_report = profiler.report()
+    st.session_state.profile_menu = menu